@@ -0,0 +1,184 @@
+"""Offline benchmark of agent orchestration overhead.
+
+Every agent runs against a scripted :class:`gentopia.llm.test_llm.TestLLM` and :class:`fakes.SleepTool`
+plugins with fixed latencies, so a run's ideal wall time is known exactly: the critical path of LLM and tool
+calls. Whatever is measured on top of it is orchestration overhead (prompt building, parsing, scheduling,
+thread hand-offs), and that is what regresses when the orchestration code gets slower.
+
+Usage::
+
+    python benchmarks/agent_orchestration.py --output after.json --baseline before.json
+
+Results are written as JSON keyed by scenario id, so files from different commits can be compared with
+``--baseline``; ``--fail-on-regression`` turns a slowdown beyond ``--tolerance`` into a non-zero exit code.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import ScriptedOpenAIClient, SleepTool  # noqa: E402
+from report import add_report_arguments, finish  # noqa: E402
+from gentopia.agent.openai import OpenAIFunctionChatAgent  # noqa: E402
+from gentopia.agent.react import ReactAgent  # noqa: E402
+from gentopia.agent.rewoo import RewooAgent  # noqa: E402
+from gentopia.agent.vanilla import VanillaAgent  # noqa: E402
+from gentopia.llm.test_llm import TestLLM  # noqa: E402
+from gentopia.prompt.react import ZeroShotReactPrompt  # noqa: E402
+from gentopia.prompt.rewoo import ZeroShotPlannerPrompt, ZeroShotSolverPrompt  # noqa: E402
+
+INSTRUCTION = "What is the answer to life, the universe and everything?"
+# RewooAgent only resolves evidences #E1..#E9.
+MAX_EVIDENCES = 9
+
+
+class Scenario(NamedTuple):
+    id: str
+    agent: str
+    params: Dict
+    build: Callable[[], object]
+    ideal: float
+    llm_calls: int
+    tool_calls: int
+
+
+def _llm(responses: List[str], latency: float) -> TestLLM:
+    return TestLLM(responses=responses, latency=latency)
+
+
+def vanilla_scenario(llm_latency: float, tool_latency: float) -> Scenario:
+    build = lambda: VanillaAgent(version="0", description="benchmark", target_tasks=[], plugins=[],
+                                 llm=_llm(["42"], llm_latency))
+    return Scenario("vanilla", "VanillaAgent", {}, build, llm_latency, 1, 0)
+
+
+def react_scenario(depth: int, llm_latency: float, tool_latency: float) -> Scenario:
+    responses = [f"Thought: step {i}\nAction: sleep_tool\nAction Input: q{i}" for i in range(depth)]
+    responses.append("Thought: I now know the final answer\nFinal Answer: 42")
+
+    def build():
+        llm = ScriptedOpenAIClient(script=_llm(responses, llm_latency))
+        return ReactAgent(version="0", description="benchmark", target_tasks=[], llm=llm,
+                          prompt_template=ZeroShotReactPrompt, plugins=[SleepTool(latency=tool_latency)])
+
+    return Scenario(f"react/depth={depth}", "ReactAgent", {"depth": depth}, build,
+                    (depth + 1) * llm_latency + depth * tool_latency, depth + 1, depth)
+
+
+def rewoo_plan(width: int, depth: int) -> str:
+    """Planner output whose evidence DAG has `depth` levels of `width` parallel tool calls, each depending
+    on the evidence at the same position of the previous level. Width 1 is a chain, depth 1 a fan-out."""
+    lines, n = [], 0
+    for level in range(depth):
+        for j in range(width):
+            n += 1
+            deps = f" #E{n - width}" if level else ""
+            lines.append(f"#Plan{n}: look up part {j} of step {level}.")
+            lines.append(f"#E{n}: sleep_tool[q{n}{deps}]")
+    return "\n".join(lines)
+
+
+def rewoo_scenario(shape: str, width: int, depth: int, llm_latency: float, tool_latency: float) -> Scenario:
+    plan = rewoo_plan(width, depth)
+
+    def build():
+        return RewooAgent(description="benchmark", llm=_llm([plan, "42"], llm_latency),
+                          prompt_template={"Planner": ZeroShotPlannerPrompt, "Solver": ZeroShotSolverPrompt},
+                          plugins=[SleepTool(latency=tool_latency)])
+
+    return Scenario(f"rewoo/{shape}/width={width}/depth={depth}", "RewooAgent",
+                    {"shape": shape, "width": width, "depth": depth}, build,
+                    2 * llm_latency + depth * tool_latency, 2, width * depth)
+
+
+def openai_scenario(llm_latency: float, tool_latency: float) -> Scenario:
+    call = json.dumps({"name": "sleep_tool", "arguments": {"query": "q"}})
+
+    def build():
+        llm = ScriptedOpenAIClient(script=_llm([call, "42"], llm_latency))
+        return OpenAIFunctionChatAgent(llm=llm, plugins=[SleepTool(latency=tool_latency)])
+
+    return Scenario("openai_function", "OpenAIFunctionChatAgent", {}, build,
+                    2 * llm_latency + tool_latency, 2, 1)
+
+
+def scenarios(args) -> List[Scenario]:
+    result = [vanilla_scenario(args.llm_latency, args.tool_latency)]
+    result += [react_scenario(d, args.llm_latency, args.tool_latency) for d in args.react_depths]
+    for shape, width, depth in [("chain", 1, d) for d in args.rewoo_depths] + \
+                               [("fanout", w, 1) for w in args.rewoo_widths] + \
+                               [("grid", 3, 3)]:
+        if width * depth <= MAX_EVIDENCES:
+            result.append(rewoo_scenario(shape, width, depth, args.llm_latency, args.tool_latency))
+    result.append(openai_scenario(args.llm_latency, args.tool_latency))
+    return result
+
+
+def measure(scenario: Scenario, concurrency: int, repeats: int) -> Dict:
+    """Time `repeats` rounds of `concurrency` agents running side by side. Agents are built outside the
+    timed region and never reused, since ReAct and OpenAI agents keep history between runs."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # warm up imports, pydantic validators and the thread pool
+        list(pool.map(lambda agent: agent.run(INSTRUCTION), [scenario.build() for _ in range(concurrency)]))
+        timings = []
+        for _ in range(repeats):
+            agents = [scenario.build() for _ in range(concurrency)]
+            start = time.perf_counter()
+            outputs = list(pool.map(lambda agent: agent.run(INSTRUCTION), agents))
+            timings.append(time.perf_counter() - start)
+            for output in outputs:
+                if "42" not in getattr(output, "output", ""):
+                    raise RuntimeError(f"{scenario.id}: unexpected agent output {output!r}")
+    median = statistics.median(timings)
+    return {
+        "id": f"{scenario.id}/concurrency={concurrency}",
+        "agent": scenario.agent,
+        **scenario.params,
+        "concurrency": concurrency,
+        "llm_calls": scenario.llm_calls,
+        "tool_calls": scenario.tool_calls,
+        "ideal_s": scenario.ideal,
+        "median_s": median,
+        "min_s": min(timings),
+        "mean_s": statistics.fmean(timings),
+        "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "overhead_s": median - scenario.ideal,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="seconds per LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="seconds per tool call")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8],
+                        help="numbers of agents run side by side")
+    parser.add_argument("--react-depths", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rewoo-depths", type=int, nargs="+", default=[1, 4, 9], help="chain plan depths")
+    parser.add_argument("--rewoo-widths", type=int, nargs="+", default=[4, 9], help="fan-out plan widths")
+    add_report_arguments(parser, floor=0.002)
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'scenario':<48}{'median':>12}{'ideal':>12}{'overhead':>12}")
+    for scenario in scenarios(args):
+        for concurrency in args.concurrency:
+            if args.filter not in f"{scenario.id}/concurrency={concurrency}":
+                continue
+            r = measure(scenario, concurrency, args.repeats)
+            results.append(r)
+            print(f"{r['id']:<48}{r['median_s'] * 1e3:>10.2f}ms{r['ideal_s'] * 1e3:>10.2f}ms"
+                  f"{r['overhead_s'] * 1e3:>10.2f}ms")
+
+    finish("agent_orchestration", args, results, key="overhead_s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Offline stand-ins for LLMs, tools, embeddings and vector stores used by the benchmark scripts."""
+import json
+import time
+import zlib
+from typing import Any, AnyStr, Callable, Dict, Iterable, List, Optional, Type
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from gentopia.llm.client.openai import OpenAIGPTClient
+from gentopia.llm.test_llm import TestLLM
+from gentopia.memory.document import Document
+from gentopia.memory.embeddings import Embeddings
+from gentopia.memory.utils import cosine_similarity, maximal_marginal_relevance
+from gentopia.memory.vectorstores.vectorstore import VectorStore
+from gentopia.model.agent_model import AgentOutput
+from gentopia.model.completion_model import ChatCompletionWithHistory
+from gentopia.tools.basetool import BaseTool
+
+
+class SleepToolArgs(BaseModel):
+    query: str = Field(..., description="any text")
+
+
+class SleepTool(BaseTool):
+    """Tool sleeping `latency` seconds and echoing its input."""
+    name = "sleep_tool"
+    description = "A tool that waits and echoes its input."
+    args_schema: Optional[Type[BaseModel]] = SleepToolArgs
+    latency: float = 0.0
+
+    def _run(self, query: AnyStr) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return f"{self.name}({query})"
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        raise NotImplementedError
+
+
+class ScriptedOpenAIClient(OpenAIGPTClient):
+    """OpenAIGPTClient replaying a :class:`TestLLM` script, so it can be plugged into agents typed on the
+    OpenAI client. A canned response that is a JSON object with "name" and "arguments" is treated as a
+    function call, like the real API it costs a second round trip."""
+    model_name: str = "test"
+    script: TestLLM
+
+    def completion(self, prompt: str, **kwargs):
+        return self.script.completion(prompt)
+
+    def chat_completion(self, message: List[dict]):
+        return self.script.chat_completion(message)
+
+    def stream_chat_completion(self, message: List[dict], **kwargs):
+        yield from self.script.stream_chat_completion(message)
+
+    def function_chat_completion(self, message: List[dict], function_map: Dict[str, Callable],
+                                 function_schema: List[Dict]) -> ChatCompletionWithHistory:
+        assert len(function_schema) == len(function_map)
+        first = self.script.chat_completion(message)
+        call = _parse_function_call(first.content)
+        plugin_cost, plugin_token = 0, 0
+        if call is None:
+            message.append({"role": "assistant", "content": first.content})
+            return ChatCompletionWithHistory(state="success", content=first.content, message_scratchpad=message)
+        function_response = function_map[call["name"]](**call["arguments"])
+        if isinstance(function_response, AgentOutput):
+            plugin_cost, plugin_token = function_response.cost, function_response.token_usage
+            function_response = function_response.output
+        message.append({"role": "assistant", "content": None, "function_call": call})
+        message.append({"role": "function", "name": call["name"], "content": function_response})
+        second = self.script.chat_completion(message)
+        message.append({"role": "assistant", "content": second.content})
+        return ChatCompletionWithHistory(state="success", content=second.content, message_scratchpad=message,
+                                         plugin_cost=plugin_cost, plugin_token=plugin_token)
+
+
+def _parse_function_call(content: str) -> Optional[dict]:
+    try:
+        call = json.loads(content)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(call, dict) and "name" in call and "arguments" in call:
+        return call
+    return None
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic pseudo-random embeddings seeded by the text's CRC32."""
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(self.dim, dtype=np.float32).tolist()
+
+
+class InMemoryVectorStore(VectorStore):
+    """Brute-force numpy vector store."""
+
+    def __init__(self, embedding: Embeddings):
+        self.embedding = embedding
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.vectors = np.zeros((0, getattr(embedding, "dim", 0)), dtype=np.float32)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        start = len(self.texts)
+        self.add_vectors(texts, np.asarray(self.embedding.embed_documents(texts), dtype=np.float32), metadatas)
+        return [str(i) for i in range(start, start + len(texts))]
+
+    def add_vectors(self, texts: List[str], vectors: np.ndarray, metadatas: Optional[List[dict]] = None):
+        """Add precomputed vectors, skipping the embedding call."""
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas or [{} for _ in texts])
+        self.vectors = vectors if len(self.vectors) == 0 else np.concatenate([self.vectors, vectors])
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        query_vector = np.asarray([self.embedding.embed_query(query)], dtype=np.float32)
+        scores = cosine_similarity(query_vector, self.vectors)[0]
+        top = np.argsort(-scores)[:k]
+        return [Document(page_content=self.texts[i], metadata=self.metadatas[i]) for i in top]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        query_vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        candidates = np.argsort(-cosine_similarity([query_vector], self.vectors)[0])[:fetch_k]
+        picked = maximal_marginal_relevance(query_vector, self.vectors[candidates], lambda_mult=lambda_mult, k=k)
+        return [Document(page_content=self.texts[candidates[i]], metadata=self.metadatas[candidates[i]])
+                for i in picked]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "InMemoryVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
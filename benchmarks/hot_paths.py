@@ -0,0 +1,229 @@
+"""Micro-benchmarks of the retrieval and text-processing hot paths.
+
+Covers ``cosine_similarity``, ``maximal_marginal_relevance``, ``RecursiveCharacterTextSplitter.split_text``,
+``TokenTextSplitter.split_text``, ``TextSplitter._merge_splits``, ``VectorStoreRetrieverMemory.load_memory_variables``
+over an in-memory vector store, and ``PromptTemplate.format``. Inputs are synthetic and seeded: word corpora
+of 1 MB to 1 GB and random float32 embeddings of up to 1M x 1536, so runs are offline and repeatable.
+
+Each benchmark reports wall time over a few repeats and the peak memory allocated during one extra run
+traced with :mod:`tracemalloc` (numpy buffers included). Inputs are built before timing starts.
+
+Usage::
+
+    python benchmarks/hot_paths.py --preset default --output before.json
+    python benchmarks/hot_paths.py --preset default --baseline before.json --filter split
+
+The token splitter benchmarks need tiktoken's "gpt2" encoding in its local cache (``TIKTOKEN_CACHE_DIR``);
+without it they are reported as skipped.
+"""
+import argparse
+import gc
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import HashEmbeddings, InMemoryVectorStore  # noqa: E402
+from report import add_report_arguments, finish  # noqa: E402
+from gentopia.memory.utils import cosine_similarity, maximal_marginal_relevance  # noqa: E402
+from gentopia.memory.vectorstores.vectorstore import VectorStoreRetrieverMemory  # noqa: E402
+from gentopia.prompt.react import ZeroShotReactPrompt  # noqa: E402
+from gentopia.tools.utils.document_loaders.text_splitter import (  # noqa: E402
+    RecursiveCharacterTextSplitter,
+    TokenTextSplitter,
+)
+
+DIM = 1536
+PRESETS = {
+    "quick": {"text_sizes": ["1MB"], "vector_counts": [10_000]},
+    "default": {"text_sizes": ["1MB", "10MB", "100MB"], "vector_counts": [10_000, 100_000]},
+    "full": {"text_sizes": ["1MB", "10MB", "100MB", "1GB"], "vector_counts": [10_000, 100_000, 1_000_000]},
+}
+PROMPT_SIZES = ["1KB", "64KB", "1MB"]
+_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+
+def parse_size(size: str) -> int:
+    match = re.fullmatch(r"(\d+)\s*([KMG]?B)", size.strip().upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size {size!r}, expected e.g. 64KB, 10MB or 1GB")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def synthetic_corpus(nbytes: int, seed: int = 0, block: int = 1 << 20) -> str:
+    """English-like text of `nbytes` characters: Zipf-distributed words with sentence, line and paragraph
+    breaks, generated in 1 MB blocks of fresh random words so nothing repeats verbatim."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([_word(rng, i) for i in range(20_000)], dtype=object)
+    separators = np.array([" ", ". ", ".\n", ".\n\n"], dtype=object)
+    weights = np.array([0.9, 0.07, 0.02, 0.01])
+    parts, size = [], 0
+    while size < nbytes:
+        # ~6.5 characters per word and separator
+        n = block // 6
+        words = vocabulary[np.minimum(rng.zipf(1.3, n) - 1, len(vocabulary) - 1)]
+        seps = separators[rng.choice(len(separators), n, p=weights)]
+        text = "".join(w + s for w, s in zip(words, seps))
+        parts.append(text)
+        size += len(text)
+    return "".join(parts)[:nbytes]
+
+
+def _word(rng: np.random.Generator, rank: int) -> str:
+    length = 1 + min(int(rng.exponential(4)), 14) + (rank > 100)
+    return "".join(chr(c) for c in rng.integers(97, 123, length))
+
+
+def random_embeddings(n: int, dim: int = DIM, seed: int = 0, block: int = 65_536) -> np.ndarray:
+    """`n` x `dim` float32 standard normal vectors, filled in blocks to avoid float64 temporaries."""
+    rng = np.random.default_rng(seed)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, block):
+        rng.standard_normal((min(block, n - start), dim), dtype=np.float32, out=out[start:start + block])
+    return out
+
+
+def _tiktoken_available() -> Optional[str]:
+    """Return why tiktoken's "gpt2" encoding cannot be loaded offline, or None if it can."""
+    try:
+        import tiktoken
+        tiktoken.get_encoding("gpt2")
+    except Exception as e:  # ImportError or a failed download
+        return f"tiktoken gpt2 encoding unavailable: {type(e).__name__}"
+    return None
+
+
+class Benchmark(NamedTuple):
+    id: str
+    params: Dict[str, Any]
+    run: Callable[[], Any]
+    nbytes: int = 0
+    skip: Optional[str] = None
+
+
+def text_benchmarks(size: str, text: str, tiktoken_missing: Optional[str]) -> Iterator[Benchmark]:
+    params = {"size": size}
+    recursive = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    yield Benchmark(f"recursive_split/size={size}", params, lambda: recursive.split_text(text), len(text))
+    words = text.split(" ")
+    yield Benchmark(f"merge_splits/len/size={size}", params, lambda: recursive._merge_splits(words, " "),
+                    len(text))
+    if tiktoken_missing:
+        yield Benchmark(f"token_split/size={size}", params, None, len(text), tiktoken_missing)
+        yield Benchmark(f"recursive_split/tiktoken/size={size}", params, None, len(text), tiktoken_missing)
+        return
+    token = TokenTextSplitter(chunk_size=512, chunk_overlap=64)
+    yield Benchmark(f"token_split/size={size}", params, lambda: token.split_text(text), len(text))
+    tiktoken_recursive = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=256, chunk_overlap=32)
+    yield Benchmark(f"recursive_split/tiktoken/size={size}", params,
+                    lambda: tiktoken_recursive.split_text(text), len(text))
+
+
+def vector_benchmarks(n: int, embeddings: np.ndarray) -> Iterator[Benchmark]:
+    query = random_embeddings(1, seed=1)[0]
+    batch = random_embeddings(32, seed=2)
+    yield Benchmark(f"cosine_similarity/query/n={n}", {"n": n},
+                    lambda: cosine_similarity(query[None, :], embeddings))
+    yield Benchmark(f"cosine_similarity/batch=32/n={n}", {"n": n, "batch": 32},
+                    lambda: cosine_similarity(batch, embeddings))
+    for k in (4, 20):
+        yield Benchmark(f"mmr/k={k}/n={n}", {"n": n, "k": k},
+                        lambda k=k: maximal_marginal_relevance(query, embeddings, k=k))
+
+    store = InMemoryVectorStore(HashEmbeddings(DIM))
+    store.add_vectors([f"memory {i}" for i in range(n)], embeddings)
+    for search_type in ("similarity", "mmr"):
+        memory = VectorStoreRetrieverMemory(retriever=store.as_retriever(search_type=search_type,
+                                                                         search_kwargs={"k": 4}))
+        yield Benchmark(f"memory_load/{search_type}/n={n}", {"n": n, "search_type": search_type},
+                        lambda memory=memory: memory.load_memory_variables({"input": "what did we discuss?"}))
+
+
+def prompt_benchmarks() -> Iterator[Benchmark]:
+    for size in PROMPT_SIZES:
+        scratchpad = synthetic_corpus(parse_size(size), seed=3)
+        yield Benchmark(f"prompt_format/scratchpad={size}", {"size": size},
+                        lambda scratchpad=scratchpad: ZeroShotReactPrompt.format(
+                            instruction="What is the answer?", agent_scratchpad=scratchpad,
+                            tool_description="calculator[input]: evaluates math\n", tool_names="calculator"),
+                        len(scratchpad))
+
+
+def measure(benchmark: Benchmark, repeats: int, max_time: float, trace_memory: bool) -> Dict:
+    result = {"id": benchmark.id, "benchmark": benchmark.id.split("/")[0], **benchmark.params}
+    if benchmark.skip:
+        return {**result, "skipped": benchmark.skip}
+    timings = []
+    budget_end = time.perf_counter() + max_time
+    while len(timings) < repeats and (not timings or time.perf_counter() < budget_end):
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.run()
+        timings.append(time.perf_counter() - start)
+    result.update(repeats=len(timings), min_s=min(timings), median_s=statistics.median(timings),
+                  mean_s=statistics.fmean(timings))
+    if benchmark.nbytes:
+        result["throughput_mb_s"] = benchmark.nbytes / (1 << 20) / result["median_s"]
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            benchmark.run()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _print(r: Dict):
+    if "skipped" in r:
+        print(f"{r['id']:<44}{'skipped: ' + r['skipped']:>40}")
+        return
+    peak = f"{r['peak_mb']:>10.1f}MB" if "peak_mb" in r else f"{'-':>12}"
+    throughput = f"{r['throughput_mb_s']:>10.1f}MB/s" if "throughput_mb_s" in r else f"{'-':>14}"
+    print(f"{r['id']:<44}{r['median_s'] * 1e3:>12.2f}ms{peak}{throughput}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--text-sizes", nargs="+", help="corpus sizes, overrides the preset, e.g. 1MB 1GB")
+    parser.add_argument("--vector-counts", type=int, nargs="+", help="embedding counts, overrides the preset")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-time", type=float, default=10.0,
+                        help="stop repeating a benchmark after this many seconds")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    add_report_arguments(parser, floor=0.001)
+    args = parser.parse_args(argv)
+    text_sizes = args.text_sizes or PRESETS[args.preset]["text_sizes"]
+    vector_counts = args.vector_counts or PRESETS[args.preset]["vector_counts"]
+    tiktoken_missing = _tiktoken_available()
+
+    def run_all(benchmarks: Iterator[Benchmark]):
+        for benchmark in benchmarks:
+            if args.filter in benchmark.id:
+                r = measure(benchmark, args.repeats, args.max_time, not args.no_memory)
+                results.append(r)
+                _print(r)
+
+    results: List[Dict] = []
+    print(f"{'benchmark':<44}{'median':>14}{'peak':>12}{'throughput':>14}")
+    # inputs are built one size at a time so only one large corpus or matrix is alive at once
+    for size in text_sizes:
+        run_all(text_benchmarks(size, synthetic_corpus(parse_size(size)), tiktoken_missing))
+    for n in vector_counts:
+        run_all(vector_benchmarks(n, random_embeddings(n)))
+    run_all(prompt_benchmarks())
+    finish("hot_paths", args, results, key="median_s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""JSON result files and baseline comparison shared by the benchmark scripts."""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Dict, List
+
+
+def add_report_arguments(parser: argparse.ArgumentParser, floor: float):
+    parser.add_argument("--filter", default="", help="only run benchmarks whose id contains this string")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous JSON result file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative increase to flag")
+    parser.add_argument("--floor", type=float, default=floor, help="absolute increase to flag (s)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: List[Dict], baseline: Dict, key: str, tolerance: float, floor: float) -> List[str]:
+    """Print deltas of `key` against a baseline result file and return the ids that regressed by more
+    than `tolerance` (relative) and `floor` seconds (absolute)."""
+    previous = {r["id"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\nbaseline: commit {baseline['meta']['commit']}")
+    print(f"{'benchmark':<56}{key:>12}{'baseline':>12}{'delta':>10}")
+    for r in results:
+        old = previous.get(r["id"])
+        if old is None or r.get(key) is None or old.get(key) is None:
+            continue
+        delta = r[key] - old[key]
+        relative = delta / old[key] if old[key] > 0 else 0.0
+        regressed = delta > floor and relative > tolerance
+        if regressed:
+            regressions.append(r["id"])
+        print(f"{r['id']:<56}{r[key] * 1e3:>10.2f}ms{old[key] * 1e3:>10.2f}ms"
+              f"{relative:>+9.0%}{' !' if regressed else ''}")
+    return regressions
+
+
+def finish(name: str, args: argparse.Namespace, results: List[Dict], key: str):
+    """Write the result file and compare it with the baseline as requested on the command line."""
+    report = {
+        "meta": {
+            "benchmark": name,
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), key, args.tolerance, args.floor)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
@@ -1,18 +1,29 @@
 import io
 from abc import ABC, abstractmethod
-from typing import List, Dict, Union, Any, Optional, Type, Callable
+from typing import List, Dict, Union, Any, Optional, Type, Callable, Tuple
 
 from gentopia import PromptTemplate
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel, PrivateAttr, create_model
 
 from gentopia.llm.base_llm import BaseLLM
 from gentopia.model.agent_model import AgentType, AgentOutput
 from gentopia.memory.api import MemoryWrapper
+from gentopia.agent.plugin_registry import PluginMetadata, PluginRegistry
+from gentopia.utils.execution import execution_context
 from rich import print as rprint
 
 from gentopia.tools import BaseTool
 
 
+def _tool_function(tool: BaseTool) -> Callable:
+    """Call `tool` with keyword arguments, as the OpenAI function API does."""
+
+    def call(**kwargs):
+        return tool.run(kwargs)
+
+    return call
+
+
 class BaseAgent(ABC, BaseModel):
     """Base Agent class defining the essential attributes and methods for an ALM Agent.
 
@@ -36,6 +47,12 @@ class BaseAgent(ABC, BaseModel):
     :type args_schema: Optional[Type[BaseModel]]
     :param memory: An instance of MemoryWrapper.
     :type memory: Optional[MemoryWrapper]
+    :param plugin_metadata: Aliases, concurrency limit, timeout, cacheability and cost per plugin name.
+    :type plugin_metadata: Dict[str, PluginMetadata]
+    :param timeout: Wall-clock limit of a run in seconds, defaults to None (only an enclosing deadline applies).
+    :type timeout: Optional[float]
+    :param cost_budget: Maximum cost of a run in dollars, defaults to None (unlimited).
+    :type cost_budget: Optional[float]
     """
 
     name: str
@@ -48,6 +65,12 @@ class BaseAgent(ABC, BaseModel):
     plugins: List[Any]
     args_schema: Optional[Type[BaseModel]] = create_model("ArgsSchema", instruction=(str, ...))
     memory: Optional[MemoryWrapper]
+    plugin_metadata: Dict[str, PluginMetadata] = {}
+    timeout: Optional[float] = None
+    cost_budget: Optional[float] = None
+
+    # plugin-derived tables (function map, schemas, descriptions) with the plugin list and its length at build time
+    _plugin_tables: Dict[str, Tuple[list, int, Any]] = PrivateAttr(default_factory=dict)
 
     @abstractmethod
     def run(self, *args, **kwargs) -> AgentOutput:
@@ -77,17 +100,52 @@ class BaseAgent(ABC, BaseModel):
         rprint(self, file=result)
         return result.getvalue()
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in ("plugins", "plugin_metadata"):
+            self._plugin_tables.clear()
+
+    def _plugin_table(self, kind: str, build: Callable[[], Any]) -> Any:
+        """Return ``build()``, computed once and reused until the plugins change: tables are dropped when
+        ``plugins`` or ``plugin_metadata`` is assigned, or plugins are appended to or removed from the list.
+        Replace a plugin in place by assigning a new list.
+
+        :param kind: Name of the table, e.g. "function_map".
+        :type kind: str
+        :param build: Function computing the table from ``self.plugins``.
+        :type build: Callable[[], Any]
+        :return: The cached table.
+        """
+        cached = self._plugin_tables.get(kind)
+        if cached is None or cached[0] is not self.plugins or cached[1] != len(self.plugins):
+            cached = self._plugin_tables[kind] = (self.plugins, len(self.plugins), build())
+        return cached[2]
+
+    def _execution_context(self):
+        """Execution context of one run, bounded by `timeout` and `cost_budget` and nested in the caller's,
+        see :mod:`gentopia.utils.execution`."""
+        return execution_context(self.timeout, self.cost_budget)
+
+    @property
+    def plugin_registry(self) -> PluginRegistry:
+        """Registry of the agent's plugins for lookup by (possibly misspelled) name, rebuilt when the plugins change."""
+        return self._plugin_table("registry", lambda: PluginRegistry(self.plugins, self.plugin_metadata))
+
     def _format_function_map(self) -> Dict[str, Callable]:
-        """Format the function map for the open AI function API.
+        """Format the function map for the open AI function API. The map is rebuilt only when the plugins change.
 
         :return: The function map.
         :rtype: Dict[str, Callable]
         """
+        return self._plugin_table("function_map", self._build_function_map)
+
+    def _build_function_map(self) -> Dict[str, Callable]:
         # Map the function name to the real function object.
         function_map = {}
         for plugin in self.plugins:
             if isinstance(plugin, BaseTool):
-                function_map[plugin.name] = plugin._run
+                # through BaseTool.run, so the tool's timeout, result cache and tracing apply
+                function_map[plugin.name] = _tool_function(plugin)
             else:
                 function_map[plugin.name] = plugin.run
         return function_map
@@ -11,6 +11,8 @@ from gentopia.output.base_output import BaseOutput
 from gentopia.prompt import VanillaPrompt
 from gentopia.tools import BaseTool
 from gentopia.utils.cost_helpers import calculate_cost
+from gentopia.utils.execution import charge
+from gentopia.utils.tracing import traced
 
 
 class OpenAIFunctionChatAgent(BaseAgent):
@@ -104,17 +106,15 @@ class OpenAIFunctionChatAgent(BaseAgent):
             }
 
     def _format_function_schema(self) -> List[Dict]:
-        """Format function schema into the open AI function API.
+        """Format function schema into the open AI function API. The schema is rebuilt only when the plugins change.
 
         :return: Formatted function schema.
         :rtype: List[Dict]
         """
-        # List the function schema.
-        function_schema = []
-        for plugin in self.plugins:
-            function_schema.append(self._format_plugin_schema(plugin))
-        return function_schema
+        return self._plugin_table("function_schema",
+                                  lambda: [self._format_plugin_schema(plugin) for plugin in self.plugins])
 
+    @traced("agent")
     def run(self, instruction: str, output: Optional[BaseOutput] = None) -> AgentOutput:
         """Run the agent with the given instruction.
 
@@ -123,32 +123,35 @@ class OpenAIFunctionChatAgent(BaseAgent):
         :param output: Output manager object to be used, defaults to None.
         :type output: Optional[BaseOutput], optional
         """
-        self.clear()
-        if output is None:
-            output = BaseOutput()
-        self.message_scratchpad.append({"role": "user", "content": instruction})
-        total_cost = 0
-        total_token = 0
+        with self._execution_context() as ctx:
+            ctx.check()
+            self.clear()
+            if output is None:
+                output = BaseOutput()
+            self.message_scratchpad.append({"role": "user", "content": instruction})
+            total_cost = 0
+            total_token = 0
 
-        function_map = self._format_function_map()
-        function_schema = self._format_function_schema()
+            function_map = self._format_function_map()
+            function_schema = self._format_function_schema()
 
-        output.thinking(self.name)
-        response = self.llm.function_chat_completion(self.message_scratchpad, function_map, function_schema)
-        output.done()
-        if response.state == "success":
-            output.done(self.name)
-            output.panel_print(response.content)
-            # Update message history
-            self.message_scratchpad.append(response.message_scratchpad)
-            total_cost += calculate_cost(self.llm.model_name, response.prompt_token,
-                                         response.completion_token) + response.plugin_cost
-            total_token += response.prompt_token + response.completion_token + response.plugin_token
-            return AgentOutput(
-                output=response.content,
-                cost=total_cost,
-                token_usage=total_token,
-            )
+            output.thinking(self.name)
+            response = self.llm.function_chat_completion(self.message_scratchpad, function_map, function_schema)
+            output.done()
+            if response.state == "success":
+                output.done(self.name)
+                output.panel_print(response.content)
+                # Update message history
+                self.message_scratchpad.append(response.message_scratchpad)
+                llm_cost = calculate_cost(self.llm.model_name, response.prompt_token, response.completion_token)
+                charge(llm_cost)
+                total_cost += llm_cost + response.plugin_cost
+                total_token += response.prompt_token + response.completion_token + response.plugin_token
+                return AgentOutput(
+                    output=response.content,
+                    cost=total_cost,
+                    token_usage=total_token,
+                )
 
     def stream(self, instruction: Optional[str] = None, output: Optional[BaseOutput] = None):
         """Stream output the agent with the given instruction.
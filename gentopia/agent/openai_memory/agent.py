@@ -13,6 +13,8 @@ from gentopia.prompt import VanillaPrompt
 from gentopia.tools import BaseTool
 from .load_memory import LoadMemory
 from ...utils.cost_helpers import calculate_cost
+from ...utils.execution import charge
+from ...utils.tracing import traced
 
 
 class OpenAIMemoryChatAgent(OpenAIFunctionChatAgent):
@@ -99,23 +101,12 @@ class OpenAIMemoryChatAgent(OpenAIFunctionChatAgent):
                 "parameters": parameters,
             }
 
-    def _format_function_map(self) -> Dict[str, Callable]:
-        # Map the function name to the real function object.
-        function_map = {}
-        for plugin in self.plugins:
-            if isinstance(plugin, BaseTool):
-                function_map[plugin.name] = plugin._run
-            else:
-                function_map[plugin.name] = plugin.run
-        return function_map
-
     def _format_function_schema(self) -> List[Dict]:
-        # List the function schema.
-        function_schema = []
-        for plugin in self.plugins:
-            function_schema.append(self._format_plugin_schema(plugin))
-        return function_schema
+        # List the function schema, rebuilt only when the plugins change.
+        return self._plugin_table("function_schema",
+                                  lambda: [self._format_plugin_schema(plugin) for plugin in self.plugins])
 
+    @traced("agent")
     def run(self, instruction: str, output: Optional[BaseOutput] = None) -> AgentOutput:
         """Run the agent with the given instruction.
 
@@ -126,39 +117,42 @@ class OpenAIMemoryChatAgent(OpenAIFunctionChatAgent):
         :return: Output of the agent.
         :rtype: AgentOutput
         """
-        self.clear()
-        if output is None:
-            output = BaseOutput()
-        self.memory.clear_memory_II()
-        message_scratchpad = self.__add_system_prompt(self.memory.lastest_context(instruction, output))
-        total_cost = 0
-        total_token = 0
-
-        self.__add_load_memory_tool() # add a tool to load memory
-        function_map = self._format_function_map()
-        function_schema = self._format_function_schema()
-
-        # TODO: stream output, cost and token usage
-        output.thinking(self.name)
-        # print(message_scratchpad)
-        response = self.llm.function_chat_completion(message_scratchpad, function_map, function_schema)
-        output.done()
-        if response.state == "success":
-            output.done(self.name)
-            output.panel_print(response.content)
-            self.memory.save_memory_I({"role": "user", "content": instruction}, response.message_scratchpad[-1], output)
-
-            if len(response.message_scratchpad) != len(message_scratchpad) + 1: # normal case
-                self.memory.save_memory_II(response.message_scratchpad[-3], response.message_scratchpad[-2], output, self.llm)       
-
-            total_cost += calculate_cost(self.llm.model_name, response.prompt_token,
-                                         response.completion_token) + response.plugin_cost
-            total_token += response.prompt_token + response.completion_token + response.plugin_token
-            return AgentOutput(
-                output=response.content,
-                cost=total_cost,
-                token_usage=total_token,
-            )
+        with self._execution_context() as ctx:
+            ctx.check()
+            self.clear()
+            if output is None:
+                output = BaseOutput()
+            self.memory.clear_memory_II()
+            message_scratchpad = self.__add_system_prompt(self.memory.lastest_context(instruction, output))
+            total_cost = 0
+            total_token = 0
+
+            self.__add_load_memory_tool() # add a tool to load memory
+            function_map = self._format_function_map()
+            function_schema = self._format_function_schema()
+
+            # TODO: stream output, cost and token usage
+            output.thinking(self.name)
+            # print(message_scratchpad)
+            response = self.llm.function_chat_completion(message_scratchpad, function_map, function_schema)
+            output.done()
+            if response.state == "success":
+                output.done(self.name)
+                output.panel_print(response.content)
+                self.memory.save_memory_I({"role": "user", "content": instruction}, response.message_scratchpad[-1], output)
+
+                if len(response.message_scratchpad) != len(message_scratchpad) + 1: # normal case
+                    self.memory.save_memory_II(response.message_scratchpad[-3], response.message_scratchpad[-2], output, self.llm)       
+
+                llm_cost = calculate_cost(self.llm.model_name, response.prompt_token, response.completion_token)
+                charge(llm_cost)
+                total_cost += llm_cost + response.plugin_cost
+                total_token += response.prompt_token + response.completion_token + response.plugin_token
+                return AgentOutput(
+                    output=response.content,
+                    cost=total_cost,
+                    token_usage=total_token,
+                )
 
     def stream(self, instruction: Optional[str] = None, output: Optional[BaseOutput] = None, is_start: Optional[bool] = True):
         """Stream output the agent with the given instruction.
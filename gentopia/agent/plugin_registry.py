@@ -0,0 +1,172 @@
+import difflib
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from gentopia.tools.basetool import BaseTool
+from gentopia.utils.execution import execution_context
+
+
+class PluginMetadata(BaseModel):
+    """Per-plugin settings used by agents when dispatching calls.
+
+    :param aliases: Other names the plugin may be called by.
+    :type aliases: List[str]
+    :param concurrency: Maximum number of simultaneous calls, defaults to None (unlimited).
+    :type concurrency: Optional[int]
+    :param timeout: Time limit of a call in seconds, defaults to None (no limit).
+    :type timeout: Optional[float]
+    :param cacheable: Whether results of a tool may be cached and shared between identical calls, overriding
+        the tool's own `cacheable`, defaults to the tool's setting.
+    :type cacheable: bool
+    :param cost: Cost of one call in dollars, defaults to 0.
+    :type cost: float
+    """
+    aliases: List[str] = []
+    concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    cacheable: bool = False
+    cost: float = 0.0
+
+
+def _normalize(name: str) -> str:
+    """Canonical form of a tool name as LLMs tend to write it: "`Web-Search()`" -> "web_search"."""
+    name = name.strip().strip("`'\"[]").strip()
+    if name.endswith("()"):
+        name = name[:-2]
+    return re.sub(r"[\s\-]+", "_", name).lower()
+
+
+class PluginRegistry:
+    """Name-indexed collection of an agent's plugins (tools or agents).
+
+    Lookups try the exact name, then the normalized name or an alias, then the closest name by
+    :func:`difflib.get_close_matches`, so a misspelled tool name from the LLM still reaches the intended
+    plugin without another LLM round trip. The last `max_resolved` resolved names are remembered.
+
+    :param plugins: Plugins to register.
+    :type plugins: Iterable[Any]
+    :param metadata: Metadata per plugin name; missing fields are read from same-named plugin attributes.
+    :type metadata: Optional[Dict[str, PluginMetadata]]
+    :param cutoff: Minimum similarity (0 to 1) for a fuzzy match, defaults to 0.8.
+    :type cutoff: float
+    :param max_resolved: Number of resolved names remembered, defaults to 1024.
+    :type max_resolved: int
+    """
+
+    def __init__(self, plugins: Iterable[Any] = (), metadata: Optional[Dict[str, PluginMetadata]] = None,
+                 cutoff: float = 0.8, max_resolved: int = 1024):
+        self.cutoff = cutoff
+        self.max_resolved = max_resolved
+        self._resolved_lock = threading.Lock()
+        self._plugins: Dict[str, Any] = {}
+        self._metadata: Dict[str, PluginMetadata] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._names: Dict[str, str] = {}  # normalized name or alias -> name
+        self._resolved: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        metadata = metadata or {}
+        for plugin in plugins:
+            self.register(plugin, metadata.get(plugin.name))
+
+    def register(self, plugin: Any, metadata: Optional[PluginMetadata] = None):
+        """Add or replace a plugin.
+
+        :param plugin: The plugin, which must have a `name`.
+        :type plugin: Any
+        :param metadata: The plugin's metadata, defaults to values read from the plugin.
+        :type metadata: Optional[PluginMetadata]
+        """
+        defaults = {k: getattr(plugin, k) for k in PluginMetadata.__fields__ if hasattr(plugin, k)}
+        if metadata is not None:
+            defaults.update(metadata.dict(exclude_unset=True))
+        metadata = PluginMetadata(**defaults)
+        name = plugin.name
+        self._plugins[name] = plugin
+        self._metadata[name] = metadata
+        if metadata.concurrency:
+            self._semaphores[name] = threading.BoundedSemaphore(metadata.concurrency)
+        else:
+            self._semaphores.pop(name, None)
+        for key in [name] + metadata.aliases:
+            self._names[_normalize(key)] = name
+        with self._resolved_lock:
+            self._resolved.clear()
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the registered name `name` refers to, or None if nothing matches closely enough."""
+        if name in self._plugins:
+            return name
+        with self._resolved_lock:
+            if name in self._resolved:
+                self._resolved.move_to_end(name)
+                return self._resolved[name]
+        key = _normalize(name)
+        match = self._names.get(key)
+        if match is None:
+            close = difflib.get_close_matches(key, self._names, n=1, cutoff=self.cutoff)
+            match = self._names[close[0]] if close else None
+        with self._resolved_lock:
+            self._resolved[name] = match
+            while len(self._resolved) > self.max_resolved:
+                self._resolved.popitem(last=False)
+        return match
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the plugin `name` refers to, or None."""
+        resolved = self.resolve(name)
+        return None if resolved is None else self._plugins[resolved]
+
+    def metadata(self, name: str) -> PluginMetadata:
+        """Return the metadata of the plugin `name` refers to.
+
+        :raises KeyError: If no plugin matches.
+        """
+        resolved = self.resolve(name)
+        if resolved is None:
+            raise KeyError(name)
+        return self._metadata[resolved]
+
+    @contextmanager
+    def limit(self, name: str):
+        """Hold one of the plugin's concurrency slots, if it has a limit."""
+        semaphore = self._semaphores.get(self.resolve(name))
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+    def run(self, name: str, *args, **kwargs) -> Any:
+        """Run the plugin `name` refers to within its concurrency limit and timeout. The timeout becomes the
+        deadline of the call's execution context (:mod:`gentopia.utils.execution`), which tools enforce and
+        agent-plugins pass on to their own plugins; the plugin's cost is charged to that context. Tools cache
+        their result if the plugin's metadata is `cacheable`.
+
+        :raises KeyError: If no plugin matches.
+        :raises ExecutionInterrupted: If the call runs out of time or budget.
+        """
+        plugin = self.get(name)
+        if plugin is None:
+            raise KeyError(name)
+        metadata = self._metadata[plugin.name]
+        if isinstance(plugin, BaseTool):
+            kwargs.setdefault("cacheable", metadata.cacheable)
+        with self.limit(plugin.name), execution_context(metadata.timeout) as ctx:
+            ctx.charge(metadata.cost)
+            return plugin.run(*args, **kwargs)
+
+    def names(self) -> List[str]:
+        return list(self._plugins)
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._plugins.values())
+
+    def __len__(self) -> int:
+        return len(self._plugins)
@@ -13,6 +13,8 @@ from gentopia.assembler.task import AgentAction, AgentFinish
 from gentopia.llm.client.openai import OpenAIGPTClient
 from gentopia.model.agent_model import AgentType, AgentOutput
 from gentopia.utils.cost_helpers import calculate_cost
+from gentopia.utils.execution import charge, ExecutionInterrupted, run_with_timeout
+from gentopia.utils.tracing import traced
 
 FINAL_ANSWER_ACTION = "Final Answer:"
 
@@ -125,8 +127,8 @@ class ReactAgent(BaseAgent):
         Compose the prompt from template, worker description, examples and instruction.
         """
         agent_scratchpad = self._construct_scratchpad(self.intermediate_steps)
-        tool_description = self._compose_plugin_description()
-        tool_names = ", ".join([plugin.name for plugin in self.plugins])
+        tool_description = self._plugin_table("tool_description", self._compose_plugin_description)
+        tool_names = self._plugin_table("tool_names", lambda: ", ".join([plugin.name for plugin in self.plugins]))
         if self.prompt_template is None:
             from gentopia.prompt.react import ZeroShotReactPrompt
             self.prompt_template = ZeroShotReactPrompt
@@ -137,6 +139,30 @@ class ReactAgent(BaseAgent):
             tool_names=tool_names
         )
 
+    def _call_plugin(self, action: str, tool_input: str):
+        """
+        Call the plugin named by the LLM. Misspelled names are matched to the closest plugin; if none
+        matches, the observation tells the LLM which plugins exist instead of failing the run. A call that
+        runs out of time or budget is reported as the observation as well.
+        """
+        name = self.plugin_registry.resolve(action)
+        if name is None:
+            tool_names = ", ".join(self.plugin_registry.names())
+            return f"{action} is not a valid tool, try one of [{tool_names}]."
+        metadata = self.plugin_registry.metadata(name)
+        # tools go through BaseTool.run, so their own timeout, result cache and tracing apply
+        plugin = self.plugin_registry.get(name)
+        with self.plugin_registry.limit(name):
+            try:
+                charge(metadata.cost)
+                if isinstance(plugin, BaseTool):
+                    return run_with_timeout(lambda: plugin.run(tool_input, cacheable=metadata.cacheable),
+                                            metadata.timeout)
+                return run_with_timeout(lambda: plugin.run(tool_input), metadata.timeout)
+            except ExecutionInterrupted as e:
+                return f"{action} was interrupted: {e}."
+
+    @traced("agent")
     def run(self, instruction, max_iterations=10):
         """
         Run the agent with the given instruction.
@@ -145,40 +171,49 @@ class ReactAgent(BaseAgent):
         :type instruction: str
         :param max_iterations: Maximum number of iterations of reasoning steps, defaults to 10.
         :type max_iterations: int, optional
-        :return: AgentOutput object.
+        :return: AgentOutput object. If the run's `timeout` or `cost_budget` runs out, the last response so far.
         :rtype: AgentOutput
         """
         self.clear()
         logging.info(f"Running {self.name + ':' + self.version} with instruction: {instruction}")
         total_cost = 0.0
         total_token = 0
+        response = None
 
-        for _ in range(max_iterations):
+        with self._execution_context() as ctx:
+            for _ in range(max_iterations):
+                if ctx.cancelled:
+                    if response is None:
+                        ctx.check()
+                    # out of time or budget: answer with the reasoning so far
+                    logging.info(f"Stopping {self.name}: {ctx.interruption}")
+                    break
 
-            prompt = self._compose_prompt(instruction)
-            logging.info(f"Prompt: {prompt}")
-            response = self.llm.completion(prompt, stop=["Observation:"])
-            if response.state == "error":
-                print("Failed to retrieve response from LLM")
-                raise ValueError("Failed to retrieve response from LLM")
-
-            logging.info(f"Response: {response.content}")
-            total_cost += calculate_cost(self.llm.model_name, response.prompt_token,
-                                         response.completion_token)
-            total_token += response.prompt_token + response.completion_token
-            self.intermediate_steps.append([self._parse_output(response.content), ])
-            if isinstance(self.intermediate_steps[-1][0], AgentFinish):
-                break
-            action = self.intermediate_steps[-1][0].tool
-            tool_input = self.intermediate_steps[-1][0].tool_input
-            logging.info(f"Action: {action}")
-            logging.info(f"Tool Input: {tool_input}")
-            result = self._format_function_map()[action](tool_input)
-            if isinstance(result, AgentOutput):
-                total_cost += result.cost
-                total_token += result.token_usage
-            logging.info(f"Result: {result}")
-            self.intermediate_steps[-1].append(result)
+                prompt = self._compose_prompt(instruction)
+                logging.info(f"Prompt: {prompt}")
+                response = self.llm.completion(prompt, stop=["Observation:"])
+                if response.state == "error":
+                    print("Failed to retrieve response from LLM")
+                    raise ValueError("Failed to retrieve response from LLM")
+
+                logging.info(f"Response: {response.content}")
+                cost = calculate_cost(self.llm.model_name, response.prompt_token, response.completion_token)
+                ctx.charge(cost)
+                total_cost += cost
+                total_token += response.prompt_token + response.completion_token
+                self.intermediate_steps.append([self._parse_output(response.content), ])
+                if isinstance(self.intermediate_steps[-1][0], AgentFinish):
+                    break
+                action = self.intermediate_steps[-1][0].tool
+                tool_input = self.intermediate_steps[-1][0].tool_input
+                logging.info(f"Action: {action}")
+                logging.info(f"Tool Input: {tool_input}")
+                result = self._call_plugin(action, tool_input)
+                if isinstance(result, AgentOutput):
+                    total_cost += result.cost
+                    total_token += result.token_usage
+                logging.info(f"Result: {result}")
+                self.intermediate_steps[-1].append(result)
         return AgentOutput(output=response.content, cost=total_cost, token_usage=total_token)
 
     def stream(self, instruction: Optional[str] = None, output: Optional[BaseOutput] = None, max_iterations: int = 10):
@@ -221,7 +256,7 @@ class ReactAgent(BaseAgent):
             logging.info(f"Action: {action}")
             logging.info(f"Tool Input: {tool_input}")
             output.update_status("Calling function: {} ...".format(action))
-            result = self._format_function_map()[action](tool_input)
+            result = self._call_plugin(action, tool_input)
             output.done()
             logging.info(f"Result: {result}")
             if isinstance(result, AgentOutput):
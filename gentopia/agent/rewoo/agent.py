@@ -1,11 +1,12 @@
 import logging
 import os
 import re
+import threading
 from typing import List, Dict, Union, Optional, Tuple, Type
 from pydantic import create_model, BaseModel
 
 from gentopia import PromptTemplate
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from gentopia.agent.base_agent import BaseAgent
 from gentopia.agent.rewoo.nodes.Planner import Planner
 from gentopia.agent.rewoo.nodes.Solver import Solver
@@ -14,7 +15,9 @@ from gentopia.model.agent_model import AgentType
 from gentopia.output.base_output import BaseOutput
 from gentopia.tools import BaseTool
 from gentopia.utils.cost_helpers import *
+from gentopia.utils.execution import charge, current_context, ExecutionContext, ExecutionInterrupted
 from gentopia.utils.text_helpers import *
+from gentopia.utils.tracing import traced, wrap_context
 
 
 class RewooAgent(BaseAgent):
@@ -165,12 +168,14 @@ class RewooAgent(BaseAgent):
                 if var in worker_evidences:
                     tool_input = tool_input.replace(var, worker_evidences.get(var, ""))
             try:
-                tool_response = self._find_plugin(tool).run(tool_input)
+                tool_response = self.plugin_registry.run(tool, tool_input)
                 # cumulate agent-as-plugin costs and tokens.
                 if isinstance(tool_response, AgentOutput):
                     result['plugin_cost'] = tool_response.cost
                     result['plugin_token'] = tool_response.token_usage
                 result['evidence'] = get_plugin_response_content(tool_response)
+            except ExecutionInterrupted as exc:
+                result['evidence'] = f"No evidence found: {exc}."
             except:
                 result['evidence'] = "No evidence found."
             finally:
@@ -190,35 +195,68 @@ class RewooAgent(BaseAgent):
         :type output: BaseOutput, optional
         :return: A mapping from #E to tool call.
         :rtype: dict[str, str]
+
+        When the run's deadline passes or its budget is spent, the remaining evidences are marked as not found
+        and the evidences gathered so far are returned, without waiting for plugins that are still running.
         """
         worker_evidences = dict()
         plugin_cost, plugin_token = 0.0, 0.0
-        with ThreadPoolExecutor() as pool:
+        ctx = current_context()
+        pool = ThreadPoolExecutor()
+        try:
             for level in evidences_level:
+                if ctx is not None and ctx.cancelled:
+                    break
                 results = []
                 for e in level:
-                    results.append(pool.submit(self._run_plugin, e, planner_evidences, worker_evidences, output))
+                    results.append(pool.submit(wrap_context(self._run_plugin), e, planner_evidences, worker_evidences, output))
                 if len(results) > 1:
                     output.update_status(f"Running tasks {level} in parallel.")
                 else:
                     output.update_status(f"Running task {level[0]}.")
                 for r in results:
+                    if ctx is not None and not self._wait_for(r, ctx):
+                        break
                     resp = r.result()
                     plugin_cost += resp['plugin_cost']
                     plugin_token += resp['plugin_token']
                     worker_evidences[resp['e']] = resp['evidence']
                 output.done()
+        finally:
+            # plugins still running past the deadline are left to finish in the background
+            pool.shutdown(wait=ctx is None or not ctx.cancelled, cancel_futures=True)
+        if ctx is not None and ctx.cancelled:
+            reason = ctx.interruption
+            for level in evidences_level:
+                for e in level:
+                    worker_evidences.setdefault(e, f"No evidence found: {reason}.")
 
         return worker_evidences, plugin_cost, plugin_token
 
+    @staticmethod
+    def _wait_for(future: Future, ctx: ExecutionContext) -> bool:
+        """Wait until `future` is done, or until `ctx` runs out of time or budget or is cancelled.
+
+        :return: False if the wait was cut short.
+        :rtype: bool
+        """
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+        # cancelling the context, e.g. when the budget is spent, also sets `done` and ends the wait
+        while not future.done():
+            if ctx.wait(60.0, until=done) and not future.done():
+                return False
+        return True
+
     def _find_plugin(self, name: str):
-        for p in self.plugins:
-            if p.name == name:
-                return p
+        return self.plugin_registry.get(name)
 
+    @traced("agent")
     def run(self, instruction: str) -> AgentOutput:
         """
-        Run the agent with a given instruction.
+        Run the agent with a given instruction. If the run's `timeout` or `cost_budget` (or those of the
+        enclosing execution context) runs out while plugins are working, the Solver answers from the
+        evidence gathered so far.
 
         :param instruction: Instruction to run.
         :type instruction: str
@@ -226,43 +264,48 @@ class RewooAgent(BaseAgent):
         :rtype: AgentOutput
         """
         logging.info(f"Running {self.name + ':' + self.version} with instruction: {instruction}")
-        total_cost = 0.0
-        total_token = 0
-
-        planner_llm = self._get_llms()["Planner"]
-        solver_llm = self._get_llms()["Solver"]
-
-        planner = Planner(model=planner_llm,
-                          workers=self.plugins,
-                          prompt_template=self.prompt_template.get("Planner", None),
-                          examples=self.examples.get("Planner", None))
-        solver = Solver(model=solver_llm,
-                        prompt_template=self.prompt_template.get("Solver", None),
-                        examples=self.examples.get("Solver", None))
-
-        # Plan
-        planner_output = planner.run(instruction)
-        total_cost += calculate_cost(planner_llm.model_name, planner_output.prompt_token,
-                                     planner_output.completion_token)
-        total_token += planner_output.prompt_token + planner_output.completion_token
-        plan_to_es, plans = self._parse_plan_map(planner_output.content)
-        planner_evidences, evidence_level = self._parse_planner_evidences(planner_output.content)
-
-        # Work
-        worker_evidences, plugin_cost, plugin_token = self._get_worker_evidence(planner_evidences, evidence_level)
-        worker_log = ""
-        for plan in plan_to_es:
-            worker_log += f"{plan}: {plans[plan]}\n"
-            for e in plan_to_es[plan]:
-                worker_log += f"{e}: {worker_evidences[e]}\n"
-
-        # Solve
-        solver_output = solver.run(instruction, worker_log)
-        total_cost += calculate_cost(solver_llm.model_name, solver_output.prompt_token,
-                                     solver_output.completion_token) + plugin_cost
-        total_token += solver_output.prompt_token + solver_output.completion_token + plugin_token
-
-        return AgentOutput(output=solver_output.content, cost=total_cost, token_usage=total_token)
+        with self._execution_context():
+            total_cost = 0.0
+            total_token = 0
+
+            planner_llm = self._get_llms()["Planner"]
+            solver_llm = self._get_llms()["Solver"]
+
+            planner = Planner(model=planner_llm,
+                              workers=self.plugins,
+                              prompt_template=self.prompt_template.get("Planner", None),
+                              examples=self.examples.get("Planner", None))
+            solver = Solver(model=solver_llm,
+                            prompt_template=self.prompt_template.get("Solver", None),
+                            examples=self.examples.get("Solver", None))
+
+            # Plan
+            planner_output = planner.run(instruction)
+            planner_cost = calculate_cost(planner_llm.model_name, planner_output.prompt_token,
+                                          planner_output.completion_token)
+            charge(planner_cost)
+            total_cost += planner_cost
+            total_token += planner_output.prompt_token + planner_output.completion_token
+            plan_to_es, plans = self._parse_plan_map(planner_output.content)
+            planner_evidences, evidence_level = self._parse_planner_evidences(planner_output.content)
+
+            # Work
+            worker_evidences, plugin_cost, plugin_token = self._get_worker_evidence(planner_evidences, evidence_level)
+            worker_log = ""
+            for plan in plan_to_es:
+                worker_log += f"{plan}: {plans[plan]}\n"
+                for e in plan_to_es[plan]:
+                    worker_log += f"{e}: {worker_evidences[e]}\n"
+
+            # Solve
+            solver_output = solver.run(instruction, worker_log)
+            solver_cost = calculate_cost(solver_llm.model_name, solver_output.prompt_token,
+                                         solver_output.completion_token)
+            charge(solver_cost)
+            total_cost += solver_cost + plugin_cost
+            total_token += solver_output.prompt_token + solver_output.completion_token + plugin_token
+
+            return AgentOutput(output=solver_output.content, cost=total_cost, token_usage=total_token)
 
     def stream(self, instruction: str, output: Optional[BaseOutput] = None):
         """
@@ -303,7 +346,8 @@ class RewooAgent(BaseAgent):
         plan_to_es, plans = self._parse_plan_map(planner_output)
         planner_evidences, evidence_level = self._parse_planner_evidences(planner_output)
 
-        worker_evidences, _, _ = self._get_worker_evidence(planner_evidences, evidence_level, output=output)
+        with self._execution_context():
+            worker_evidences, _, _ = self._get_worker_evidence(planner_evidences, evidence_level, output=output)
         worker_log = ""
         for plan in plan_to_es:
             worker_log += f"{plan}: {plans[plan]}\n"
@@ -8,6 +8,7 @@ from gentopia.model.completion_model import BaseCompletion
 from gentopia.output.base_output import BaseOutput
 from gentopia.prompt.rewoo import *
 from gentopia.tools import BaseTool
+from gentopia.utils.tracing import traced
 import logging
 
 
@@ -61,6 +62,7 @@ class Planner(BaseModel):
             else:
                 return ZeroShotPlannerPrompt.format(tool_description=worker_desctription, task=instruction)
 
+    @traced("planner", name="Planner.run")
     def run(self, instruction: str, output: BaseOutput = BaseOutput()) -> BaseCompletion:
 
         output.info("Running Planner")
@@ -6,6 +6,7 @@ from gentopia.llm.base_llm import BaseLLM
 from gentopia.model.completion_model import BaseCompletion
 from gentopia.output.base_output import BaseOutput
 from gentopia.prompt.rewoo import *
+from gentopia.utils.tracing import traced
 import logging
 
 
@@ -39,6 +40,7 @@ class Solver(BaseModel):
             else:
                 return ZeroShotSolverPrompt.format(plan_evidence=plan_evidence, task=instruction)
 
+    @traced("solver", name="Solver.run")
     def run(self, instruction: str, plan_evidence: str, output: BaseOutput = BaseOutput()) -> BaseCompletion:
         output.info("Running Solver")
         output.debug(f"Instruction: {instruction}")
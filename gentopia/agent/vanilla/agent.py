@@ -10,7 +10,9 @@ from gentopia.model.agent_model import AgentType
 from gentopia.output.base_output import BaseOutput
 from gentopia.prompt.vanilla import *
 from gentopia.utils.cost_helpers import *
+from gentopia.utils.execution import charge
 from gentopia.utils.text_helpers import *
+from gentopia.utils.tracing import traced
 
 
 class VanillaAgent(BaseAgent):
@@ -76,6 +78,7 @@ class VanillaAgent(BaseAgent):
             else:
                 return FewShotVanillaPrompt.format(fewshot=fewshot, instruction=instruction)
 
+    @traced("agent")
     def run(self, instruction: str, output: Optional[BaseOutput] = None) -> AgentOutput:
         """Run the agent given an instruction.
 
@@ -86,21 +89,24 @@ class VanillaAgent(BaseAgent):
         :return: AgentOutput object containing the output, cost and token usage.
         :rtype: AgentOutput
         """
-        prompt = self._compose_prompt(instruction)
-        if output is None:
-            output = BaseOutput()
-        output.thinking(self.name)
-        response = self.llm.completion(prompt)
-        output.done()
-        output.print(response.content)
-        total_cost = calculate_cost(self.llm.model_name, response.prompt_token,
-                                    response.completion_token)
-        total_token = response.prompt_token + response.completion_token
+        with self._execution_context() as ctx:
+            ctx.check()
+            prompt = self._compose_prompt(instruction)
+            if output is None:
+                output = BaseOutput()
+            output.thinking(self.name)
+            response = self.llm.completion(prompt)
+            output.done()
+            output.print(response.content)
+            total_cost = calculate_cost(self.llm.model_name, response.prompt_token,
+                                        response.completion_token)
+            charge(total_cost)
+            total_token = response.prompt_token + response.completion_token
 
-        return AgentOutput(
-            output=response.content,
-            cost=total_cost,
-            token_usage=total_token)
+            return AgentOutput(
+                output=response.content,
+                cost=total_cost,
+                token_usage=total_token)
 
     def stream(self, instruction: str, output: Optional[BaseOutput] = None):
         """Stream the agent given an instruction.
@@ -1,14 +1,51 @@
+import functools
+import inspect
 from abc import ABC, abstractmethod
-from typing import Generator
+from typing import Any, Callable, Dict, Generator, Tuple
 from pydantic import BaseModel
 from gentopia.model.completion_model import BaseCompletion, ChatCompletion
 from gentopia.model.param_model import BaseParamModel
+from gentopia.utils.single_flight import SingleFlight, make_key
+
+_flight = SingleFlight()
+
+
+def coalesced(fn: Callable) -> Callable:
+    """Decorator sharing one call of an LLM method between identical concurrent calls (same client class,
+    model, parameters and arguments), see :mod:`gentopia.utils.single_flight`. Streaming methods fan the
+    same chunks out to every caller. Enabled by setting the client's `coalesce` to True.
+    """
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(self, *args, **kwargs):
+            if not self.coalesce:
+                yield from fn(self, *args, **kwargs)
+                return
+            key = self._flight_key(fn.__name__, args, kwargs)
+            yield from _flight.stream(key, lambda: fn(self, *args, **kwargs))
+
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if not self.coalesce:
+            return fn(self, *args, **kwargs)
+        return _flight.do(self._flight_key(fn.__name__, args, kwargs), lambda: fn(self, *args, **kwargs))
+
+    return wrapper
 
 
 class BaseLLM(ABC, BaseModel):
 
     model_name: str
     params: BaseParamModel
+    coalesce: bool = False
+    """Whether identical concurrent calls share one request, see :func:`coalesced`. Off by default: with a
+    temperature above 0, callers sharing a request get the same sample rather than independent ones."""
+
+    def _flight_key(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> str:
+        return make_key(type(self).__name__, self.get_model_name(), self.get_model_param().dict(),
+                        method, args, kwargs)
 
     @abstractmethod
     def get_model_name(self) -> str:
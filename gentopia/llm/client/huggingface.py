@@ -13,6 +13,7 @@ from pydantic import validator
 from gentopia.llm.base_llm import BaseLLM
 from gentopia.model.completion_model import *
 from gentopia.model.param_model import *
+from gentopia.utils.tracing import traced
 
 # Load model data from resource
 model_data = json.load(
@@ -173,6 +174,7 @@ class HuggingfaceLLMClient(BaseLLM, BaseModel):
         model_loader = HuggingfaceLoader(model_name=self.model_name, device=self.device)
         return model_loader.get_model_info()
 
+    @traced("llm")
     def completion(self, prompt: str, **kwargs) -> BaseCompletion:
         """
         Generate completion.
@@ -221,6 +223,7 @@ class HuggingfaceLLMClient(BaseLLM, BaseModel):
         # Maybe this is not needed.
         raise NotImplementedError("chat_completion is not supported for Huggingface LLM")
 
+    @traced("llm")
     def stream_chat_completion(self, prompt, **kwargs) -> Generator:
         """
         Stream output of Huggingface LLM for chat completion.
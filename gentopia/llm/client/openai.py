@@ -1,31 +1,66 @@
+import asyncio
+import inspect
 import os
-from typing import List, Callable
+import weakref
+from typing import Any, AsyncGenerator, Dict, List, Callable, Optional, Tuple
 
+import aiohttp
 import openai
+from pydantic import Field
 
-from gentopia.llm.base_llm import BaseLLM
+from gentopia.llm.base_llm import BaseLLM, coalesced
 from gentopia.llm.llm_info import *
 from gentopia.model.agent_model import AgentOutput
 from gentopia.model.completion_model import *
 from gentopia.model.param_model import *
 import json
 
+from gentopia.utils.single_flight import make_key
+from gentopia.utils.tracing import traced
+
+# One pooled HTTP session per event loop for the async methods, as aiohttp sessions are bound to their loop.
+_aiosessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _aiosession() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _aiosessions.get(loop)
+    if session is None or session.closed:
+        session = _aiosessions[loop] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100))
+    return session
+
+
+async def close_aiosession():
+    """Close the pooled HTTP session of the running event loop, e.g. before the loop shuts down."""
+    session = _aiosessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
 
 class OpenAIGPTClient(BaseLLM, BaseModel):
     """
     Wrapper class for OpenAI GPT API collections.
 
+    The ``a``-prefixed methods are async variants of the others. They share one pooled HTTP session per
+    event loop, so many calls (e.g. parallel ReWOO solvers or evaluation batches) can run concurrently, e.g.
+    with ``asyncio.gather``; they do not coalesce identical calls, even with `coalesce` set.
+
     :param model_name: The name of the model to use.
     :type model_name: str
     :param params: The parameters for the model.
     :type params: OpenAIParamModel
+    :param api_key: The API key of this client, defaults to the OPENAI_API_KEY environment variable.
+    :type api_key: Optional[str]
     """
     model_name: str
     params: OpenAIParamModel = OpenAIParamModel()
+    api_key: Optional[str] = Field(default_factory=lambda: os.environ.get("OPENAI_API_KEY"), repr=False,
+                                   exclude=True)
 
-    def __init__(self, **data):
-        super().__init__(**data)
-        openai.api_key = os.environ.get("OPENAI_API_KEY", "")
+    def _flight_key(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> str:
+        # clients with different keys never share a request, which would be billed to the other key
+        return make_key(super()._flight_key(method, args, kwargs), self.api_key)
 
     def get_model_name(self) -> str:
         return self.model_name
@@ -33,6 +68,8 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
     def get_model_param(self) -> OpenAIParamModel:
         return self.params
 
+    @traced("llm")
+    @coalesced
     def completion(self, prompt: str, **kwargs) -> BaseCompletion:
         """
         Completion method for OpenAI GPT API.
@@ -47,6 +84,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
         """
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
                 n=self.params.n,
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
@@ -65,6 +103,8 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
             print("Exception:", exception)
             return BaseCompletion(state="error", content=exception)
 
+    @traced("llm")
+    @coalesced
     def chat_completion(self, message: List[dict]) -> ChatCompletion:
         """
         Chat completion method for OpenAI GPT API.
@@ -76,6 +116,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
         """
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
                 n=self.params.n,
                 model=self.model_name,
                 messages=message,
@@ -94,6 +135,8 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
             print("Exception:", exception)
             return ChatCompletion(state="error", content=exception)
 
+    @traced("llm")
+    @coalesced
     def stream_chat_completion(self, message: List[dict],  **kwargs):
         """
         Stream output chat completion for OpenAI GPT API.
@@ -107,6 +150,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
         """
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
                 n=self.params.n,
                 model=self.model_name,
                 messages=message,
@@ -132,6 +176,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
             print("Exception:", exception)
             return ChatCompletion(state="error", content=exception)
 
+    @traced("llm")
     def function_chat_completion(self, message: List[dict],
                                  function_map: Dict[str, Callable],
                                  function_schema: List[Dict]) -> ChatCompletionWithHistory:
@@ -150,6 +195,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
         assert len(function_schema) == len(function_map)
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
                 n=self.params.n,
                 model=self.model_name,
                 messages=message,
@@ -184,6 +230,7 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
                                 "name": function_name,
                                 "content": function_response})
                 second_response = openai.ChatCompletion.create(
+                    api_key=self.api_key,
                     model=self.model_name,
                     messages=message,
                 )
@@ -212,12 +259,14 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
             print("Exception:", exception)
             return ChatCompletionWithHistory(state="error", content=str(exception))
 
+    @traced("llm")
     def function_chat_stream_completion(self, message: List[dict],
                                         function_map: Dict[str, Callable],
                                         function_schema: List[Dict]) -> ChatCompletionWithHistory:
         assert len(function_schema) == len(function_map)
         try:
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
                 n=self.params.n,
                 model=self.model_name,
                 messages=message,
@@ -269,3 +318,174 @@ class OpenAIGPTClient(BaseLLM, BaseModel):
             raise exception
             print("Exception:", exception)
             return ChatCompletion(state="error", content=str(exception))
+
+    async def _acreate(self, message: List[dict], **kwargs):
+        """Async ``ChatCompletion`` request with this client's model, parameters and key, sent over the pooled
+        session of the running event loop."""
+        token = openai.aiosession.set(_aiosession())
+        try:
+            return await openai.ChatCompletion.acreate(
+                api_key=self.api_key,
+                n=self.params.n,
+                model=self.model_name,
+                messages=message,
+                temperature=self.params.temperature,
+                max_tokens=self.params.max_tokens,
+                top_p=self.params.top_p,
+                frequency_penalty=self.params.frequency_penalty,
+                presence_penalty=self.params.presence_penalty,
+                **kwargs
+            )
+        finally:
+            openai.aiosession.reset(token)
+
+    @traced("llm")
+    async def acompletion(self, prompt: str, **kwargs) -> BaseCompletion:
+        """
+        Async variant of :meth:`completion`.
+
+        :param prompt: The prompt to use for completion.
+        :type prompt: str
+        :param kwargs: Additional keyword arguments.
+        :type kwargs: dict
+        :return: BaseCompletion object.
+        :rtype: BaseCompletion
+        """
+        try:
+            response = await self._acreate([{"role": "user", "content": prompt}], **kwargs)
+            return BaseCompletion(state="success",
+                                  content=response.choices[0].message["content"],
+                                  prompt_token=response.get("usage", {}).get("prompt_tokens", 0),
+                                  completion_token=response.get("usage", {}).get("completion_tokens", 0))
+        except Exception as exception:
+            print("Exception:", exception)
+            return BaseCompletion(state="error", content=exception)
+
+    @traced("llm")
+    async def achat_completion(self, message: List[dict]) -> ChatCompletion:
+        """
+        Async variant of :meth:`chat_completion`.
+
+        :param message: The message to use for completion.
+        :type message: List[dict]
+        :return: ChatCompletion object.
+        :rtype: ChatCompletion
+        """
+        try:
+            response = await self._acreate(message)
+            return ChatCompletion(state="success",
+                                  role=response.choices[0].message["role"],
+                                  content=response.choices[0].message["content"],
+                                  prompt_token=response.get("usage", {}).get("prompt_tokens", 0),
+                                  completion_token=response.get("usage", {}).get("completion_tokens", 0))
+        except Exception as exception:
+            print("Exception:", exception)
+            return ChatCompletion(state="error", content=exception)
+
+    @traced("llm")
+    async def astream_chat_completion(self, message: List[dict], **kwargs) -> AsyncGenerator[ChatCompletion, None]:
+        """
+        Async variant of :meth:`stream_chat_completion`.
+
+        :param message: The message (scratchpad) to use for completion. Usually contains json of role and content.
+        :type message: List[dict]
+        :param kwargs: Additional keyword arguments.
+        :type kwargs: dict
+        :return: Async generator of ChatCompletion objects, one per chunk.
+        :rtype: AsyncGenerator[ChatCompletion, None]
+        """
+        try:
+            response = await self._acreate(message, stream=True, **kwargs)
+            role = None
+            async for resp in response:
+                if role is None:
+                    role = resp.choices[0].delta["role"]
+                    continue
+                yield ChatCompletion(state="success",
+                                     role=role,
+                                     content=resp.choices[0].delta.get("content", ""),
+                                     prompt_token=0,
+                                     completion_token=0)
+        except Exception as exception:
+            print("Exception:", exception)
+            yield ChatCompletion(state="error", content=str(exception))
+
+    @traced("llm")
+    async def afunction_chat_completion(self, message: List[dict],
+                                        function_map: Dict[str, Callable],
+                                        function_schema: List[Dict]) -> ChatCompletionWithHistory:
+        """
+        Async variant of :meth:`function_chat_completion`. Coroutine functions in `function_map` are awaited;
+        other functions run in a worker thread so they do not block the event loop.
+
+        :param message: The message to use for completion.
+        :type message: List[dict]
+        :param function_map: The function map to use for completion.
+        :type function_map: Dict[str, Callable]
+        :param function_schema: The function schema to use for completion.
+        :type function_schema: List[Dict]
+        :return: ChatCompletionWithHistory object.
+        :rtype: ChatCompletionWithHistory
+        """
+        assert len(function_schema) == len(function_map)
+        try:
+            response = await self._acreate(message, functions=function_schema)
+            response_message = response.choices[0]["message"]
+
+            if response_message.get("function_call"):
+                function_name = response_message["function_call"]["name"]
+                fuction_to_call = function_map[function_name]
+                function_args = json.loads(response_message["function_call"]["arguments"])
+                if inspect.iscoroutinefunction(fuction_to_call):
+                    function_response = await fuction_to_call(**function_args)
+                else:
+                    function_response = await asyncio.to_thread(fuction_to_call, **function_args)
+
+                # Postprocess function response
+                if isinstance(function_response, str):
+                    plugin_cost = 0
+                    plugin_token = 0
+                elif isinstance(function_response, AgentOutput):
+                    plugin_cost = function_response.cost
+                    plugin_token = function_response.token_usage
+                    function_response = function_response.output
+                else:
+                    raise Exception("Invalid tool response type. Must be on of [AgentOutput, str]")
+
+                message.append(dict(response_message))
+                message.append({"role": "function",
+                                "name": function_name,
+                                "content": function_response})
+                token = openai.aiosession.set(_aiosession())
+                try:
+                    second_response = await openai.ChatCompletion.acreate(
+                        api_key=self.api_key,
+                        model=self.model_name,
+                        messages=message,
+                    )
+                finally:
+                    openai.aiosession.reset(token)
+                message.append(dict(second_response.choices[0].message))
+                return ChatCompletionWithHistory(state="success",
+                                                 role=second_response.choices[0].message["role"],
+                                                 content=second_response.choices[0].message["content"],
+                                                 prompt_token=response.get("usage", {}).get("prompt_tokens", 0) +
+                                                              second_response.get("usage", {}).get("prompt_tokens", 0),
+                                                 completion_token=response.get("usage", {}).get("completion_tokens", 0) +
+                                                                  second_response.get("usage", {}).get("completion_tokens", 0),
+                                                 message_scratchpad=message,
+                                                 plugin_cost=plugin_cost,
+                                                 plugin_token=plugin_token,
+                                                 )
+            else:
+                message.append(dict(response_message))
+                return ChatCompletionWithHistory(state="success",
+                                                 role=response.choices[0].message["role"],
+                                                 content=response.choices[0].message["content"],
+                                                 prompt_token=response.get("usage", {}).get("prompt_tokens", 0),
+                                                 completion_token=response.get("usage", {}).get("completion_tokens", 0),
+                                                 message_scratchpad=message)
+
+        except Exception as exception:
+            print("Exception:", exception)
+            return ChatCompletionWithHistory(state="error", content=str(exception))
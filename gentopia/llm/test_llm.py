@@ -1,4 +1,9 @@
-from typing import Generator
+import itertools
+import re
+import time
+from typing import Generator, List
+
+from pydantic import PrivateAttr
 
 from gentopia.llm.base_llm import BaseLLM
 from gentopia.model.completion_model import ChatCompletion, BaseCompletion
@@ -6,23 +11,52 @@ from gentopia.model.param_model import BaseParamModel
 
 
 class TestLLM(BaseLLM):
+    """
+    Scripted LLM for offline tests and benchmarks. Every call returns the next canned response (cycling
+    through `responses`) after sleeping `latency` seconds.
+
+    :param responses: Canned responses returned in order, e.g. a planner output followed by a solver output.
+    :type responses: List[str]
+    :param latency: Simulated latency of each call in seconds, defaults to 0.
+    :type latency: float
+    :param prompt_token: Prompt tokens reported for each call.
+    :type prompt_token: int
+    :param completion_token: Completion tokens reported for each call.
+    :type completion_token: int
+    """
     model_name: str = "test"
+    params: BaseParamModel = BaseParamModel()
     model_param: BaseParamModel = BaseParamModel()
+    responses: List[str] = ["test"]
+    latency: float = 0.0
+    prompt_token: int = 0
+    completion_token: int = 0
+    _calls = PrivateAttr(default_factory=itertools.count)
 
     def get_model_name(self) -> str:
         return self.model_name
 
     def get_model_param(self) -> BaseParamModel:
-        pass
+        return self.model_param
 
-    def completion(self, prompt) -> BaseCompletion:
-        return BaseCompletion(state="success", content="test")
+    def _next_response(self) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responses[next(self._calls) % len(self.responses)]
 
-    def chat_completion(self, message) -> ChatCompletion:
-        pass
+    def reset(self):
+        """Restart the script from the first response."""
+        self._calls = itertools.count()
 
-    def stream_chat_completion(self, prompt) -> Generator:
-        pass
+    def completion(self, prompt, **kwargs) -> BaseCompletion:
+        return BaseCompletion(state="success", content=self._next_response(),
+                              prompt_token=self.prompt_token, completion_token=self.completion_token)
 
-    model_name: str = "test"
-    model_param: BaseParamModel
+    def chat_completion(self, message, **kwargs) -> ChatCompletion:
+        return ChatCompletion(state="success", content=self._next_response(),
+                              prompt_token=self.prompt_token, completion_token=self.completion_token)
+
+    def stream_chat_completion(self, prompt, **kwargs) -> Generator:
+        content = self._next_response()
+        for token in re.findall(r"\S+\s*|\s+", content):
+            yield ChatCompletion(state="success", content=token)
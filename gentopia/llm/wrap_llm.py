@@ -1,11 +1,14 @@
-from typing import Generator
+from typing import Any, Dict, Generator, Tuple
 
-from gentopia.llm.base_llm import BaseLLM
+from gentopia.llm.base_llm import BaseLLM, coalesced
 from gentopia.manager.base_llm_manager import BaseServerInfo
 from gentopia.model.completion_model import ChatCompletion, BaseCompletion
 from gentopia.model.param_model import BaseParamModel
 import requests
 
+from gentopia.utils.single_flight import make_key
+from gentopia.utils.tracing import traced
+
 
 class WrapLLM(BaseLLM):
     server: BaseServerInfo
@@ -16,6 +19,11 @@ class WrapLLM(BaseLLM):
     def get_model_param(self) -> BaseParamModel:
         return self.params
 
+    def _flight_key(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> str:
+        return make_key(self.server.host, self.server.port, super()._flight_key(method, args, kwargs))
+
+    @traced("llm")
+    @coalesced
     def completion(self, prompt) -> BaseCompletion:
         url = f"http://{self.server.host}:{self.server.port}/completion"
         data = {"prompt": prompt}
@@ -27,6 +35,8 @@ class WrapLLM(BaseLLM):
     def chat_completion(self, message) -> ChatCompletion:
         pass
 
+    @traced("llm")
+    @coalesced
     def stream_chat_completion(self, prompt) -> BaseCompletion:
         url = f"http://{self.server.host}:{self.server.port}/stream_chat_completion"
         data = {"prompt": prompt}
@@ -1,5 +1,5 @@
 from typing import AnyStr
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 import uvicorn
 from fastapi import FastAPI
 
@@ -7,16 +7,19 @@ from gentopia.manager.llm_client.base_llm_client import BaseLLMClient
 from gentopia.manager.server_info import LocalServerInfo
 
 from gentopia.model.completion_model import BaseCompletion
+from gentopia.utils.metrics import enable_metrics
 
 
 class LocalLLMClient(BaseLLMClient):
     def __init__(self, server: LocalServerInfo, llm):
         self.server_info = server
         self.llm = llm
+        self.metrics = enable_metrics()
         self.router.add_api_route("/shutdown", self.shutdown, methods=["GET"])
         self.router.add_api_route("/completion", self.completion, methods=["POST"])
         self.router.add_api_route("/stream_chat_completion", self.stream_chat_completion, methods=["POST"])
         self.router.add_api_route("/test", self.completion, methods=["GET"])
+        self.router.add_api_route("/metrics", self.get_metrics, methods=["GET"])
         self.app = FastAPI()
         self.app.include_router(self.router)
         self.config = uvicorn.Config(self.app, host=server.host, port=server.port, log_level=server.log_level)
@@ -37,6 +40,10 @@ class LocalLLMClient(BaseLLMClient):
             raise e
         return x
 
+    def get_metrics(self) -> PlainTextResponse:
+        """Serve request/error counters, latency histograms, throughput and cost in Prometheus text format."""
+        return PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4")
+
     def test(self) -> str:
         return "test"
 
@@ -6,6 +6,7 @@ from gentopia.memory.embeddings import OpenAIEmbeddings
 from gentopia.llm.base_llm import BaseLLM
 from gentopia import PromptTemplate
 from gentopia.output.base_output import BaseOutput
+from gentopia.utils.tracing import traced
 import pydantic
 import os
 import queue
@@ -101,6 +102,7 @@ class MemoryWrapper:
         """
         self.memory.save_context(io_obj[0], io_obj[1]) # (input, output)
     
+    @traced("memory", name="MemoryWrapper.save_memory_I")
     def save_memory_I(self, query, response, output: BaseOutput):
         """
         Save the conversation to memory (level I).
@@ -122,6 +124,7 @@ class MemoryWrapper:
             # self.summary_I += llm.completion(prompt=SummaryPrompt.format(rank=top_context[2], input=top_context[0], output=top_context[1])).content + "\n"
         output.done()
 
+    @traced("memory", name="MemoryWrapper.save_memory_II")
     def save_memory_II(self, query, response, output: BaseOutput, llm: BaseLLM):
         """
         Save the conversation to memory (level II).
@@ -191,6 +194,7 @@ class MemoryWrapper:
         self.rank_II = 0
  
     
+    @traced("memory", name="MemoryWrapper.load_history")
     def load_history(self, input):
         """
         Load history from memory.
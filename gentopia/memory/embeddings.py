@@ -26,11 +26,14 @@ from tenacity import (
     wait_exponential,
 )
 from gentopia.memory.utils import get_from_dict_or_env
+from gentopia.utils.single_flight import SingleFlight, make_key
 
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+_flight = SingleFlight()
+
 
 class Embeddings(ABC):
     """Interface for embedding models."""
@@ -187,6 +190,8 @@ class OpenAIEmbeddings(BaseModel, Embeddings):
     request_timeout: Optional[Union[float, Tuple[float, float]]] = None
     """Timeout in seconds for the OpenAPI request."""
     headers: Any = None
+    coalesce: bool = False
+    """Whether identical concurrent embedding requests share one API call."""
 
     class Config:
         """Configuration for this pydantic object."""
@@ -265,6 +270,11 @@ class OpenAIEmbeddings(BaseModel, Embeddings):
             }  # type: ignore[assignment]  # noqa: E501
         return openai_args
 
+    def _flight_key(self, kind: str, texts: Union[str, List[str]]) -> str:
+        """Identity of an embedding request: model, endpoint, credentials and input."""
+        return make_key(kind, self.model, self.deployment, self.openai_api_base, self.openai_api_type,
+                        self.openai_api_version, self.openai_api_key, self.openai_organization, texts)
+
     # please refer to
     # https://github.com/openai/openai-cookbook/blob/main/examples/Embedding_long_inputs.ipynb
     def _get_len_safe_embeddings(
@@ -448,7 +458,10 @@ class OpenAIEmbeddings(BaseModel, Embeddings):
         """
         # NOTE: to keep things simple, we assume the list may contain texts longer
         #       than the maximum context and use length-safe embedding function.
-        return self._get_len_safe_embeddings(texts, engine=self.deployment)
+        if not self.coalesce:
+            return self._get_len_safe_embeddings(texts, engine=self.deployment)
+        return _flight.do(self._flight_key("documents", texts),
+                          lambda: self._get_len_safe_embeddings(texts, engine=self.deployment))
 
     async def aembed_documents(
         self, texts: List[str], chunk_size: Optional[int] = 0
@@ -479,8 +492,10 @@ class OpenAIEmbeddings(BaseModel, Embeddings):
         :return: Embedding for the text.
         :rtype: List[float]
         """
-        embedding = self._embedding_func(text, engine=self.deployment)
-        return embedding
+        if not self.coalesce:
+            return self._embedding_func(text, engine=self.deployment)
+        return _flight.do(self._flight_key("query", text),
+                          lambda: self._embedding_func(text, engine=self.deployment))
 
     async def aembed_query(self, text: str) -> List[float]:
         """
@@ -17,6 +17,8 @@ class ArxivSearch(BaseTool):
         "Input should be a search query."
     )
     args_schema: Optional[Type[BaseModel]] = ArxivSearchArgs
+    cacheable = True
+    cache_ttl = 3600.0
     top_k: int = 5
     maxlen_per_page = 2000
 
@@ -43,6 +45,9 @@ class ArxivSearch(BaseTool):
         else:
             return "No Arxiv Result was found"
 
+    def _should_cache(self, observation: Any) -> bool:
+        return not observation.startswith("Arxiv exception")
+
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
 
@@ -1,7 +1,10 @@
 """Base implementation for tools or skills. """
 from __future__ import annotations
 
+import asyncio
+import copy
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from inspect import signature, iscoroutinefunction
 from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, Union
 
@@ -14,6 +17,10 @@ from pydantic import (
 )
 from pydantic.main import ModelMetaclass
 
+from gentopia.tools.utils.cache import cache_key, get_tool_cache
+from gentopia.utils.execution import current_context, DeadlineExceeded, run_with_timeout
+from gentopia.utils.tracing import traced
+
 
 class SchemaAnnotationError(TypeError):
     """Raised when 'args_schema' is missing or has an incorrect type annotation."""
@@ -101,6 +108,23 @@ def create_schema_from_function(
     )
 
 
+@lru_cache(maxsize=None)
+def _schema_properties(args_schema: Type[BaseModel]) -> dict:
+    return args_schema.schema()["properties"]
+
+
+# Tool class -> argument properties inferred from its `_run` signature.
+_inferred_args: Dict[type, dict] = {}
+
+
+class _Uncached(Exception):
+    """Carries a result rejected by `BaseTool._should_cache` out of the cache computation, so it is not stored."""
+
+    def __init__(self, observation: Any):
+        super().__init__()
+        self.observation = observation
+
+
 class ToolException(Exception):
     """An optional exception that tool throws when execution error occurs.
 
@@ -132,6 +156,16 @@ class BaseTool(ABC, BaseModel, metaclass=ToolMetaclass):
     ] = False
     """Handle the content of the ToolException thrown."""
 
+    cacheable: bool = False
+    """Whether results may be cached: the tool is deterministic for the same input and has no side effects."""
+
+    cache_ttl: Optional[float] = None
+    """Seconds a cached result stays valid, None for forever. Only used if `cacheable`."""
+
+    timeout: Optional[float] = None
+    """Wall-clock limit of a call in seconds, None for no limit other than the enclosing deadline, see
+    :mod:`gentopia.utils.execution`."""
+
     class Config:
         """Configuration for this pydantic object."""
 
@@ -141,16 +175,23 @@ class BaseTool(ABC, BaseModel, metaclass=ToolMetaclass):
     @property
     def is_single_input(self) -> bool:
         """Whether the tool only accepts a single input."""
-        keys = {k for k in self.args if k != "kwargs"}
+        keys = {k for k in self._shared_args() if k != "kwargs"}
         return len(keys) == 1
 
     @property
     def args(self) -> dict:
+        """Argument properties of the tool. A copy: the properties are cached per schema class, or per tool
+        class when inferred from `_run`, and shared by all instances."""
+        return copy.deepcopy(self._shared_args())
+
+    def _shared_args(self) -> dict:
         if self.args_schema is not None:
-            return self.args_schema.schema()["properties"]
-        else:
+            return _schema_properties(self.args_schema)
+        args = _inferred_args.get(type(self))
+        if args is None:
             schema = create_schema_from_function(self.name, self._run)
-            return schema.schema()["properties"]
+            args = _inferred_args[type(self)] = schema.schema()["properties"]
+        return args
 
     def _parse_input(
             self,
@@ -193,6 +234,34 @@ class BaseTool(ABC, BaseModel, metaclass=ToolMetaclass):
         else:
             return (), tool_input
 
+    def _should_cache(self, observation: Any) -> bool:
+        """Whether a result may be cached. Tools reporting failures as results, rather than raising, override
+        this to reject them, so that a transient failure is not served to every caller for `cache_ttl`."""
+        return True
+
+    def _checked(self, observation: Any) -> Any:
+        if not self._should_cache(observation):
+            raise _Uncached(observation)
+        return observation
+
+    def _cache_key(self, tool_input: Union[str, Dict]) -> str:
+        """Key of a call: tool name, tool parameters and parsed input. Only plain-data fields count as
+        parameters; clients and other objects a tool keeps as fields are left out."""
+        params = {k: v for k, v in self.dict(exclude=set(BaseTool.__fields__), exclude_none=True).items()
+                  if isinstance(v, (str, int, float, bool, list, tuple, dict))}
+        return cache_key(self.name, params, tool_input)
+
+    async def _arun_with_timeout(self, tool_args: Tuple, tool_kwargs: Dict) -> Any:
+        """Await `_arun` within `timeout` and the enclosing deadline."""
+        ctx = current_context()
+        if ctx is not None:
+            ctx.check()
+        timeout = self.timeout if ctx is None else ctx.clamp(self.timeout)
+        try:
+            return await asyncio.wait_for(self._arun(*tool_args, **tool_kwargs), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{self.name} timed out")
+
     def _handle_tool_error(self, e: ToolException) -> Any:
         """Handle the content of the ToolException thrown."""
         observation = None
@@ -214,19 +283,29 @@ class BaseTool(ABC, BaseModel, metaclass=ToolMetaclass):
             )
         return observation
 
+    @traced("tool")
     def run(
             self,
             tool_input: Union[str, Dict],
             verbose: Optional[bool] = None,
+            cacheable: Optional[bool] = None,
             **kwargs: Any,
     ) -> Any:
-        """Run the tool."""
+        """Run the tool. `cacheable` overrides the tool's `cacheable` for this call."""
         parsed_input = self._parse_input(tool_input)
         verbose_ = verbose if not self.verbose and verbose is not None else self.verbose
         # TODO (verbose_): Add logging
         try:
             tool_args, tool_kwargs = self._to_args_and_kwargs(parsed_input)
-            observation = self._run(*tool_args, **tool_kwargs)
+            call = lambda: run_with_timeout(lambda: self._run(*tool_args, **tool_kwargs), self.timeout)
+            if self.cacheable if cacheable is None else cacheable:
+                try:
+                    observation = get_tool_cache().get_or_compute(self._cache_key(parsed_input), self.cache_ttl,
+                                                                  lambda: self._checked(call()))
+                except _Uncached as e:
+                    observation = e.observation
+            else:
+                observation = call()
         except ToolException as e:
             observation = self._handle_tool_error(e)
             return observation
@@ -237,16 +316,27 @@ class BaseTool(ABC, BaseModel, metaclass=ToolMetaclass):
             self,
             tool_input: Union[str, Dict],
             verbose: Optional[bool] = None,
+            cacheable: Optional[bool] = None,
             **kwargs: Any,
     ) -> Any:
-        """Run the tool asynchronously."""
+        """Run the tool asynchronously. `cacheable` overrides the tool's `cacheable` for this call."""
         parsed_input = self._parse_input(tool_input)
         verbose_ = verbose if not self.verbose and verbose is not None else self.verbose
         # TODO (verbose_): Add logging
         try:
             # We then call the tool on the tool input to get an observation
             tool_args, tool_kwargs = self._to_args_and_kwargs(parsed_input)
-            observation = await self._arun(*tool_args, **tool_kwargs)
+            if self.cacheable if cacheable is None else cacheable:
+                async def call():
+                    return self._checked(await self._arun_with_timeout(tool_args, tool_kwargs))
+
+                try:
+                    observation = await get_tool_cache().aget_or_compute(self._cache_key(parsed_input),
+                                                                         self.cache_ttl, call)
+                except _Uncached as e:
+                    observation = e.observation
+            else:
+                observation = await self._arun_with_timeout(tool_args, tool_kwargs)
         except ToolException as e:
             observation = self._handle_tool_error(e)
             return observation
@@ -1,12 +1,32 @@
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import AnyStr
+from typing import AnyStr, List
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
+from gentopia.tools.utils.cache import MemoryCache, ToolCache
+from gentopia.utils.single_flight import make_key
 from .basetool import *
 
+# Status codes worth retrying: rate limiting and server errors.
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Shared by all BingAPI instances, which pydantic copies into every tool.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_maxsize=16))
+_session.mount("http://", HTTPAdapter(pool_maxsize=16))
+_cache = ToolCache(MemoryCache(maxsize=512))
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gentopia-bing")
+
+
+class _PageUnavailable(Exception):
+    pass
+
 
 class BingAPI:
     """
@@ -23,10 +43,17 @@ class BingAPI:
         Initialize the BingSearch instance with the given subscription key.
     search_top3(self, key_words: str) -> List[str]:
         Perform a search on the Bing search engine with the given keywords and return the top 3 search results.
-    load_page_index(self, idx: int) -> str:
-        Load the detailed page of the search result at the given index.
+    load_page(self, url: str) -> Tuple[bool, str]:
+        Load the detailed page at the given url.
+    prefetch(self, urls: List[str]) -> None:
+        Start loading the given pages in the background.
+
+    Connections are pooled, failed requests are retried with jittered exponential backoff, and search
+    results and pages are cached for a while. Concurrent loads of the same page share one request, so a
+    page being prefetched is not fetched a second time.
     """
-    def __init__(self, subscription_key : str) -> None:
+    def __init__(self, subscription_key : str, search_ttl : Optional[float] = 600.0,
+                 page_ttl : Optional[float] = 600.0, max_page_bytes : int = 1 << 20) -> None:
         """
         Initialize the BingSearch instance with the given subscription key.
 
@@ -34,58 +61,94 @@ class BingAPI:
         ----------
         subscription_key : str
             The subscription key to use for the Bing API.
+        search_ttl : Optional[float]
+            Seconds search results are reused for the same query, None for forever.
+        page_ttl : Optional[float]
+            Seconds loaded pages are reused, None for forever.
+        max_page_bytes : int
+            Maximum number of bytes read from a page.
         """
         self._headers = {
             'Ocp-Apim-Subscription-Key': subscription_key
         }
         self._endpoint = "https://api.bing.microsoft.com/v7.0/search"
         self._mkt = 'en-US'
-    
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.max_page_bytes = max_page_bytes
+
     def search(self, key_words : str, max_retry : int = 3):
-        for _ in range(max_retry):
-            try:
-                result = requests.get(self._endpoint, headers=self._headers, params={'q': key_words, 'mkt': self._mkt }, timeout=10)
-            except Exception:
-                # failed, retry
-                continue
+        key = make_key(self._endpoint, self._mkt, key_words)
+        return _cache.get_or_compute(key, self.search_ttl, lambda: self._search(key_words, max_retry))
+
+    def _search(self, key_words : str, max_retry : int):
+        result = self._get(self._endpoint, max_retry, 10, headers=self._headers,
+                           params={'q': key_words, 'mkt': self._mkt})
+        if result is None or result.status_code != 200:
+            raise RuntimeError("Failed to access Bing Search API.")
+        with result:
+            # search result returned here
+            return result.json()
 
-            if result.status_code == 200:
-                result = result.json()
-                # search result returned here
-                return result
-            else:
-                # failed, retry
-                continue
-        raise RuntimeError("Failed to access Bing Search API.")
-    
     def load_page(self, url : str, max_retry : int = 3) -> Tuple[bool, str]:
-        for _ in range(max_retry):
-            try:
-                res = requests.get(url, timeout=15)
-                if res.status_code == 200:
-                    res.raise_for_status()
-                else:
-                    raise RuntimeError("Failed to load page, code {}".format(res.status_code))
-            except Exception:
-                # failed, retry
-                res = None
-                continue
-            res.encoding = res.apparent_encoding
-            content = res.text
-            break
-        if res is None:
-            return False, "Timeout for loading this page, Please try to load another one or search again."
         try:
-            soup = BeautifulSoup(content, 'html.parser')
-            paragraphs = soup.find_all('p')
-            page_detail = ""
-            for p in paragraphs:
-                text = p.get_text().strip()
-                page_detail += text
-            return True, page_detail
+            return True, _cache.get_or_compute(make_key("page", url, self.max_page_bytes), self.page_ttl,
+                                                    lambda: self._load_page(url, max_retry))
         except Exception:
             return False, "Timeout for loading this page, Please try to load another one or search again."
 
+    def prefetch(self, urls : List[str]) -> None:
+        for url in urls:
+            _executor.submit(self.load_page, url)
+
+    def _load_page(self, url : str, max_retry : int) -> str:
+        res = self._get(url, max_retry, 15, stream=True)
+        if res is None:
+            raise _PageUnavailable()
+        # the response is closed on every path, so failed pages do not hold on to pooled connections
+        with res:
+            if res.status_code != 200:
+                raise _PageUnavailable()
+            content = bytearray()
+            for chunk in res.iter_content(chunk_size=16384):
+                content += chunk[:self.max_page_bytes - len(content)]
+                if len(content) >= self.max_page_bytes:
+                    break
+        # without a declared charset, let BeautifulSoup detect it rather than assume ISO-8859-1 as requests does
+        declared = 'charset' in res.headers.get('Content-Type', '').lower()
+        soup = BeautifulSoup(bytes(content), 'html.parser', from_encoding=res.encoding if declared else None)
+        paragraphs = soup.find_all('p')
+        page_detail = ""
+        for p in paragraphs:
+            text = p.get_text().strip()
+            page_detail += text
+        return page_detail
+
+    def _get(self, url : str, max_retry : int, timeout : float, **kwargs) -> Optional[requests.Response]:
+        """GET `url`, retrying connection errors, rate limiting and server errors with jittered exponential
+        backoff. Returns the last response, or None if no request got one."""
+        ctx = current_context()
+        result = None
+        for attempt in range(max_retry):
+            if attempt:
+                # full jitter keeps clients throttled at the same moment from retrying in lockstep
+                delay = random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+                if ctx is not None:
+                    if ctx.wait(delay):
+                        break
+                else:
+                    time.sleep(delay)
+            try:
+                result = _session.get(url, timeout=timeout if ctx is None else ctx.clamp(timeout), **kwargs)
+            except requests.RequestException:
+                # failed, retry
+                result = None
+                continue
+            if result.status_code not in _RETRY_STATUS:
+                break
+            result.close()
+        return result
+
 
 class CONTENT_TYPE(Enum):
     SEARCH_RESULT = 0
@@ -111,16 +174,20 @@ class BingSearch(BaseTool):
 
 class BingSearchTop3(BingSearch):
     """Tool that adds the cability to query Bing search API,
-    return top-3 search results
+    return top-3 search results. The returned pages start loading in the background right away, so
+    loading them afterwards with BingSearchLoadPage rarely waits.
     """
 
     name = "BingSearchTop3"
     description = "search from Bing and return top-3 results." \
                   "Input should be a search query."
     args_schema: Optional[Type[BaseModel]] = create_model("BingSearchTop3Args", query=(str, ...))
+    prefetch_pages: bool = True
 
     def _run(self, query: AnyStr) -> AnyStr:
         top3 = self.search_all(query)[:3]
+        if self.prefetch_pages:
+            self.search_engine.prefetch([item['url'] for item in top3])
         output = ""
         for idx, item in enumerate(top3):
             output += "page: " + str(idx+1) + "\n"
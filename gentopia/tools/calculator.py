@@ -1,22 +1,154 @@
-from typing import AnyStr
+from typing import AnyStr, Dict, List, NamedTuple, Sequence
+import ast
+import decimal
+import math
+import operator
 import re
+import sys
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache
 import numexpr
+import numpy as np
 from gentopia.tools.basetool import *
-import math
 
 
 class CalculatorArgs(BaseModel):
     expression: str = Field(..., description="a mathematical expression.")
 
 
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+# Operators evaluated exactly on integers and decimals.
+_EXACT_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+              ast.Pow: operator.pow}
+
+# Functions reducing arrays, which cannot be evaluated for a batch of expressions at once.
+_REDUCTIONS = {"sum", "prod"}
+
+# Largest integer power computed exactly, in bits; larger ones are left to numexpr.
+_MAX_POWER_BITS = 1 << 16
+
+_EXACT_CONTEXT = decimal.Context(prec=50, traps=[decimal.Inexact, decimal.Overflow, decimal.InvalidOperation,
+                                                 decimal.DivisionByZero])
+
+# Exact results beyond the range of floats, or smaller than _SMALLEST_FIXED in magnitude, are printed in
+# scientific notation with this precision, as Python prints floats.
+_SCIENTIFIC_CONTEXT = decimal.Context(prec=17)
+_SMALLEST_FIXED = Decimal("1e-4")
+
+
+class _Parsed(NamedTuple):
+    tree: ast.expr
+    exact: bool
+    """Only numeric literals, + - * / ** and signs: a candidate for exact evaluation."""
+    template: str
+    """The expression with its numeric literals replaced by the variables ``_c0``, ``_c1``, ..."""
+    literals: tuple
+    batchable: bool
+    """Whether the expression reduces no arrays, so that expressions of the same template and literal types can
+    be evaluated together over arrays of their literals."""
+
+
+class _NotExact(Exception):
+    pass
+
+
+class _Templater(ast.NodeTransformer):
+    def __init__(self):
+        self.literals = []
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            self.literals.append(node.value)
+            return ast.Name(id=f"_c{len(self.literals) - 1}", ctx=ast.Load())
+        return node
+
+
+@lru_cache(maxsize=4096)
+def _parse(expression: str) -> _Parsed:
+    tree = ast.parse(expression, mode="eval").body
+    exact, reducing = True, False
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Name, ast.Call)):
+            exact = False
+            reducing |= isinstance(node, ast.Call) and getattr(node.func, "id", None) in _REDUCTIONS
+        elif isinstance(node, ast.BinOp):
+            exact &= type(node.op) in _EXACT_OPS
+        elif isinstance(node, ast.UnaryOp):
+            exact &= isinstance(node.op, (ast.USub, ast.UAdd))
+        elif not isinstance(node, (ast.Constant, ast.operator, ast.unaryop)):
+            exact = False
+    templater = _Templater()
+    template = ast.unparse(templater.visit(ast.parse(expression, mode="eval")).body)
+    return _Parsed(tree, exact, template, tuple(templater.literals), not reducing)
+
+
+def _exact_value(node: ast.expr) -> Union[int, Decimal]:
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, float):
+            if not math.isfinite(node.value):
+                raise _NotExact()
+            return Decimal(repr(node.value))
+        return node.value
+    if isinstance(node, ast.UnaryOp):
+        value = _exact_value(node.operand)
+        return -value if isinstance(node.op, ast.USub) else value
+    left, right = _exact_value(node.left), _exact_value(node.right)
+    op = type(node.op)
+    if isinstance(left, int) and isinstance(right, int) and op is not ast.Div:
+        if op is ast.Pow:
+            if right < 0 or (abs(left) > 1 and right * left.bit_length() > _MAX_POWER_BITS):
+                left = Decimal(left)
+            else:
+                return left ** right
+        else:
+            return _EXACT_OPS[op](left, right)
+    if op is ast.Pow:
+        if right != int(right) or abs(right) > 1000:
+            raise _NotExact()
+        right = int(right)
+    return _EXACT_OPS[op](Decimal(left), right if op is ast.Pow else Decimal(right))
+
+
+def _format_exact(value: Union[int, Decimal]) -> str:
+    if abs(value) > sys.float_info.max:
+        return format(Decimal(value).normalize(_SCIENTIFIC_CONTEXT), "e")
+    if isinstance(value, int):
+        return str(value)
+    as_float = float(value)
+    # print like numexpr's floats whenever that loses nothing
+    if math.isfinite(as_float) and Decimal(repr(as_float)) == value:
+        return repr(as_float)
+    if abs(value) < _SMALLEST_FIXED:
+        return format(value.normalize(_SCIENTIFIC_CONTEXT), "e")
+    return format(value.normalize(), "f")
+
+
+def _evaluate_exact(parsed: _Parsed) -> Optional[str]:
+    """Evaluate integer and decimal arithmetic exactly, or return None if the result is not exact."""
+    try:
+        with decimal.localcontext(_EXACT_CONTEXT):
+            return _format_exact(_exact_value(parsed.tree))
+    except (_NotExact, decimal.DecimalException, ZeroDivisionError):
+        return None
+
+
 def _evaluate_expression(expression: str) -> str:
     try:
-        local_dict = {"pi": math.pi, "e": math.e}
+        parsed = _parse(expression.strip())
+    except (SyntaxError, ValueError):
+        parsed = None
+    if parsed is not None and parsed.exact:
+        output = _evaluate_exact(parsed)
+        if output is not None:
+            return output
+    try:
         output = str(
             numexpr.evaluate(
                 expression.strip(),
                 global_dict={},  # restrict access to globals
-                local_dict=local_dict,  # add common mathematical functions
+                local_dict=_CONSTANTS,  # add common mathematical functions
             )
         )
     except Exception as e:
@@ -27,19 +159,97 @@ def _evaluate_expression(expression: str) -> str:
     return re.sub(r"^\[|\]$", "", output)
 
 
+def evaluate_batch(expressions: Sequence[str]) -> List[str]:
+    """Evaluate many expressions. Exact integer and decimal arithmetic is done directly; expressions sharing a
+    shape (the same expression up to its numbers, and the same types of numbers) are evaluated together in one
+    numexpr call over arrays of their numbers, if they evaluate to floats.
+
+    :param expressions: Expressions to evaluate.
+    :type expressions: Sequence[str]
+    :return: The result, or error message, of each expression, as :class:`Calculator` returns it.
+    :rtype: List[str]
+    """
+    results: List[Optional[str]] = [None] * len(expressions)
+    groups: Dict[Tuple[str, tuple], List[Tuple[int, tuple]]] = defaultdict(list)
+    for i, expression in enumerate(expressions):
+        try:
+            parsed = _parse(expression.strip())
+        except (SyntaxError, ValueError):
+            continue
+        if parsed.exact:
+            results[i] = _evaluate_exact(parsed)
+        elif parsed.batchable:
+            types = tuple(type(literal) for literal in parsed.literals)
+            groups[parsed.template, types].append((i, parsed.literals))
+    for (template, types), members in groups.items():
+        if len(members) < 2:
+            continue
+        # integer results are printed differently from floats, and numexpr may promote integers to floats
+        # over arrays where it does not for single literals: only batch what evaluates to a float on its own
+        try:
+            reference = numexpr.evaluate(expressions[members[0][0]].strip(), global_dict={}, local_dict=_CONSTANTS)
+        except Exception:
+            continue
+        if reference.dtype.kind != "f":
+            continue
+        columns = {f"_c{j}": np.array([literals[j] for _, literals in members], dtype=literal_type)
+                   for j, literal_type in enumerate(types)}
+        try:
+            output = np.broadcast_to(numexpr.evaluate(template, global_dict={}, local_dict={**_CONSTANTS, **columns}),
+                                     (len(members),))
+        except Exception:
+            continue
+        for (i, _), value in zip(members, output):
+            # infinities and NaNs may stand for an error; those are reported by the evaluation on its own
+            if np.isfinite(value):
+                results[i] = str(value)
+    return [_evaluate_expression(expression) if result is None else result
+            for expression, result in zip(expressions, results)]
+
+
+def evaluate_bindings(expression: str, bindings: Dict[str, Sequence[float]]) -> List[str]:
+    """Evaluate one expression for many values of its variables in a single numexpr call.
+
+    :param expression: Expression over the variables in `bindings`.
+    :type expression: str
+    :param bindings: Values of each variable; sequences are broadcast against each other.
+    :type bindings: Dict[str, Sequence[float]]
+    :raises ValueError: If the expression cannot be evaluated.
+    :return: The results, one per set of values.
+    :rtype: List[str]
+    """
+    arrays = {name: np.asarray(values) for name, values in bindings.items()}
+    try:
+        output = numexpr.evaluate(expression.strip(), global_dict={}, local_dict={**_CONSTANTS, **arrays})
+        output = np.broadcast_to(output, np.broadcast_shapes(*(a.shape for a in arrays.values())))
+    except Exception as e:
+        raise ValueError(f"numexpr.evaluate({expression.strip()}) raised error: {e}.") from e
+    return [str(value) for value in output.ravel()]
+
+
 class Calculator(BaseTool):
     """docstring for Calculator"""
     name = "calculator"
     description = "A calculator that can compute arithmetic expressions. Useful when you need to perform " \
-                  "numerical calculations."
+                  "numerical calculations. Several expressions can be separated by ';'."
     args_schema: Optional[Type[BaseModel]] = CalculatorArgs
+    cacheable = True
 
     def _run(self, expression: AnyStr) -> Any:
-
+        if ";" in expression:
+            return "; ".join(self.batch([e for e in expression.split(";") if e.strip()]))
         response = _evaluate_expression(expression)
         evidence = response.strip()
         return evidence
 
+    def batch(self, expressions: Sequence[str]) -> List[str]:
+        """Evaluate many expressions at once, see :func:`evaluate_batch`."""
+        return [response.strip() for response in evaluate_batch(expressions)]
+
+    def evaluate_over(self, expression: str, bindings: Dict[str, Sequence[float]]) -> List[str]:
+        """Evaluate one expression over arrays of variable values, see :func:`evaluate_bindings`."""
+        return evaluate_bindings(expression, bindings)
+
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
 
@@ -1,32 +1,38 @@
 from typing import AnyStr
+from uuid import uuid4
 from gentopia.tools.basetool import *
+from gentopia.tools.utils.interpreter_pool import get_interpreter_pool
 
 
 # Attention: This tool has no safety protection
 
 class CodeInterpreter:
-    def __init__(self, timeout=300):
-        self.globals = {}
-        self.locals = {}
+    """Runs code in a session of the shared :class:`InterpreterPool`, in a separate process.
+
+    :param timeout: Wall-clock limit of a call in seconds, defaults to 300.
+    :type timeout: Optional[float]
+    :param session_id: Interpreter session; interpreters with the same id share their variables,
+        defaults to None (a new session of its own).
+    :type session_id: Optional[str]
+    """
+
+    def __init__(self, timeout: Optional[float] = 300, session_id: Optional[str] = None):
         self.timeout = timeout
+        self.session_id = uuid4().hex if session_id is None else session_id
 
     def execute_code(self, code):
         try:
-            # Wrap the code in an eval() call to return the result
-            wrapped_code = f"__result__ = eval({repr(code)}, globals(), locals())"
-            exec(wrapped_code, self.globals, self.locals)
-            return self.locals.get('__result__', None)
-        except Exception as e:
-            try:
-                # If eval fails, attempt to exec the code without returning a result
-                exec(code, self.globals, self.locals)
-                return "Code executed successfully."
-            except Exception as e:
-                return f"Error: {str(e)}"
+            outcome = get_interpreter_pool().execute(self.session_id, code, self.timeout)
+        except (TimeoutError, RuntimeError) as e:
+            return f"Error: {e}. The session was reset."
+        if outcome.error is not None:
+            return f"{outcome.output}Error: {outcome.error}"
+        if outcome.result is not None:
+            return f"{outcome.output}{outcome.result}" if outcome.output else outcome.result
+        return outcome.output or "Code executed successfully."
 
     def reset_session(self):
-        self.globals = {}
-        self.locals = {}
+        get_interpreter_pool().reset(self.session_id)
 
 
 class PythonCodeInterpreterArgs(BaseModel):
@@ -38,7 +44,14 @@ class PythonCodeInterpreter(BaseTool):
     name = "python_code_interpreter"
     description = "A tool to execute Python code and retrieve the command line output. Input should be executable Python code."
     args_schema: Optional[Type[BaseModel]] = PythonCodeInterpreterArgs
-    interpreter = CodeInterpreter()
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Interpreter session of the tool, by default one per tool instance; tools given the same id share their
+    variables."""
+    execution_timeout: float = 300.0
+
+    @property
+    def interpreter(self) -> CodeInterpreter:
+        return CodeInterpreter(self.execution_timeout, self.session_id)
 
     def _run(self, code: AnyStr) -> Any:
         return self.interpreter.execute_code(code)
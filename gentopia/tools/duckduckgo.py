@@ -1,30 +1,68 @@
-from datetime import time
+import logging
 from typing import AnyStr
+from urllib.parse import quote_plus
 
+import requests
 from bs4 import BeautifulSoup
 from googlesearch import search
 from gentopia.tools.basetool import *
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+from gentopia.tools.utils.browser_pool import get_browser_pool
+from gentopia.utils.execution import current_context
+
+logger = logging.getLogger(__name__)
+
+_session = requests.Session()
+_session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) " \
+                                 "Chrome/120.0 Safari/537.36"
+
 
 class DuckDuckGoArgs(BaseModel):
     query: str = Field(..., description="a search query")
 
 
 class DuckDuckGo(BaseTool):
-    """Tool that adds the capability to query the Google search API."""
+    """Tool that searches DuckDuckGo.
+
+    Results are rendered in a browser borrowed from the shared :class:`BrowserPool`. If no browser is
+    available (selenium or Chrome missing, or the session fails), the script-free HTML endpoint is fetched
+    over plain HTTP instead.
+    """
 
     name = "duckduckgo"
     description = ("A search engine retrieving top search results as snippets from DuckDuckGo."
                    "Input should be a search query.")
 
     args_schema: Optional[Type[BaseModel]] = DuckDuckGoArgs
+    cacheable = True
+    cache_ttl = 600.0
+    base_url: str = "https://duckduckgo.com/"
+    html_url: str = "https://html.duckduckgo.com/html/"
+    use_browser: bool = True
+    request_timeout: float = 15.0
 
     def _run(self, query: AnyStr) -> str:
-        driver = webdriver.Chrome()
-        driver.get(f'https://duckduckgo.com/?q={query}&t=h_&ia=web')
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        driver.quit()
+        if self.use_browser:
+            try:
+                return self._page_text(self._browser_search(query))
+            except Exception as e:
+                logger.warning(f"Browser search failed, falling back to HTTP: {e}")
+        return self._page_text(self._http_search(query))
+
+    def _browser_search(self, query: str) -> str:
+        with get_browser_pool().page() as driver:
+            driver.get(f'{self.base_url}?q={quote_plus(query)}&t=h_&ia=web')
+            return driver.page_source
+
+    def _http_search(self, query: str) -> str:
+        ctx = current_context()
+        timeout = self.request_timeout if ctx is None else ctx.clamp(self.request_timeout)
+        response = _session.post(self.html_url, data={"q": query}, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+
+    @staticmethod
+    def _page_text(html: str) -> str:
+        soup = BeautifulSoup(html, 'html.parser')
         for script in soup(["script", "style"]):
             script.extract()
         text = soup.get_text()
@@ -32,10 +70,9 @@ class DuckDuckGo(BaseTool):
         text = ' '.join(line for line in lines if line)[:2048] + '...'
         return text
 
-        # items = driver.find_element(by=By.CLASS_NAME, value='react-results--main')
-        #
-        # for item in items.find_elements():
-        #     print(item)
+    def _should_cache(self, observation: Any) -> bool:
+        # an empty page, e.g. a blocked or failed render, is not a search result
+        return bool(observation.rstrip("."))
 
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
@@ -1,11 +1,15 @@
 from pathlib import Path
 from typing import AnyStr
 from gentopia.tools.basetool import *
+from gentopia.tools.utils import file_access
 
 
 class WriteFileArgs(BaseModel):
     file_path: str = Field(..., description="the path to write the file")
     text: str = Field(..., description="the string to store")
+    mode: str = Field("overwrite", description="'overwrite' the file, 'append' the text to it, or 'patch' it by "
+                                               "replacing old_text with the text")
+    old_text: Optional[str] = Field(None, description="the text to replace in 'patch' mode")
 
 
 class WriteFile(BaseTool):
@@ -18,13 +22,21 @@ class WriteFile(BaseTool):
     )
     args_schema: Optional[Type[BaseModel]] = WriteFileArgs
 
-    def _run(self, file_path, text) -> AnyStr:
+    def _run(self, file_path, text, mode: str = "overwrite", old_text: Optional[str] = None) -> AnyStr:
         write_path = (
             Path(file_path)
         )
         try:
+            if mode == "patch":
+                if not old_text:
+                    return "Error: old_text is required in 'patch' mode."
+                if not file_access.patch(str(write_path), old_text, text):
+                    return f"Error: old_text was not found in {file_path}."
+                return f"File patched successfully at {file_path}."
+            if mode not in ("overwrite", "append"):
+                return f"Error: unknown mode {mode}, expected 'overwrite', 'append' or 'patch'."
             write_path.parent.mkdir(exist_ok=True, parents=False)
-            with write_path.open("w", encoding="utf-8") as f:
+            with write_path.open("a" if mode == "append" else "w", encoding="utf-8") as f:
                 f.write(text)
             return f"File written successfully to {file_path}."
         except Exception as e:
@@ -36,6 +48,11 @@ class WriteFile(BaseTool):
 
 class ReadFileArgs(BaseModel):
     file_path: str = Field(..., description="the path to read the file")
+    start_line: Optional[int] = Field(None, description="first line to read, counting from 1")
+    end_line: Optional[int] = Field(None, description="last line to read")
+    offset: Optional[int] = Field(None, description="byte offset to start reading at")
+    length: Optional[int] = Field(None, description="number of bytes to read from offset")
+    pattern: Optional[str] = Field(None, description="a regular expression; only matching lines are returned")
 
 
 class ReadFile(BaseTool):
@@ -46,18 +63,43 @@ class ReadFile(BaseTool):
         "Read a file from hardisk"
     )
     args_schema: Optional[Type[BaseModel]] = ReadFileArgs
+    max_chars: int = 100000
+    """Largest output returned. Larger files are summarized, with pointers for reading them in parts, and
+    ranged reads are cut off."""
+    max_matches: int = 100
 
-    def _run(self, file_path) -> AnyStr:
+    def _run(self, file_path, start_line: Optional[int] = None, end_line: Optional[int] = None,
+             offset: Optional[int] = None, length: Optional[int] = None, pattern: Optional[str] = None) -> AnyStr:
         read_path = (
             Path(file_path)
         )
         try:
+            path = str(read_path)
+            if pattern is not None:
+                matches = [f"{line}: {text}" for line, text in file_access.grep(path, pattern, self.max_matches)]
+                if not matches:
+                    return f"No lines matching {pattern}."
+                if len(matches) == self.max_matches:
+                    matches.append(f"... (stopped after {self.max_matches} matches)")
+                return self._cut("\n".join(matches))
+            if start_line is not None or end_line is not None:
+                return self._cut(file_access.read_lines(path, start_line or 1, end_line, self.max_chars + 1))
+            if offset is not None or length is not None:
+                length = self.max_chars + 1 if length is None else min(length, self.max_chars + 1)
+                return self._cut(file_access.read_range(path, offset or 0, length))
+            if read_path.stat().st_size > self.max_chars:
+                return file_access.summarize(path)
             with read_path.open("r", encoding="utf-8") as f:
                 content = f.read()
             return content
         except Exception as e:
             return "Error: " + str(e)
 
+    def _cut(self, content: str) -> str:
+        if len(content) > self.max_chars:
+            return content[:self.max_chars] + f"\n... (output cut at {self.max_chars} characters)"
+        return content
+
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
 
@@ -1,8 +1,7 @@
 from typing import AnyStr, List
-from scholarly import scholarly, ProxyGenerator
+from uuid import uuid4
 from gentopia.tools.basetool import *
-from scholarly import ProxyGenerator
-from itertools import islice
+from gentopia.tools.utils.scholar import get_cursor_store, get_scholar_backend
 
 
 class SearchAuthorByNameArgs(BaseModel):
@@ -17,16 +16,14 @@ class SearchAuthorByName(BaseTool):
                    "you can repeat calling the function to get next results."
                    )
     args_schema: Optional[Type[BaseModel]] = SearchAuthorByNameArgs
-    author: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, author: AnyStr, top_k: int = 5) -> str:
-        if author != self.author:
-            self.results = scholarly.search_author(author)
-        self.author = author
-        assert self.results is not None
+        results = get_cursor_store().page(self.session_id, self.name, (author,),
+                                          lambda: get_scholar_backend().search_author(author), top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'name': it["name"],
                 'uid': it["scholar_id"],
@@ -54,16 +51,14 @@ class SearchAuthorByInterests(BaseTool):
                    "you can repeat calling the function to get next results."
                   )
     args_schema: Optional[Type[BaseModel]] = SearchAuthorByInterestsArgs
-    interests: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, interests: AnyStr, top_k: int = 5) -> str:
-        if interests != self.interests:
-            self.results = scholarly.search_keywords(interests.split(','))
-        self.interests = interests
-        assert self.results is not None
+        results = get_cursor_store().page(self.session_id, self.name, (interests,),
+                                          lambda: get_scholar_backend().search_keywords(interests.split(',')), top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'name': it["name"],
                 'uid': it['scholar_id'],
@@ -92,20 +87,14 @@ class AuthorUID2Paper(BaseTool):
                    "you can repeat calling the function to get next results."
                    )
     args_schema: Optional[Type[BaseModel]] = AuthorUID2PaperArgs
-    uid: str = ""
-    sort_by: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, uid: AnyStr, sort_by: AnyStr, top_k: int = 5) -> str:
-        if uid != self.uid or sort_by != self.sort_by:
-            author = scholarly.search_author_id(uid)
-            author = scholarly.fill(author, sortby=sort_by)
-            self.results = iter(author['publications'])
-        self.uid = uid
-        self.sort_by = sort_by
-        assert self.results is not None
+        results = get_cursor_store().page(self.session_id, self.name, (uid, sort_by),
+                                          lambda: get_scholar_backend().author(uid, sort_by)['publications'], top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'title': it['bib']["title"],
                 'pub_year': it['bib']['pub_year'],
@@ -135,18 +124,14 @@ class SearchPaper(BaseTool):
                    "you can repeat calling the function to get next results."
                   )
     args_schema: Optional[Type[BaseModel]] = SearchPaperArgs
-    title: str = ""
-    sort_by: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, title: AnyStr, sort_by: AnyStr, top_k: int = 5) -> str:
-        if title != self.title or sort_by != self.sort_by:
-            self.results = scholarly.search_pubs(title, sort_by=sort_by)
-        self.title = title
-        self.sort_by = sort_by
-        assert self.results is not None
+        results = get_cursor_store().page(self.session_id, self.name, (title, sort_by),
+                                          lambda: get_scholar_backend().search_pubs(title, sort_by), top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'title': it['bib']["title"],
                 'author': it['bib']['author'],
@@ -176,18 +161,15 @@ class SearchRelatedPaper(BaseTool):
                    "you can repeat calling the function to get next results."
                   )
     args_schema: Optional[Type[BaseModel]] = SearchRelatedPaperArgs
-    title: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, title: AnyStr, top_k: int = 5) -> str:
-        if title != self.title:
-            # please make sure the title is complete
-            paper = scholarly.search_single_pub(title)
-            self.results = scholarly.get_related_articles(paper)
-        self.title = title
-        assert self.results is not None
+        # please make sure the title is complete
+        results = get_cursor_store().page(self.session_id, self.name, (title,),
+                                          lambda: get_scholar_backend().related_pubs(title), top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'title': it['bib']["title"],
                 'author': it['bib']['author'],
@@ -217,18 +199,15 @@ class SearchCitePaper(BaseTool):
                    "you can repeat calling the function to get next results."
                   )
     args_schema: Optional[Type[BaseModel]] = SearchCitePaperArgs
-    title: str = ""
-    results: List = []
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Paging session of the tool, by default one per tool instance; tools given the same id share cursors."""
 
     def _run(self, title: AnyStr, top_k: int = 5) -> str:
-        if title != self.title:
-            # please make sure the title is complete
-            paper = scholarly.search_single_pub(title)
-            self.results = scholarly.citedby(paper)
-        self.title = title
-        assert self.results is not None
+        # please make sure the title is complete
+        results = get_cursor_store().page(self.session_id, self.name, (title,),
+                                          lambda: get_scholar_backend().citing_pubs(title), top_k)
         ans = []
-        for it in islice(self.results, top_k):
+        for it in results:
             ans.append(str({
                 'title': it['bib']["title"],
                 'author': it['bib']['author'],
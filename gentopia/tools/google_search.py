@@ -15,6 +15,8 @@ class GoogleSearch(BaseTool):
                    "Input should be a search query.")
 
     args_schema: Optional[Type[BaseModel]] = GoogleSearchArgs
+    cacheable = True
+    cache_ttl = 600.0
 
     def _run(self, query: AnyStr) -> str:
         return '\n\n'.join([str(item) for item in search(query, advanced=True)])
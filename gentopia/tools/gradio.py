@@ -1,10 +1,17 @@
+from functools import lru_cache
 from typing import AnyStr
 
 from gentopia.tools.gradio_tools.tools import BarkTextToSpeechTool, StableDiffusionTool, DocQueryDocumentAnsweringTool, \
-    ImageCaptioningTool, TextToVideoTool, WhisperAudioTranscriptionTool, ClipInterrogatorTool
+    ImageCaptioningTool, TextToVideoTool, WhisperAudioTranscriptionTool, ClipInterrogatorTool, GradioTool
 from gentopia.tools.basetool import *
 
 
+@lru_cache(maxsize=None)
+def _gradio_tool(cls: Type[GradioTool]) -> GradioTool:
+    """Shared instance of a Gradio tool, created on first use."""
+    return cls()
+
+
 class TTSArgs(BaseModel):
     text: str = Field(..., description="natural language texts. English prefered")
 
@@ -15,13 +22,13 @@ class TTS(BaseTool):
     args_schema: Optional[Type[BaseModel]] = TTSArgs
 
     def _run(self, text: AnyStr) -> Any:
-        bk = BarkTextToSpeechTool()
-        path = bk.run(text)
+        path = _gradio_tool(BarkTextToSpeechTool).run(text)
         ans = f"the audio file saved into: {path}"
         return ans
 
-    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
-        raise NotImplementedError
+    async def _arun(self, text: AnyStr) -> Any:
+        path = await _gradio_tool(BarkTextToSpeechTool).arun(text)
+        return f"the audio file saved into: {path}"
 
 
 class ImageCaptionArgs(BaseModel):
@@ -34,11 +41,11 @@ class ImageCaption(BaseTool):
     args_schema: Optional[Type[BaseModel]] = ImageCaptionArgs
 
     def _run(self, path_to_image: AnyStr) -> Any:
-        ans = ImageCaptioningTool().run(f"{path_to_image}")
+        ans = _gradio_tool(ImageCaptioningTool).run(f"{path_to_image}")
         return ans
 
-    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
-        raise NotImplementedError
+    async def _arun(self, path_to_image: AnyStr) -> Any:
+        return await _gradio_tool(ImageCaptioningTool).arun(f"{path_to_image}")
 
 
 class TextToImageArgs(BaseModel):
@@ -51,11 +58,12 @@ class TextToImage(BaseTool):
     args_schema: Optional[Type[BaseModel]] = TextToImageArgs
 
     def _run(self, text: AnyStr) -> Any:
-        ans = StableDiffusionTool().run(text)
+        ans = _gradio_tool(StableDiffusionTool).run(text)
         return f"the image file saved into: {ans}"
 
-    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
-        raise NotImplementedError
+    async def _arun(self, text: AnyStr) -> Any:
+        ans = await _gradio_tool(StableDiffusionTool).arun(text)
+        return f"the image file saved into: {ans}"
 
 
 class TextToVideoArgs(BaseModel):
@@ -68,11 +76,12 @@ class TextToVideo(BaseTool):
     args_schema: Optional[Type[BaseModel]] = TextToVideoArgs
 
     def _run(self, text: AnyStr) -> Any:
-        ans = TextToVideoTool().run(text)
+        ans = _gradio_tool(TextToVideoTool).run(text)
         return f"the video file saved into: {ans}"
 
-    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
-        raise NotImplementedError
+    async def _arun(self, text: AnyStr) -> Any:
+        ans = await _gradio_tool(TextToVideoTool).arun(text)
+        return f"the video file saved into: {ans}"
 
 
 class ImageToPromptArgs(BaseModel):
@@ -85,11 +94,11 @@ class ImageToPrompt(BaseTool):
     args_schema: Optional[Type[BaseModel]] = ImageToPromptArgs
 
     def _run(self, path_to_image: AnyStr) -> Any:
-        ans = ClipInterrogatorTool().run(path_to_image)
+        ans = _gradio_tool(ClipInterrogatorTool).run(path_to_image)
         return ans
 
-    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
-        raise NotImplementedError
+    async def _arun(self, path_to_image: AnyStr) -> Any:
+        return await _gradio_tool(ClipInterrogatorTool).arun(path_to_image)
 
 
 if __name__ == "__main__":
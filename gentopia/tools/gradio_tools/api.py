@@ -1,17 +1,22 @@
+from functools import lru_cache
 from typing import AnyStr
 
 from gentopia.tools.basetool import *
 from gentopia.tools.gradio_tools.tools import BarkTextToSpeechTool
 
 
+@lru_cache(maxsize=None)
+def _bark() -> BarkTextToSpeechTool:
+    return BarkTextToSpeechTool()
+
+
 class TTS(BaseTool):
     name = "text-to-speech"
     description = "Converting text into sounds that sound like a human read it"
     args_schema: Optional[Type[BaseModel]] = create_model("TTSArgs", text=(str, ...))
     
     def _run(self, text: AnyStr) -> Any:
-        bk = BarkTextToSpeechTool()
-        return bk.run(text)
+        return _bark().run(text)
 
 
 # @tool.get("/get_qa")
@@ -1,15 +1,55 @@
 from __future__ import annotations
 
-import time
+import asyncio
+import logging
+import threading
 from abc import abstractmethod
-from typing import Any, Tuple, Union
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple, Union
 
 import gradio_client as grc
 import huggingface_hub
 from gradio_client.client import Job
 from gradio_client.utils import QueueError
 
+from gentopia.utils.execution import current_context, DeadlineExceeded, execution_context
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[Tuple[str, Optional[str], bool], grc.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(src: str, hf_token: str | None = None, duplicate: bool = True) -> grc.Client:
+    """Return the client of a Space, connecting (or duplicating the Space) only on first use. Clients are
+    shared by every tool using the same Space, token and duplication setting."""
+    key = (src, hf_token, duplicate)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if hf_token and duplicate and GradioTool._is_space(src):
+                client = grc.Client.duplicate(from_id=src, hf_token=hf_token)
+            else:
+                client = grc.Client(src, hf_token=hf_token)
+            _clients[key] = client
+        return client
+
+
+def _job_future(job: Job) -> Future:
+    # Jobs wrap the future of the underlying request; it is the one completed when the result arrives.
+    return getattr(job, "future", job)
+
+
 class GradioTool:
+    """Tool backed by a Gradio app or Hugging Face Space.
+
+    Waiting for a job is event-driven: :meth:`run` returns as soon as the job completes. While waiting,
+    the job status is polled only to report progress, at intervals following the job's ETA, or doubling
+    from `min_poll_interval` up to `max_poll_interval` when there is none.
+    """
+    min_poll_interval: float = 0.5
+    max_poll_interval: float = 30.0
+
     def __init__(
         self,
         name: str,
@@ -17,15 +57,13 @@ class GradioTool:
         src: str,
         hf_token: str | None = None,
         duplicate: bool = True,
+        timeout: float | None = None,
     ) -> None:
         self.name = name
         self.description = description
-        if hf_token and self._is_space(src) and duplicate:
-            self.client = grc.Client.duplicate(from_id=src, hf_token=hf_token)
-            self.src = self.client.space_id
-        else:
-            self.src = src
-            self.client = grc.Client(self.src, hf_token=hf_token)
+        self.timeout = timeout
+        self.client = get_client(src, hf_token, duplicate)
+        self.src = self.client.space_id or src
         self.description += (
             "If the output is the string QUEUE_FULL you "
             "should try this action again and never stop until you "
@@ -49,17 +87,51 @@ class GradioTool:
     def postprocess(self, output: Union[Tuple[Any], Any]) -> str:
         pass
 
+    def _next_poll_interval(self, interval: float, eta: Optional[float]) -> float:
+        if eta:
+            interval = eta
+        else:
+            interval *= 2
+        return min(max(interval, self.min_poll_interval), self.max_poll_interval)
+
+    def _output(self, job: Job) -> str:
+        try:
+            return self.postprocess(job.result())
+        except QueueError:
+            return "QUEUE_FULL"
+
     def run(self, query: str):
+        """Submit `query` and wait for the result, giving up (and cancelling the job) after `timeout` seconds
+        or when the enclosing execution context is cancelled, see :mod:`gentopia.utils.execution`."""
+        with execution_context(self.timeout) as ctx:
+            job = self.create_job(query)
+            finished = threading.Event()
+            _job_future(job).add_done_callback(lambda _: finished.set())
+            interval = self.min_poll_interval
+            while True:
+                if ctx.wait(interval, until=finished):
+                    job.cancel()
+                    ctx.check()
+                if finished.is_set():
+                    break
+                status = job.status()
+                logger.info(f"{self.name} job status: {status.code} eta: {status.eta}")
+                interval = self._next_poll_interval(interval, status.eta)
+        return self._output(job)
+
+    async def arun(self, query: str):
+        """Asynchronous :meth:`run`, returning when the job completes without holding a thread."""
+        ctx = current_context()
+        if ctx is not None:
+            ctx.check()
+        timeout = self.timeout if ctx is None else ctx.clamp(self.timeout)
         job = self.create_job(query)
-        while not job.done():
-            status = job.status()
-            print(f"\nJob Status: {str(status.code)} eta: {status.eta}")
-            time.sleep(30)
         try:
-            output = self.postprocess(job.result())
-        except QueueError:
-            output = "QUEUE_FULL"
-        return output
+            await asyncio.wait_for(asyncio.wrap_future(_job_future(job)), timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            raise DeadlineExceeded(f"{self.name} timed out")
+        return self._output(job)
 
     # Optional gradio functionalities
     def _block_input(self, gr) -> "gr.components.Component":
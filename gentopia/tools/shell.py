@@ -1,11 +1,18 @@
+import atexit
+import os
 import platform
 import re
+import shlex
 import subprocess
+import threading
+import time
+from collections import OrderedDict
 from typing import AnyStr
 from typing import List
 from uuid import uuid4
 import pexpect
 from gentopia.tools.basetool import *
+from gentopia.utils.execution import current_context
 
 
 def _lazy_import_pexpect() -> pexpect:
@@ -24,51 +31,85 @@ def _lazy_import_pexpect() -> pexpect:
 
 
 class BashProcess:
-    """Executes bash commands and returns the output."""
+    """Executes bash commands and returns the output.
+
+    :param strip_newlines: Whether to strip leading and trailing whitespace from the output, defaults to False.
+    :type strip_newlines: bool
+    :param return_err_output: Whether to return the output of failing commands instead of the error,
+        defaults to False.
+    :type return_err_output: bool
+    :param persistent: Whether to keep one bash process for all calls, so that the working directory,
+        variables and functions carry over between them, defaults to False.
+    :type persistent: bool
+    :param timeout: Seconds a call may take, shortened to the enclosing deadline; None for no limit,
+        defaults to None.
+    :type timeout: Optional[float]
+    :param max_output: Characters of output kept per call of a persistent process, None for all,
+        defaults to None.
+    :type max_output: Optional[int]
+    :param clean_env: Whether a persistent process starts with an empty environment rather than this
+        process's one, defaults to True.
+    :type clean_env: bool
+    """
 
     def __init__(
             self,
             strip_newlines: bool = False,
             return_err_output: bool = False,
             persistent: bool = False,
+            timeout: Optional[float] = None,
+            max_output: Optional[int] = None,
+            clean_env: bool = True,
     ):
         """Initialize with stripping newlines."""
         self.strip_newlines = strip_newlines
         self.return_err_output = return_err_output
+        self.timeout = timeout
+        self.max_output = max_output
+        self.clean_env = clean_env
         self.prompt = ""
         self.process = None
         if persistent:
             self.prompt = str(uuid4())
-            self.process = self._initialize_persistent_process(self.prompt)
+            self.process = self._initialize_persistent_process(self.prompt, clean_env)
 
     @staticmethod
-    def _initialize_persistent_process(prompt: str) -> pexpect.spawn:
-        # Start bash in a clean environment
+    def _initialize_persistent_process(prompt: str, clean_env: bool = True) -> pexpect.spawn:
+        # Start bash without line editing, so that with terminal echo off only command output comes back
         # Doesn't work on windows
         pexpect = _lazy_import_pexpect()
-        process = pexpect.spawn(
-            "env", ["-i", "bash", "--norc", "--noprofile"], encoding="utf-8"
-        )
-        # Set the custom prompt
-        process.sendline("PS1=" + prompt)
-
+        bash_args = ["bash", "--norc", "--noprofile", "--noediting"]
+        if clean_env:
+            process = pexpect.spawn("env", ["-i"] + bash_args, encoding="utf-8", echo=False)
+        else:
+            process = pexpect.spawn(bash_args[0], bash_args[1:], encoding="utf-8", echo=False, env=os.environ)
+        process.delaybeforesend = None
+        # Set the custom prompt; an empty continuation prompt keeps incomplete commands out of the output
+        process.sendline(f"PS1={prompt}; PS2=")
         process.expect_exact(prompt, timeout=10)
         return process
 
-    def run(self, commands: Union[str, List[str]]) -> str:
-        """Run commands and return final output."""
+    def run(self, commands: Union[str, List[str]], timeout: Optional[float] = None) -> str:
+        """Run commands and return final output.
+
+        :param commands: A command or commands run one after another.
+        :type commands: Union[str, List[str]]
+        :param timeout: Seconds the call may take instead of `self.timeout`, defaults to None.
+        :type timeout: Optional[float]
+        """
         if isinstance(commands, str):
             commands = [commands]
         commands = ";".join(commands)
-        # print(commands)
+        timeout = self.timeout if timeout is None else timeout
+        ctx = current_context()
+        if ctx is not None:
+            timeout = ctx.clamp(timeout)
         if self.process is not None:
-            return self._run_persistent(
-                commands,
-            )
+            return self._run_persistent(commands, timeout)
         else:
-            return self._run(commands)
+            return self._run(commands, timeout)
 
-    def _run(self, command: str) -> str:
+    def _run(self, command: str, timeout: Optional[float] = None) -> str:
         """Run commands and return final output."""
         try:
             output = subprocess.run(
@@ -77,11 +118,14 @@ class BashProcess:
                 check=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
+                timeout=timeout,
             ).stdout.decode()
         except subprocess.CalledProcessError as error:
             if self.return_err_output:
                 return error.stdout.decode()
             return str(error)
+        except subprocess.TimeoutExpired:
+            return f"Timeout error while executing command {command}"
         if self.strip_newlines:
             output = output.strip()
         return output
@@ -92,29 +136,178 @@ class BashProcess:
         output = re.sub(pattern, "", output, count=1)
         return output.strip()
 
-    def _run_persistent(self, command: str) -> str:
-        """Run commands and return final output."""
-        # print("entering _run_persistent")
+    def _run_persistent(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run commands and return final output, read as it is produced until the prompt comes back."""
         pexpect = _lazy_import_pexpect()
         if self.process is None:
             raise ValueError("Process not initialized")
-        self.process.sendline(command)
+        ctx = current_context()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        output = _OutputBuffer(self.max_output)
+        # a quoted eval argument is always a complete line, so a syntax error is reported instead of bash
+        # waiting for the rest of the command
+        self.process.sendline("eval " + shlex.quote(command))
+        tail = ""
+        while True:
+            wait = 0.25 if deadline is None else min(0.25, deadline - time.monotonic())
+            if wait <= 0 or (ctx is not None and ctx.cancelled):
+                output.write(tail)
+                self._interrupt()
+                return f"{output.getvalue().strip()}\nTimeout error while executing command {command}".strip()
+            try:
+                data = tail + self.process.read_nonblocking(65536, timeout=wait)
+            except pexpect.TIMEOUT:
+                continue
+            except pexpect.EOF:
+                self.process.close()
+                status = self.process.exitstatus
+                self.process = self._initialize_persistent_process(self.prompt, self.clean_env)
+                return f"Exited with error status: {status}"
+            end = data.find(self.prompt)
+            if end >= 0:
+                output.write(data[:end])
+                break
+            # the prompt may be split across reads
+            keep = len(data) - len(self.prompt) + 1
+            output.write(data[:keep])
+            tail = data[max(keep, 0):]
+        return output.getvalue().strip()
+
+    def _interrupt(self):
+        """Stop the running command with Ctrl-C, or start a new process if the shell does not come back."""
+        pexpect = _lazy_import_pexpect()
+        try:
+            self.process.sendintr()
+            self.process.expect_exact(self.prompt, timeout=2)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            self.process.terminate(force=True)
+            self.process = self._initialize_persistent_process(self.prompt, self.clean_env)
+
+
+class _OutputBuffer:
+    """Collects the first `limit` characters of command output, with terminal line endings normalized."""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+        self.dropped = 0
+
+    def write(self, text: str):
+        text = text.replace("\r\n", "\n")
+        if self.limit is not None:
+            room = max(self.limit - self.size, 0)
+            self.dropped += max(len(text) - room, 0)
+            text = text[:room]
+        self.parts.append(text)
+        self.size += len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            text += f"\n... ({self.dropped} more characters)"
+        return text
+
 
-        # Clear the output with an empty string
-        self.process.expect(self.prompt, timeout=10)
-        self.process.sendline("")
+class _Session:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.process: Optional[BashProcess] = None
+        self.users = 0
+        """Calls holding or waiting for the session; only sessions without users are evicted."""
 
+
+class BashSessionPool:
+    """Persistent bash processes keyed by session, so that multi-command workflows keep their working
+    directory and variables without starting a process per call. Calls on one session run one at a time, so
+    their output never interleaves; calls on different sessions run in parallel.
+
+    :param max_sessions: Maximum number of live sessions; the least recently used idle one is closed beyond
+        it, defaults to 8.
+    :type max_sessions: int
+    :param max_output: Characters of output returned per call, defaults to 10000.
+    :type max_output: int
+    :param clean_env: Whether sessions start with an empty environment rather than this process's one,
+        defaults to False.
+    :type clean_env: bool
+    """
+
+    def __init__(self, max_sessions: int = 8, max_output: int = 10000, clean_env: bool = False):
+        self.max_sessions = max_sessions
+        self.max_output = max_output
+        self.clean_env = clean_env
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def run(self, session: str, commands: Union[str, List[str]], timeout: Optional[float] = None) -> str:
+        """Run commands in the shell of `session`, starting one if needed.
+
+        :param session: Session whose shell runs the commands.
+        :type session: str
+        :param commands: A command or commands run one after another.
+        :type commands: Union[str, List[str]]
+        :param timeout: Seconds the call may take, shortened to the enclosing deadline; on timeout the command
+            is interrupted. Defaults to None.
+        :type timeout: Optional[float]
+        :return: The output of the commands.
+        :rtype: str
+        """
+        entry = self._checkout(session)
         try:
-            self.process.expect([self.prompt, pexpect.EOF], timeout=10)
-        except pexpect.TIMEOUT:
-            return f"Timeout error while executing command {command}"
-        if self.process.after == pexpect.EOF:
-            return f"Exited with error status: {self.process.exitstatus}"
-        output = self.process.before
-        output = self.process_output(output, command)
-        if self.strip_newlines:
-            return output.strip()
-        return output
+            with entry.lock:
+                if entry.process is None:
+                    entry.process = BashProcess(return_err_output=True, persistent=True,
+                                                max_output=self.max_output, clean_env=self.clean_env)
+                return entry.process.run(commands, timeout)
+        finally:
+            with self._lock:
+                entry.users -= 1
+
+    def close(self, session: Optional[str] = None):
+        """Close the shell of `session`, or of all sessions."""
+        with self._lock:
+            sessions = list(self._sessions) if session is None else [session]
+            closed = [self._sessions.pop(name) for name in sessions if name in self._sessions]
+        for entry in closed:
+            self._terminate(entry.process)
+
+    def _checkout(self, session: str) -> _Session:
+        """Return the entry of `session`, counted as in use until the caller decrements `users`."""
+        evicted = []
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is None:
+                for name, idle in list(self._sessions.items()):
+                    if len(self._sessions) < self.max_sessions:
+                        break
+                    if not idle.users:
+                        del self._sessions[name]
+                        evicted.append(idle.process)
+                entry = self._sessions[session] = _Session()
+            self._sessions.move_to_end(session)
+            entry.users += 1
+        for process in evicted:
+            self._terminate(process)
+        return entry
+
+    @staticmethod
+    def _terminate(process: Optional[BashProcess]):
+        if process is not None and process.process is not None:
+            process.process.terminate(force=True)
+
+
+_pool: Optional[BashSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_bash_session_pool() -> BashSessionPool:
+    """Return the process-wide bash session pool, created on first use and closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BashSessionPool()
+            atexit.register(_pool.close)
+        return _pool
 
 
 def get_platform() -> str:
@@ -140,11 +333,18 @@ class RunShell(BaseTool):
                    "It returns output as a real command line interface. ")
     args_schema: Optional[Type[BaseModel]] = RunShellArgs
     process: BashProcess = get_default_bash_process()
+    persistent: bool = True
+    """Whether to run commands in the persistent shell of `session_id` rather than a new process per call."""
+    session_id: str = Field(default_factory=lambda: uuid4().hex)
+    """Shell session of the tool, by default one per tool instance; tools given the same id share a shell."""
+    command_timeout: Optional[float] = 60.0
 
     def _run(self, commands: AnyStr) -> Any:
         '''Run commands and return final output.
         '''
-        return self.process.run(commands)
+        if self.persistent and platform.system() != "Windows":
+            return get_bash_session_pool().run(self.session_id, commands, self.command_timeout)
+        return self.process.run(commands, self.command_timeout)
 
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
@@ -0,0 +1,175 @@
+"""Pool of long-lived headless browser sessions for tools that render web pages.
+
+Starting a browser takes seconds and hundreds of MB, so tools borrow a running session from a
+:class:`BrowserPool` instead of starting one per call. Sessions are health-checked when borrowed, replaced
+after `max_uses` calls, and every call gets a fresh tab with cookies cleared so queries do not leak into
+each other.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, List, Optional
+
+from gentopia.utils.execution import current_context
+
+logger = logging.getLogger(__name__)
+
+
+def headless_chrome() -> Any:
+    """Start a headless Chrome session with selenium."""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    for argument in ("--headless=new", "--disable-gpu", "--disable-extensions", "--no-sandbox",
+                     "--disable-dev-shm-usage"):
+        options.add_argument(argument)
+    return webdriver.Chrome(options=options)
+
+
+class _Session:
+    __slots__ = ("driver", "uses", "home")
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.uses = 0
+        self.home = driver.current_window_handle
+
+
+class BrowserPool:
+    """Bounded pool of browser sessions.
+
+    :param factory: Starts a new selenium WebDriver, defaults to :func:`headless_chrome`.
+    :type factory: Callable[[], Any]
+    :param size: Maximum number of sessions alive at once, defaults to 2.
+    :type size: int
+    :param max_uses: Number of calls after which a session is replaced, bounding memory growth, defaults to 50.
+    :type max_uses: int
+    :param acquire_timeout: Seconds to wait for a free session, defaults to 30.
+    :type acquire_timeout: float
+    """
+
+    def __init__(self, factory: Callable[[], Any] = headless_chrome, size: int = 2, max_uses: int = 50,
+                 acquire_timeout: float = 30.0):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+        self._idle: Deque[_Session] = deque()
+        self._alive = 0
+        self._closed = False
+
+    @contextmanager
+    def page(self):
+        """Borrow a session and yield its driver, switched to a new tab that is closed afterwards.
+
+        :raises TimeoutError: If no session became free within `acquire_timeout` (or the enclosing deadline).
+        """
+        session = self._acquire()
+        healthy = False
+        try:
+            driver = session.driver
+            driver.switch_to.new_window("tab")
+            yield driver
+            healthy = True
+        finally:
+            self._release(session, healthy)
+
+    def _acquire(self) -> _Session:
+        ctx = current_context()
+        timeout = self.acquire_timeout if ctx is None else ctx.clamp(self.acquire_timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        available = lambda: self._closed or self._idle or self._alive < self.size
+        while True:
+            with self._cond:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self._cond.wait_for(available, remaining):
+                    raise TimeoutError("No browser session became available.")
+                if self._closed:
+                    raise RuntimeError("The browser pool is closed.")
+                if not self._idle:
+                    self._alive += 1
+                    break
+                session = self._idle.pop()
+            # health checks and quitting talk to the browser, which may hang, so they run without the lock
+            if self._is_healthy(session):
+                return session
+            self._discard(session)
+        try:
+            return _Session(self.factory())
+        except BaseException:
+            with self._cond:
+                self._alive -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, session: _Session, healthy: bool):
+        session.uses += 1
+        if healthy:
+            healthy = self._reset(session)
+        with self._cond:
+            if healthy and not self._closed and session.uses < self.max_uses:
+                # most recently used first, so idle sessions beyond the load are the ones left to expire
+                self._idle.append(session)
+                self._cond.notify()
+                return
+        self._discard(session)
+
+    @staticmethod
+    def _is_healthy(session: _Session) -> bool:
+        try:
+            session.driver.switch_to.window(session.home)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(session: _Session) -> bool:
+        """Close every tab but the first and clear cookies, so the next query starts from a clean page."""
+        driver = session.driver
+        try:
+            for handle in driver.window_handles:
+                if handle != session.home:
+                    driver.switch_to.window(handle)
+                    driver.close()
+            driver.switch_to.window(session.home)
+            driver.delete_all_cookies()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding broken browser session: {e}")
+            return False
+
+    def _discard(self, session: _Session):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._alive -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Quit all idle sessions; sessions in use are quit when returned."""
+        with self._cond:
+            self._closed = True
+            idle: List[_Session] = list(self._idle)
+            self._idle.clear()
+        for session in idle:
+            self._discard(session)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool, created on first use and closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
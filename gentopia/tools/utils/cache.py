@@ -0,0 +1,194 @@
+"""Result cache for tools.
+
+:meth:`gentopia.tools.basetool.BaseTool.run` consults the process-wide :class:`ToolCache` for tools declaring
+``cacheable = True``. Entries are keyed by tool name, tool parameters and parsed input and expire after the
+tool's ``cache_ttl`` seconds (never when None); results a tool's ``_should_cache`` rejects, such as reported
+failures, are not stored. Concurrent identical calls, sync or async, are coalesced so that only one
+executes. Results are kept in a :class:`MemoryCache` by default; use :func:`set_tool_cache` with a
+:class:`DiskCache` to share them between processes and restarts.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from gentopia.utils.single_flight import SingleFlight, make_key
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Key-value store with per-entry expiry."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the live value stored under `key`, or :data:`MISSING`."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store `value` under `key` for `ttl` seconds, or forever if `ttl` is None."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache.
+
+    :param maxsize: Maximum number of entries, least recently used evicted first, defaults to 4096.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = float("inf") if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache(CacheBackend):
+    """SQLite-backed cache of pickled values, shared by every process using the same file.
+
+    :param path: Database file, defaults to ``~/.cache/gentopia/tool_cache.sqlite``.
+    :type path: Optional[str]
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".cache", "gentopia", "tool_cache.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return MISSING
+            if row[1] is not None and row[1] <= time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            blob = pickle.dumps(value)
+        except Exception as e:
+            logger.warning(f"Not caching unpicklable tool result: {e}")
+            return
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, blob, expires_at))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+
+class ToolCache:
+    """Cache front-end coalescing concurrent computations of the same key.
+
+    :param backend: Where results are stored, defaults to a :class:`MemoryCache`.
+    :type backend: Optional[CacheBackend]
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or MemoryCache()
+        self._flight = SingleFlight()
+
+    def get(self, key: str) -> Any:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.backend.set(key, value, ttl)
+
+    def get_or_compute(self, key: str, ttl: Optional[float], compute: Callable[[], Any]) -> Any:
+        """Return the cached value of `key`, computing and storing it on a miss. Callers arriving while
+        the same key is being computed wait for that computation instead of starting another one.
+        Exceptions are passed to every waiting caller and are not cached."""
+        value = self.backend.get(key)
+        if value is not MISSING:
+            return value
+
+        def compute_and_store():
+            result = compute()
+            self.backend.set(key, result, ttl)
+            return result
+
+        return self._flight.do(key, compute_and_store)
+
+    async def aget_or_compute(self, key: str, ttl: Optional[float], compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of :meth:`get_or_compute`; `compute` returns an awaitable. Calls are coalesced with
+        concurrent sync and async computations of the same key."""
+        value = self.backend.get(key)
+        if value is not MISSING:
+            return value
+
+        async def compute_and_store():
+            result = await compute()
+            self.backend.set(key, result, ttl)
+            return result
+
+        return await self._flight.ado(key, compute_and_store)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def cache_key(name: str, params: Dict[str, Any], tool_input: Any) -> str:
+    """Stable digest of a tool call."""
+    return make_key(name, params, tool_input)
+
+
+_tool_cache = ToolCache()
+
+
+def get_tool_cache() -> ToolCache:
+    """Return the process-wide tool cache."""
+    return _tool_cache
+
+
+def set_tool_cache(cache: ToolCache) -> ToolCache:
+    """Replace the process-wide tool cache, e.g. with ``ToolCache(DiskCache())``.
+
+    :return: The previous cache.
+    :rtype: ToolCache
+    """
+    global _tool_cache
+    previous, _tool_cache = _tool_cache, cache
+    return previous
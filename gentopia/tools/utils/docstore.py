@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Tuple
 
 from pydantic import Field, BaseModel
 
@@ -30,6 +30,10 @@ class DocstoreExplorer:
         self.document: Optional[Document] = None
         self.lookup_str = ""
         self.lookup_index = 0
+        self._indexed: Optional[Document] = None
+        self._index: List[Tuple[str, str]] = []
+        self._matched: Optional[Document] = None
+        self._matches: List[str] = []
 
     def search(self, term: str) -> str:
         """Search for a term in the docstore, and if found save."""
@@ -48,9 +52,13 @@ class DocstoreExplorer:
         if term.lower() != self.lookup_str:
             self.lookup_str = term.lower()
             self.lookup_index = 0
+            self._matched = None
         else:
             self.lookup_index += 1
-        lookups = [p for p in self._paragraphs if self.lookup_str in p.lower()]
+        if self._matched is not self.document:
+            self._matches = [p for p, lower in self._paragraph_index if self.lookup_str in lower]
+            self._matched = self.document
+        lookups = self._matches
         if len(lookups) == 0:
             return "No Results"
         elif self.lookup_index >= len(lookups):
@@ -65,6 +73,14 @@ class DocstoreExplorer:
 
     @property
     def _paragraphs(self) -> List[str]:
+        return [p for p, _ in self._paragraph_index]
+
+    @property
+    def _paragraph_index(self) -> List[Tuple[str, str]]:
+        """Paragraphs of the current document with their lowercase text, built once per document."""
         if self.document is None:
             raise ValueError("Cannot get paragraphs without a document")
-        return self.document.page_content.split("\n\n")
\ No newline at end of file
+        if self._indexed is not self.document:
+            self._index = [(p, p.lower()) for p in self.document.page_content.split("\n\n")]
+            self._indexed = self.document
+        return self._index
@@ -33,6 +33,20 @@ class BaseLoader(ABC):
         docs = self.load()
         return _text_splitter.split_documents(docs)
 
+    def lazy_load_and_split(
+        self, text_splitter: Optional[TextSplitter] = None
+    ) -> Iterator[Document]:
+        """Load documents and split them into chunks, yielding chunks as they are produced."""
+        if text_splitter is None:
+            _text_splitter: TextSplitter = RecursiveCharacterTextSplitter()
+        else:
+            _text_splitter = text_splitter
+        try:
+            docs = self.lazy_load()
+        except NotImplementedError:
+            docs = iter(self.load())
+        return _text_splitter.lazy_split_documents(docs)
+
     # Attention: This method will be upgraded into an abstractmethod once it's
     #            implemented in all the existing subclasses.
     def lazy_load(
@@ -0,0 +1,81 @@
+"""Compact, offset-based chunks referring to a shared source instead of holding their own text."""
+import mmap
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from gentopia.tools.utils import Document
+
+
+class ChunkSource:
+    """Shared, immutable source of chunk text: either an in-memory string or a file that is memory-mapped
+    on first access. Offsets into a string are character offsets, offsets into a file are byte offsets.
+
+    :param doc_id: Identifier of the source document.
+    :type doc_id: str
+    :param metadata: Metadata shared read-only by every chunk of this source.
+    :type metadata: Optional[Mapping]
+    :param text: Source text, if held in memory.
+    :type text: Optional[str]
+    :param path: Path of the source file, if text is None.
+    :type path: Optional[str]
+    :param encoding: Encoding of the source file. It must be stateless, such as UTF-8.
+    :type encoding: str
+    """
+    __slots__ = ("doc_id", "metadata", "text", "path", "encoding", "_mmap")
+
+    def __init__(self, doc_id: str, metadata: Optional[Mapping] = None, text: Optional[str] = None,
+                 path: Optional[str] = None, encoding: str = "utf-8"):
+        if text is None and path is None:
+            raise ValueError("A chunk source needs either text or a path.")
+        self.doc_id = doc_id
+        self.metadata = MappingProxyType(dict(metadata or {}))
+        self.text = text
+        self.path = path
+        self.encoding = encoding
+        self._mmap = None
+
+    def slice(self, start: int, end: int) -> str:
+        """Return the text between two offsets."""
+        if self.text is not None:
+            return self.text[start:end]
+        if self._mmap is None:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[start:end].decode(self.encoding)
+
+    def close(self):
+        """Unmap the source file, if mapped. It is mapped again on the next access."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class Chunk:
+    """A chunk stored as `(source, start, end)` offsets, materializing its text only when accessed.
+
+    Chunks whose text could not be located verbatim in the source (e.g. decoded tokens) keep their text.
+    """
+    __slots__ = ("source", "start", "end", "_text")
+
+    def __init__(self, source: ChunkSource, start: int, end: int, text: Optional[str] = None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self._text = text
+
+    @property
+    def page_content(self) -> str:
+        if self._text is not None:
+            return self._text
+        return self.source.slice(self.start, self.end)
+
+    @property
+    def metadata(self) -> Mapping:
+        return self.source.metadata
+
+    def to_document(self) -> Document:
+        """Materialize the chunk as a :class:`Document` with its own copy of the metadata."""
+        return Document(page_content=self.page_content, metadata=dict(self.source.metadata))
+
+    def __repr__(self) -> str:
+        return f"Chunk(doc_id={self.source.doc_id!r}, start={self.start}, end={self.end})"
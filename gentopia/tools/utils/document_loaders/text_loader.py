@@ -1,21 +1,60 @@
+import locale
 from abc import abstractmethod, ABC
 from typing import Optional, List, Iterator, Sequence, Any, Callable
 
 from gentopia.tools.utils import Document
 from gentopia.tools.utils.document_loaders.base_loader import BaseLoader
+from gentopia.tools.utils.document_loaders.chunk import Chunk, ChunkSource
+from gentopia.tools.utils.document_loaders.text_splitter import TextSplitter, RecursiveCharacterTextSplitter, _locate
 
 
 class TextLoader(BaseLoader):
     """Load text files."""
 
-    def __init__(self, file_path: str, encoding: Optional[str] = None):
-        """Initialize with file path."""
+    def __init__(self, file_path: str, encoding: Optional[str] = None, buffer_size: int = 1 << 20):
+        """Initialize with file path and the number of characters read at a time when streaming."""
         self.file_path = file_path
         self.encoding = encoding
+        self.buffer_size = buffer_size
 
     def load(self) -> List[Document]:
         """Load from file path."""
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Load from file path. The whole file is one document."""
         with open(self.file_path, encoding=self.encoding) as f:
             text = f.read()
         metadata = {"source": self.file_path}
-        return [Document(page_content=text, metadata=metadata)]
\ No newline at end of file
+        yield Document(page_content=text, metadata=metadata)
+
+    def lazy_load_and_split(
+        self, text_splitter: Optional[TextSplitter] = None
+    ) -> Iterator[Document]:
+        """Split the file while reading it, holding about `buffer_size` characters instead of the whole file."""
+        _text_splitter = text_splitter or RecursiveCharacterTextSplitter()
+        metadata = {"source": self.file_path}
+        with open(self.file_path, encoding=self.encoding) as f:
+            for chunk in _text_splitter.split_stream(f, self.buffer_size):
+                yield Document(page_content=chunk, metadata=dict(metadata))
+
+    def lazy_load_chunks(self, text_splitter: Optional[TextSplitter] = None) -> Iterator[Chunk]:
+        """Split the file while reading it into compact :class:`Chunk` byte offsets. Chunk text is read back
+        from a memory map of the file when accessed, so the file must not change while chunks are in use."""
+        _text_splitter = text_splitter or RecursiveCharacterTextSplitter()
+        encoding = self.encoding or locale.getpreferredencoding(False)
+        source = ChunkSource(self.file_path, {"source": self.file_path}, path=self.file_path, encoding=encoding)
+        window_start = 0  # byte offset of the current window in the file
+        # newline="" keeps line endings untranslated so that byte offsets match the file
+        with open(self.file_path, encoding=encoding, newline="") as f:
+            for window, chunks, consumed in _text_splitter._split_windows(f, self.buffer_size):
+                cursor, cursor_byte = 0, window_start
+                for chunk, offsets in zip(chunks, _locate(window, chunks)):
+                    if offsets is None:
+                        yield Chunk(source, -1, -1, chunk)
+                        continue
+                    start, end = offsets
+                    cursor_byte += len(window[cursor:start].encode(encoding))
+                    cursor = start
+                    yield Chunk(source, cursor_byte, cursor_byte + len(chunk.encode(encoding)))
+                window_start = cursor_byte + len(window[cursor:consumed].encode(encoding))
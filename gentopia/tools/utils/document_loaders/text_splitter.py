@@ -3,17 +3,23 @@ from __future__ import annotations
 
 import copy
 import logging
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from typing import (
     AbstractSet,
     Any,
     Callable,
     Collection,
+    Deque,
     Iterable,
+    Iterator,
     List,
     Literal,
     Optional,
     Sequence,
+    TextIO,
+    Tuple,
     Type,
     TypeVar,
     Union,
@@ -21,6 +27,7 @@ from typing import (
 
 
 from gentopia.tools.utils import Document
+from gentopia.tools.utils.document_loaders.chunk import Chunk, ChunkSource
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +35,65 @@ TS = TypeVar("TS", bound="TextSplitter")
 
 def _get_default_text_splitter() -> TextSplitter:
     return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+
+
+class TokenLengthCache:
+    """Memoizing token counter used as a splitter's length function.
+
+    Splitters measure the same fragments over and over (separators, repeated words, pieces re-measured
+    while recursing), so counts are remembered per fragment. :meth:`lengths` encodes all unknown
+    fragments of a list in one batch call. Safe to share between threads.
+
+    :param encode_batch: Function mapping a list of texts to their token counts.
+    :type encode_batch: Callable[[List[str]], List[int]]
+    :param maxsize: Number of fragments remembered, least recently used evicted first, defaults to 65536.
+    :type maxsize: int, optional
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], List[int]], maxsize: int = 65536):
+        self.encode_batch = encode_batch
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> int:
+        with self._lock:
+            n = self._cache.get(text)
+            if n is not None:
+                self._cache.move_to_end(text)
+                return n
+        return self.lengths([text])[0]
+
+    def lengths(self, texts: Sequence[str]) -> List[int]:
+        """Token counts of `texts`, encoding the fragments not seen before in one batch."""
+        cache = self._cache
+        with self._lock:
+            known = {t: cache[t] for t in texts if t in cache}
+            for t in known:
+                cache.move_to_end(t)
+        # encode outside the lock, so other threads are not held up by a large batch
+        missing = list(dict.fromkeys(t for t in texts if t not in known))
+        if missing:
+            known.update(zip(missing, self.encode_batch(missing)))
+            with self._lock:
+                cache.update((t, known[t]) for t in missing)
+                while len(cache) > self.maxsize:
+                    cache.popitem(last=False)
+        return [known[t] for t in texts]
+
+
+def _locate(text: str, chunks: List[str]) -> Iterator[Optional[Tuple[int, int]]]:
+    """Find the offsets of consecutive chunks in `text`, or None for a chunk that is not a slice of it."""
+    cursor = 0
+    for chunk in chunks:
+        start = text.find(chunk, cursor)
+        if start < 0:
+            yield None
+        else:
+            yield start, start + len(chunk)
+            cursor = start + 1
+
+
 class BaseDocumentTransformer(ABC):
     """Base interface for transforming documents."""
 
@@ -87,7 +153,76 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         metadatas = [doc.metadata for doc in documents]
         return self.create_documents(texts, metadatas=metadatas)
 
-    def _join_docs(self, docs: List[str], separator: str) -> Optional[str]:
+    def lazy_split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Split documents one at a time, yielding chunks as they are produced.
+
+        Unlike :meth:`split_documents`, each chunk gets a shallow copy of its document's metadata.
+        """
+        for doc in documents:
+            for chunk in self.split_text(doc.page_content):
+                yield Document(page_content=chunk, metadata=dict(doc.metadata))
+
+    def split_stream(self, stream: TextIO, buffer_size: int = 1 << 20) -> Iterator[str]:
+        """Split text read from a file-like object, holding at most about `buffer_size` characters.
+
+        The stream is read in blocks of `buffer_size`. Each window is split with :meth:`split_text`, all
+        chunks but the last are yielded, and the text from the start of the last chunk is carried into the
+        next window, so chunks never end at an arbitrary block boundary. Boundaries may still differ
+        slightly from splitting the whole text at once. A window that still yields a single chunk at
+        twice `buffer_size`, e.g. when the separator never occurs, is emitted as it is split rather than
+        carried further.
+        """
+        for _, chunks, _ in self._split_windows(stream, buffer_size):
+            yield from chunks
+
+    def _split_windows(self, stream: TextIO, buffer_size: int) -> Iterator[Tuple[str, List[str], int]]:
+        """Yield `(window, chunks, consumed)` for :meth:`split_stream`, where the next window starts at
+        offset `consumed` of this one."""
+        carry = ""
+        while True:
+            block = stream.read(buffer_size)
+            window = carry + block
+            if not block:
+                if window:
+                    yield window, self.split_text(window), len(window)
+                return
+            chunks = self.split_text(window)
+            if len(chunks) < 2:
+                if len(window) < 2 * buffer_size:
+                    carry = window
+                    continue
+                yield window, chunks, len(window)
+                carry = ""
+                continue
+            start = window.rfind(chunks[-1])
+            if start < 0:
+                # the chunk is not a verbatim slice of the window, e.g. decoded tokens
+                yield window, chunks, len(window)
+                carry = ""
+            else:
+                yield window, chunks[:-1], start
+                carry = window[start:]
+
+    def split_to_chunks(
+        self, text: str, metadata: Optional[dict] = None, doc_id: str = ""
+    ) -> Iterator[Chunk]:
+        """Split text into compact :class:`Chunk` offsets sharing `text` and one read-only metadata."""
+        source = ChunkSource(doc_id, metadata, text=text)
+        chunks = self.split_text(text)
+        for chunk, offsets in zip(chunks, _locate(text, chunks)):
+            if offsets is None:
+                yield Chunk(source, -1, -1, chunk)
+            else:
+                yield Chunk(source, *offsets)
+
+    def _lengths(self, texts: Sequence[str]) -> List[int]:
+        """Measure `texts`, in one batch if the length function supports it."""
+        batch = getattr(self._length_function, "lengths", None)
+        if batch is not None:
+            return batch(texts)
+        return [self._length_function(text) for text in texts]
+
+    def _join_docs(self, docs: Iterable[str], separator: str) -> Optional[str]:
         text = separator.join(docs)
         text = text.strip()
         if text == "":
@@ -95,16 +230,23 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         else:
             return text
 
-    def _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+    def _merge_splits(
+        self, splits: Iterable[str], separator: str, lengths: Optional[List[int]] = None
+    ) -> List[str]:
         # We now want to combine these smaller pieces into medium size
         # chunks to send to the LLM.
+        # Each split is measured once; lengths of dropped pieces are kept
+        # alongside them instead of being measured again.
+        splits = list(splits)
+        if lengths is None:
+            lengths = self._lengths(splits)
         separator_len = self._length_function(separator)
 
         docs = []
-        current_doc: List[str] = []
+        current_doc: Deque[str] = deque()
+        current_lengths: Deque[int] = deque()
         total = 0
-        for d in splits:
-            _len = self._length_function(d)
+        for d, _len in zip(splits, lengths):
             if (
                 total + _len + (separator_len if len(current_doc) > 0 else 0)
                 > self._chunk_size
@@ -126,11 +268,12 @@ class TextSplitter(BaseDocumentTransformer, ABC):
                         > self._chunk_size
                         and total > 0
                     ):
-                        total -= self._length_function(current_doc[0]) + (
+                        total -= current_lengths.popleft() + (
                             separator_len if len(current_doc) > 1 else 0
                         )
-                        current_doc = current_doc[1:]
+                        current_doc.popleft()
             current_doc.append(d)
+            current_lengths.append(_len)
             total += _len + (separator_len if len(current_doc) > 1 else 0)
         doc = self._join_docs(current_doc, separator)
         if doc is not None:
@@ -148,15 +291,15 @@ class TextSplitter(BaseDocumentTransformer, ABC):
                     "Tokenizer received was not an instance of PreTrainedTokenizerBase"
                 )
 
-            def _huggingface_tokenizer_length(text: str) -> int:
-                return len(tokenizer.encode(text))
+            def _huggingface_tokenizer_lengths(texts: List[str]) -> List[int]:
+                return [len(ids) for ids in tokenizer(list(texts))["input_ids"]]
 
         except ImportError:
             raise ValueError(
                 "Could not import transformers python package. "
                 "Please install it with `pip install transformers`."
             )
-        return cls(length_function=_huggingface_tokenizer_length, **kwargs)
+        return cls(length_function=TokenLengthCache(_huggingface_tokenizer_lengths), **kwargs)
 
     @classmethod
     def from_tiktoken_encoder(
@@ -182,14 +325,15 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         else:
             enc = tiktoken.get_encoding(encoding_name)
 
-        def _tiktoken_encoder(text: str) -> int:
-            return len(
-                enc.encode(
-                    text,
+        def _tiktoken_encoder(texts: List[str]) -> List[int]:
+            return [
+                len(ids)
+                for ids in enc.encode_batch(
+                    list(texts),
                     allowed_special=allowed_special,
                     disallowed_special=disallowed_special,
                 )
-            )
+            ]
 
         if issubclass(cls, TokenTextSplitter):
             extra_kwargs = {
@@ -200,7 +344,7 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             }
             kwargs = {**kwargs, **extra_kwargs}
 
-        return cls(length_function=_tiktoken_encoder, **kwargs)
+        return cls(length_function=TokenLengthCache(_tiktoken_encoder), **kwargs)
 
     def transform_documents(
         self, documents: Sequence[Document], **kwargs: Any
@@ -313,18 +457,21 @@ class RecursiveCharacterTextSplitter(TextSplitter):
             splits = list(text)
         # Now go merging things, recursively splitting longer texts.
         _good_splits = []
-        for s in splits:
-            if self._length_function(s) < self._chunk_size:
+        _good_lengths = []
+        for s, _len in zip(splits, self._lengths(splits)):
+            if _len < self._chunk_size:
                 _good_splits.append(s)
+                _good_lengths.append(_len)
             else:
                 if _good_splits:
-                    merged_text = self._merge_splits(_good_splits, separator)
+                    merged_text = self._merge_splits(_good_splits, separator, _good_lengths)
                     final_chunks.extend(merged_text)
                     _good_splits = []
+                    _good_lengths = []
                 other_info = self.split_text(s)
                 final_chunks.extend(other_info)
         if _good_splits:
-            merged_text = self._merge_splits(_good_splits, separator)
+            merged_text = self._merge_splits(_good_splits, separator, _good_lengths)
             final_chunks.extend(merged_text)
         return final_chunks
 
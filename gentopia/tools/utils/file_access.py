@@ -0,0 +1,204 @@
+"""Bounded-memory access to large files for the file tools.
+
+Reads go through :mod:`mmap`, so only the pages actually touched are loaded and memory use does not grow
+with the size of the file. Line ranges are located with a sparse index of line offsets, built with one
+streaming pass per file version and cached, so reading lines near the end of a multi-GB log does not scan
+it again. :func:`grep` runs the regular expression over the mapping and returns matching lines as it finds
+them, and :func:`summarize` describes a file too large to return whole.
+"""
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+
+# Every INDEX_STEP-th line start is recorded in a LineIndex.
+INDEX_STEP = 1024
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[Optional[mmap.mmap]]:
+    """Read-only mapping of `path`, or None for an empty file, which cannot be mapped."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _count_newlines(mm: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    for position in range(start, end, CHUNK_SIZE):
+        count += mm[position:min(position + CHUNK_SIZE, end)].count(b"\n")
+    return count
+
+
+class LineIndex:
+    """Byte offsets of every `INDEX_STEP`-th line start of a file, and its number of lines.
+
+    :param path: File to index.
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        self.offsets: List[int] = [0]
+        self.lines = 0
+        with _mapped(path) as mm:
+            if mm is None:
+                return
+            size, line = len(mm), 0
+            for position in range(0, size, CHUNK_SIZE):
+                chunk = np.frombuffer(mm[position:position + CHUNK_SIZE], dtype=np.uint8)
+                newlines = np.flatnonzero(chunk == ord("\n"))
+                # the newlines ending lines INDEX_STEP, 2 * INDEX_STEP, ... that fall into this chunk
+                first = (line // INDEX_STEP + 1) * INDEX_STEP
+                ends = newlines[np.arange(first - line - 1, len(newlines), INDEX_STEP)]
+                self.offsets.extend(int(position + end + 1) for end in ends if position + end + 1 < size)
+                line += len(newlines)
+            # a last line without a trailing newline still counts
+            self.lines = line + (0 if mm[size - 1:size] == b"\n" else 1)
+
+    def seek(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset of the start of `line` (0-based), or the file size past the end."""
+        block = min(line // INDEX_STEP, len(self.offsets) - 1)
+        position = self.offsets[block]
+        for _ in range(line - block * INDEX_STEP):
+            newline = mm.find(b"\n", position)
+            if newline < 0:
+                return len(mm)
+            position = newline + 1
+        return position
+
+
+_indexes: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def line_index(path: str, maxsize: int = 32) -> LineIndex:
+    """Return the cached :class:`LineIndex` of the current version (size and mtime) of `path`."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = LineIndex(path)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > maxsize:
+            _indexes.popitem(last=False)
+    return index
+
+
+def read_range(path: str, offset: int = 0, length: Optional[int] = None) -> str:
+    """Read `length` bytes from `offset` (to the end if None)."""
+    with _mapped(path) as mm:
+        if mm is None:
+            return ""
+        end = len(mm) if length is None else min(offset + length, len(mm))
+        return _decode(mm[offset:end])
+
+
+def read_lines(path: str, start: int = 1, end: Optional[int] = None, max_bytes: Optional[int] = None) -> str:
+    """Read lines `start` to `end`, 1-based and inclusive (to the last line if None), but at most
+    `max_bytes` bytes."""
+    index = line_index(path)
+    with _mapped(path) as mm:
+        if mm is None:
+            return ""
+        begin = index.seek(mm, max(start, 1) - 1)
+        stop = len(mm) if end is None else index.seek(mm, end)
+        if max_bytes is not None:
+            stop = min(stop, begin + max_bytes)
+        return _decode(mm[begin:stop])
+
+
+def grep(path: str, pattern: str, max_matches: int = 100, max_line_chars: int = 500) -> Iterator[Tuple[int, str]]:
+    """Yield ``(line number, line)`` of lines matching the regular expression `pattern`, in order.
+
+    :raises re.error: If `pattern` is not a valid regular expression.
+    """
+    regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    with _mapped(path) as mm:
+        if mm is None:
+            return
+        line, counted, found = 1, 0, 0
+        position = 0
+        while found < max_matches:
+            match = regex.search(mm, position)
+            if match is None:
+                return
+            begin = mm.rfind(b"\n", 0, match.start()) + 1
+            if begin == len(mm):
+                # an empty match after the trailing newline, not on a line
+                return
+            stop = mm.find(b"\n", match.end())
+            stop = len(mm) if stop < 0 else stop
+            line += _count_newlines(mm, counted, begin)
+            counted = begin
+            found += 1
+            yield line, _decode(mm[begin:min(stop, begin + max_line_chars)])
+            position = stop + 1
+            if position > len(mm):
+                return
+
+
+def summarize(path: str, head: int = 20, tail: int = 20, index_entries: int = 20, max_bytes: int = 4096) -> str:
+    """Describe a file too large to return whole: its size, line count, first and last lines (up to
+    `max_bytes` each), and the byte offsets of evenly spaced lines, as starting points for ranged reads."""
+    size = os.path.getsize(path)
+    index = line_index(path)
+    parts = [f"{path}: {size} bytes, {index.lines} lines. Too large to return whole; read parts of it with "
+             f"start_line/end_line, offset/length or a pattern."]
+    parts.append(f"First {min(head, index.lines)} lines:\n" + read_lines(path, 1, head, max_bytes).rstrip("\n"))
+    if index.lines > head:
+        first = max(index.lines - tail + 1, head + 1)
+        last = read_lines(path, first, None, max_bytes).rstrip("\n")
+        parts.append(f"Last {index.lines - first + 1} lines:\n" + last)
+    step = max(len(index.offsets) // index_entries, 1)
+    entries = [f"line {i * INDEX_STEP + 1}: byte {offset}" for i, offset in enumerate(index.offsets)][::step]
+    if len(entries) > 1:
+        parts.append("Index:\n" + "\n".join(entries))
+    return "\n\n".join(parts)
+
+
+def patch(path: str, old: str, new: str) -> bool:
+    """Replace the first occurrence of `old` in `path` with `new`, streaming the rest of the file into a
+    temporary file that then replaces it.
+
+    :return: False if `old` does not occur.
+    :rtype: bool
+    """
+    target = old.encode("utf-8")
+    with _mapped(path) as mm:
+        found = -1 if mm is None else mm.find(target)
+        if found < 0:
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".patch-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for position in range(0, found, CHUNK_SIZE):
+                    out.write(mm[position:min(position + CHUNK_SIZE, found)])
+                out.write(new.encode("utf-8"))
+                for position in range(found + len(target), len(mm), CHUNK_SIZE):
+                    out.write(mm[position:min(position + CHUNK_SIZE, len(mm))])
+            os.chmod(temporary, os.stat(path).st_mode & 0o7777)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    os.replace(temporary, path)
+    return True
@@ -0,0 +1,236 @@
+"""Pool of isolated Python interpreter processes for running agent-written code.
+
+Each session gets a worker process of its own, which keeps the session's variables between calls. Code
+never runs in the agent process: a snippet that loops forever, eats memory or crashes the interpreter only
+takes down its worker, which is killed and replaced, while other sessions keep running in parallel.
+
+Idle workers are started ahead of need, so a new session does not wait for Python to start, and workers
+talk to the agent over a socket with one pickle per message. A worker's address space is capped with
+``RLIMIT_AS``, and calls are given a wall-clock limit which also follows the enclosing
+:mod:`gentopia.utils.execution` deadline. Workers are only supported on POSIX systems.
+"""
+import atexit
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Connection
+from typing import Any, List, NamedTuple, Optional
+
+from gentopia.utils.execution import current_context
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpreter_worker.py")
+
+
+class Outcome(NamedTuple):
+    """Result of running a snippet: what it printed, the value of its final expression (None if it does not
+    end with one), and the error it raised, formatted as ``"<type>: <message>"``."""
+    output: str
+    result: Any
+    error: Optional[str]
+
+
+class _Worker:
+    def __init__(self, memory_limit: Optional[int], max_output: int):
+        if os.name != "posix":
+            raise RuntimeError("Interpreter workers are only supported on POSIX systems.")
+        parent, child = socket.socketpair()
+        try:
+            # run as a plain script: only the standard library is loaded, and the caller's __main__ is not
+            # re-imported as multiprocessing's spawn and forkserver methods would
+            self.process = subprocess.Popen(
+                [sys.executable, _WORKER_SCRIPT, str(child.fileno()), str(memory_limit or 0), str(max_output)],
+                pass_fds=(child.fileno(),), stdin=subprocess.DEVNULL)
+        except BaseException:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        self.conn = Connection(parent.detach())
+        self.lock = threading.Lock()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(1)
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class InterpreterPool:
+    """Python interpreter processes, one per session, with warm spares for new sessions.
+
+    :param spares: Number of idle workers kept started for new sessions, defaults to 1.
+    :type spares: int
+    :param max_sessions: Maximum number of live sessions; the least recently used is closed beyond it,
+        defaults to 16.
+    :type max_sessions: int
+    :param memory_limit: Address-space limit of a worker in bytes, None for no limit, defaults to 2 GB.
+    :type memory_limit: Optional[int]
+    :param max_output: Characters of printed output returned per call, defaults to 10000.
+    :type max_output: int
+    """
+
+    def __init__(self, spares: int = 1, max_sessions: int = 16, memory_limit: Optional[int] = 2 << 30,
+                 max_output: int = 10000):
+        self.spares = spares
+        self.max_sessions = max_sessions
+        self.memory_limit = memory_limit
+        self.max_output = max_output
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Worker]" = OrderedDict()
+        self._spares: List[_Worker] = []
+        self._closed = False
+        self._refilling = False
+        self._refill()
+
+    def execute(self, session: str, code: str, timeout: Optional[float] = None) -> Outcome:
+        """Run `code` in the interpreter of `session`, starting one if needed. Calls on one session run one at
+        a time; calls on different sessions run in parallel.
+
+        :param session: Session whose variables the code sees and updates.
+        :type session: str
+        :param code: Python source. If its last statement is an expression, its value is the result.
+        :type code: str
+        :param timeout: Wall-clock limit in seconds, shortened to the enclosing deadline, defaults to None.
+            When it is exceeded the session's worker is killed, so the session starts over empty.
+        :type timeout: Optional[float]
+        :raises TimeoutError: If the code did not finish in time or the enclosing context was cancelled.
+        :raises RuntimeError: If the worker died, e.g. killed by the system for using too much memory. The
+            session starts over empty.
+        :return: Printed output, result and error of the code.
+        :rtype: Outcome
+        """
+        ctx = current_context()
+        if ctx is not None:
+            timeout = ctx.clamp(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            worker = self._checkout(session)
+            with worker.lock:
+                # the worker may have been killed by a timed-out call that held the session before us
+                if self._sessions.get(session) is worker:
+                    return self._call(session, worker, code, timeout, deadline)
+
+    def _call(self, session: str, worker: _Worker, code: str, timeout: Optional[float],
+              deadline: Optional[float]) -> Outcome:
+        ctx = current_context()
+        try:
+            worker.conn.send_bytes(pickle.dumps(code))
+            while not worker.conn.poll(self._poll_interval(deadline)):
+                if ctx is not None and ctx.cancelled:
+                    self._drop(session, worker)
+                    raise TimeoutError(f"execution was stopped: {ctx.interruption}")
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._drop(session, worker)
+                    raise TimeoutError(f"execution did not finish within {timeout:.1f}s")
+            return Outcome(*pickle.loads(worker.conn.recv_bytes()))
+        except TimeoutError:
+            raise
+        except (EOFError, OSError):
+            self._drop(session, worker)
+            raise RuntimeError(f"the interpreter process exited with code {worker.process.returncode}")
+
+    @staticmethod
+    def _poll_interval(deadline: Optional[float]) -> float:
+        # short enough to notice cancellation of the enclosing context promptly
+        return 0.25 if deadline is None else max(0.0, min(0.25, deadline - time.monotonic()))
+
+    def reset(self, session: str):
+        """Close the interpreter of `session`; its next call starts with empty variables."""
+        with self._lock:
+            worker = self._sessions.pop(session, None)
+        if worker is not None:
+            worker.kill()
+
+    def sessions(self) -> List[str]:
+        """Sessions with a live interpreter, least recently used first."""
+        with self._lock:
+            return list(self._sessions)
+
+    def close(self):
+        """Kill all workers."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._sessions.values()) + self._spares
+            self._sessions.clear()
+            self._spares.clear()
+        for worker in workers:
+            worker.kill()
+
+    def _checkout(self, session: str) -> _Worker:
+        evicted: Optional[_Worker] = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The interpreter pool is closed.")
+            worker = self._sessions.get(session)
+            if worker is not None and worker.alive():
+                self._sessions.move_to_end(session)
+                return worker
+            worker = self._spares.pop() if self._spares else None
+            if len(self._sessions) >= self.max_sessions and session not in self._sessions:
+                _, evicted = self._sessions.popitem(last=False)
+        if evicted is not None:
+            evicted.kill()
+        if worker is None:
+            worker = _Worker(self.memory_limit, self.max_output)
+        with self._lock:
+            stale = self._sessions.get(session)
+            self._sessions[session] = worker
+            self._sessions.move_to_end(session)
+        if stale is not None:
+            stale.kill()
+        self._refill()
+        return worker
+
+    def _drop(self, session: str, worker: _Worker):
+        with self._lock:
+            if self._sessions.get(session) is worker:
+                del self._sessions[session]
+        worker.kill()
+
+    def _refill(self):
+        """Start spare workers in the background, so the next new session does not wait for one."""
+        def start():
+            try:
+                while True:
+                    with self._lock:
+                        if self._closed or len(self._spares) >= self.spares:
+                            return
+                    worker = _Worker(self.memory_limit, self.max_output)
+                    with self._lock:
+                        if self._closed:
+                            worker.kill()
+                            return
+                        self._spares.append(worker)
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        with self._lock:
+            if self._refilling or self._closed or len(self._spares) >= self.spares:
+                return
+            self._refilling = True
+        threading.Thread(target=start, daemon=True, name="gentopia-interpreter-refill").start()
+
+
+_pool: Optional[InterpreterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_interpreter_pool() -> InterpreterPool:
+    """Return the process-wide interpreter pool, created on first use and closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InterpreterPool()
+            atexit.register(_pool.close)
+        return _pool
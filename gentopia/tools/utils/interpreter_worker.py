@@ -0,0 +1,89 @@
+"""Worker process of :class:`gentopia.tools.utils.interpreter_pool.InterpreterPool`.
+
+Run as a script, not imported, so that starting a worker loads nothing but the standard library::
+
+    python interpreter_worker.py <socket fd> <memory limit in bytes, 0 for none> <max output characters>
+
+It reads code strings from the socket and answers each with a pickled ``(output, result, error)`` tuple.
+All code runs in one namespace, which is the session's state.
+"""
+import ast
+import builtins
+import io
+import pickle
+import signal
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing.connection import Connection
+from typing import Any, List, Optional, Tuple
+
+_PLAIN_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+class _CappedOutput(io.TextIOBase):
+    """Text sink keeping the first `limit` characters written to it."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(s[:room])
+            self.size += min(len(s), room)
+        self.dropped += max(0, len(s) - max(room, 0))
+        return len(s)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            text += f"\n... ({self.dropped} more characters)\n"
+        return text
+
+
+def execute(code: str, namespace: dict, max_output: int) -> Tuple[str, Any, Optional[str]]:
+    """Run `code` in `namespace`; if it ends with an expression, evaluate it (once) as the result."""
+    out = _CappedOutput(max_output)
+    result, error = None, None
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            tree = ast.parse(code, mode="exec")
+            last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+            exec(compile(tree, "<session>", "exec"), namespace)
+            if last is not None:
+                result = eval(compile(ast.Expression(last.value), "<session>", "eval"), namespace)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+    if not isinstance(result, _PLAIN_TYPES):
+        # the agent only needs the text; shipping arbitrary objects could be large or fail to unpickle there
+        result = str(result)
+    return out.getvalue(), result, error
+
+
+def main(fd: int, memory_limit: int, max_output: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_limit:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (ImportError, ValueError, OSError):
+            pass
+    conn = Connection(fd)
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    sys.argv = [""]
+    while True:
+        try:
+            code = pickle.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            return
+        conn.send_bytes(pickle.dumps(execute(code, namespace, max_output)))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
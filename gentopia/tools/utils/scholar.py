@@ -0,0 +1,266 @@
+"""Google Scholar access for the scholar tools.
+
+The tools page through results: calling one again with the same query returns the next `top_k` items. The
+position in each result list is a :class:`Cursor`, kept per session and tool in a :class:`CursorStore`, so
+tools shared by concurrent sessions do not advance each other's results. While the agent reads a page, the
+cursor fetches the next one in the background.
+
+:class:`ScholarBackend` makes the actual requests through :mod:`scholarly` and caches filled author records
+by scholar_id and publication lookups by title, so multi-hop workflows (an author's papers, then papers
+citing or related to one of them) do not look the same record up twice. :class:`ReplayScholarBackend`
+records calls to a JSON fixture and serves them back offline.
+
+Example:
+    .. code-block:: python
+
+        from gentopia.tools.utils.scholar import ReplayScholarBackend, set_scholar_backend
+
+        set_scholar_backend(ReplayScholarBackend("scholar_fixture.json"))   # offline, from a recording
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from gentopia.tools.utils.cache import MemoryCache, ToolCache
+from gentopia.utils.single_flight import make_key
+
+
+class ScholarBackend:
+    """Google Scholar requests through :mod:`scholarly`, with a cache of author and publication records.
+
+    :param record_ttl: Seconds a cached record stays valid, defaults to one day.
+    :type record_ttl: Optional[float]
+    :param cache: Record cache, defaults to an in-memory one holding 1024 records.
+    :type cache: Optional[ToolCache]
+    """
+
+    def __init__(self, record_ttl: Optional[float] = 86400.0, cache: Optional[ToolCache] = None):
+        self.record_ttl = record_ttl
+        self.cache = cache or ToolCache(MemoryCache(maxsize=1024))
+
+    def search_author(self, name: str) -> Iterable[dict]:
+        return self._open("search_author", name)
+
+    def search_keywords(self, keywords: List[str]) -> Iterable[dict]:
+        return self._open("search_keywords", keywords)
+
+    def search_pubs(self, title: str, sort_by: str) -> Iterable[dict]:
+        return self._open("search_pubs", title, sort_by)
+
+    def author(self, uid: str, sort_by: str) -> dict:
+        """Author record with publications sorted by `sort_by`, cached by scholar_id."""
+        return self._record("author", uid, sort_by)
+
+    def publication(self, title: str) -> dict:
+        """Best match of a publication title, cached by title."""
+        return self._record("publication", title)
+
+    def related_pubs(self, title: str) -> Iterable[dict]:
+        return self._open("related_pubs", title)
+
+    def citing_pubs(self, title: str) -> Iterable[dict]:
+        return self._open("citing_pubs", title)
+
+    def _record(self, kind: str, *args: Any) -> dict:
+        return self.cache.get_or_compute(make_key(kind, *args), self.record_ttl, lambda: self._open(kind, *args))
+
+    def _open(self, method: str, *args: Any) -> Any:
+        """Make the request behind `method`: a record, or an iterator over results fetched page by page."""
+        from scholarly import scholarly
+
+        if method == "search_author":
+            return scholarly.search_author(args[0])
+        if method == "search_keywords":
+            return scholarly.search_keywords(args[0])
+        if method == "search_pubs":
+            return scholarly.search_pubs(args[0], sort_by=args[1])
+        if method == "author":
+            # filling while looking up saves the separate request for the basic profile
+            return scholarly.search_author_id(args[0], filled=True, sortby=args[1])
+        if method == "publication":
+            return scholarly.search_single_pub(args[0])
+        if method == "related_pubs":
+            return scholarly.get_related_articles(self.publication(args[0]))
+        if method == "citing_pubs":
+            return scholarly.citedby(self.publication(args[0]))
+        raise ValueError(f"Unknown scholar method {method}")
+
+
+class ReplayScholarBackend(ScholarBackend):
+    """Serves recorded results from a JSON fixture, for offline tests and reproducible runs.
+
+    :param path: Fixture file.
+    :type path: str
+    :param record: Whether to forward calls missing from the fixture to Google Scholar and record them, items of
+        result lists as they are consumed; call :meth:`save` to write the fixture. Defaults to False.
+    :type record: bool
+    """
+
+    def __init__(self, path: str, record: bool = False, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+        self.record = record
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Any] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._calls = json.load(f)
+
+    def _open(self, method: str, *args: Any) -> Any:
+        key = json.dumps([method, *args])
+        with self._lock:
+            recorded = self._calls.get(key)
+        if recorded is not None:
+            return iter(recorded) if isinstance(recorded, list) else recorded
+        if not self.record:
+            raise KeyError(f"No recorded result for {method}{args}")
+        result = super()._open(method, *args)
+        if isinstance(result, dict):
+            with self._lock:
+                self._calls[key] = result
+            return result
+        items: List[Any] = []
+        with self._lock:
+            self._calls[key] = items
+        return self._recording(result, items)
+
+    def _recording(self, results: Iterable, items: List[Any]) -> Iterator:
+        for item in results:
+            with self._lock:
+                items.append(item)
+            yield item
+
+    def save(self):
+        """Write the calls recorded so far to the fixture file."""
+        with self._lock:
+            payload = json.dumps(self._calls, indent=1, default=str)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+
+class Cursor:
+    """Position in a result list. After each page is read, the next one is fetched in the background.
+
+    :param key: Identity of the query.
+    :type key: Hashable
+    :param results: Iterator over the results.
+    :type results: Iterator
+    :param executor: Runs prefetches.
+    :type executor: ThreadPoolExecutor
+    """
+
+    def __init__(self, key: Hashable, results: Iterator, executor: ThreadPoolExecutor):
+        self.key = key
+        self._results = results
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._buffer: List[Any] = []
+        self._exhausted = False
+        self._error: Optional[BaseException] = None
+
+    def next_page(self, size: int) -> List[Any]:
+        """Return the next `size` results (fewer at the end), then start fetching the page after them."""
+        with self._lock:
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            self._fill(size)
+            page, self._buffer = self._buffer[:size], self._buffer[size:]
+            if not self._exhausted and len(self._buffer) < size:
+                self._executor.submit(self._prefetch_page, size)
+        return page
+
+    def _prefetch_page(self, size: int):
+        with self._lock:
+            try:
+                self._fill(size)
+            except Exception as e:
+                self._error = e
+
+    def _fill(self, size: int):
+        while len(self._buffer) < size and not self._exhausted:
+            try:
+                self._buffer.append(next(self._results))
+            except StopIteration:
+                self._exhausted = True
+
+
+class CursorStore:
+    """Cursors of all sessions, one per session and tool.
+
+    :param max_cursors: Maximum number of cursors kept; the least recently used is dropped beyond it,
+        defaults to 256.
+    :type max_cursors: int
+    :param prefetch_workers: Threads fetching next pages in the background, defaults to 4.
+    :type prefetch_workers: int
+    """
+
+    def __init__(self, max_cursors: int = 256, prefetch_workers: int = 4):
+        self.max_cursors = max_cursors
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="gentopia-scholar")
+        self._lock = threading.Lock()
+        self._cursors: "OrderedDict[Tuple[str, str], Cursor]" = OrderedDict()
+
+    def page(self, session: str, tool: str, key: Hashable, open_results: Callable[[], Iterable],
+             size: int) -> List[Any]:
+        """Return the next `size` results of the query `key` for `tool` in `session`. A query differing from
+        the previous one of the tool in that session starts over with `open_results`.
+
+        :param session: Session the cursor belongs to.
+        :type session: str
+        :param tool: Tool the cursor belongs to.
+        :type tool: str
+        :param key: Identity of the query, e.g. its arguments.
+        :type key: Hashable
+        :param open_results: Starts the query and returns its results.
+        :type open_results: Callable[[], Iterable]
+        :param size: Number of results to return.
+        :type size: int
+        :return: Up to `size` results; empty once all have been returned.
+        :rtype: List[Any]
+        """
+        with self._lock:
+            cursor = self._cursors.get((session, tool))
+            if cursor is not None:
+                self._cursors.move_to_end((session, tool))
+        if cursor is None or cursor.key != key:
+            cursor = Cursor(key, iter(open_results()), self._executor)
+            with self._lock:
+                self._cursors[(session, tool)] = cursor
+                while len(self._cursors) > self.max_cursors:
+                    self._cursors.popitem(last=False)
+        return cursor.next_page(size)
+
+    def reset(self, session: str):
+        """Drop all cursors of `session`."""
+        with self._lock:
+            for name in [name for name in self._cursors if name[0] == session]:
+                del self._cursors[name]
+
+
+_backend: ScholarBackend = ScholarBackend()
+_cursors = CursorStore()
+
+
+def get_scholar_backend() -> ScholarBackend:
+    """Return the process-wide scholar backend."""
+    return _backend
+
+
+def set_scholar_backend(backend: ScholarBackend) -> ScholarBackend:
+    """Replace the process-wide scholar backend, e.g. with a :class:`ReplayScholarBackend`.
+
+    :return: The previous backend.
+    :rtype: ScholarBackend
+    """
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def get_cursor_store() -> CursorStore:
+    """Return the process-wide cursor store."""
+    return _cursors
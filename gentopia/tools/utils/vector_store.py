@@ -1,4 +1,8 @@
-from typing import Type, List
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import chain, islice
+from queue import Empty
+from typing import Type, List, Iterable, Iterator, Callable, Dict, Optional, Sequence, Tuple, Union
 
 
 from pydantic import BaseModel, Field, Extra
@@ -8,16 +12,116 @@ from gentopia.memory.vectorstores.chroma import Chroma
 from gentopia.memory.vectorstores.vectorstore import VectorStore
 from gentopia.tools.utils import Document
 from gentopia.tools.utils.document_loaders.base_loader import BaseLoader
+from gentopia.tools.utils.document_loaders.chunk import Chunk
 from gentopia.tools.utils.document_loaders.text_splitter import TextSplitter, _get_default_text_splitter
 
 
+def _batched(iterable: Iterable, n: int) -> Iterator[list]:
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+# Process pool workers send (page_content, metadata) pairs, which pickle much faster than Documents.
+def _load_and_split(loaders: Sequence[BaseLoader], text_splitter: TextSplitter) -> Iterator[Tuple[str, dict]]:
+    for loader in loaders:
+        for chunk in loader.lazy_load_and_split(text_splitter):
+            yield chunk.page_content, chunk.metadata
+
+
+def _split_documents(documents: Sequence[Document], text_splitter: TextSplitter) -> Iterator[Tuple[str, dict]]:
+    for chunk in text_splitter.lazy_split_documents(documents):
+        yield chunk.page_content, chunk.metadata
+
+
+# Batches a worker may send ahead of the calling process, per work unit.
+_PREFETCH_BATCHES = 4
+
+# Queues of the worker process, one per slot of the window of units in flight, set by _init_worker.
+_queues: Optional[List[multiprocessing.Queue]] = None
+
+
+def _init_worker(queues: List[multiprocessing.Queue]):
+    global _queues
+    _queues = queues
+
+
+def _produce(index: int, unit: Sequence, fn: Callable, text_splitter: TextSplitter, batch_size: int):
+    """Send the chunks of a work unit in batches to the queue of its slot, then None."""
+    queue = _queues[index % len(_queues)]
+    for batch in _batched(fn(unit, text_splitter), batch_size):
+        queue.put(batch)
+    queue.put(None)
+
+
+def _streamed(pool: Executor, queues: List[multiprocessing.Queue], fn: Callable, units: Iterable[Sequence],
+              text_splitter: TextSplitter, batch_size: int) -> Iterator[Tuple[str, dict]]:
+    """Chunks of `units` in order, with at most one unit per queue in flight.
+
+    Units are submitted in order and the next one only once the oldest is consumed, so the units in flight
+    are consecutive and unit `i` can own the queue ``i % len(queues)``. Only the oldest unit's queue is read;
+    workers of later units block once theirs is full."""
+    units = enumerate(units)
+    running: Dict[int, Future] = {}
+
+    def submit():
+        for index, unit in units:
+            running[index] = pool.submit(_produce, index, unit, fn, text_splitter, batch_size)
+            return
+
+    try:
+        for _ in queues:
+            submit()
+        head = 0
+        while running:
+            try:
+                batch = queues[head % len(queues)].get(timeout=0.5)
+            except Empty:
+                # a failed worker sends no end marker
+                future = running[head]
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+                continue
+            if batch is None:
+                running.pop(head).result()
+                head += 1
+                submit()
+            else:
+                yield from batch
+    finally:
+        for future in running.values():
+            future.cancel()
+        # unblock workers waiting to put into a full queue, so the pool can shut down
+        while any(not future.done() for future in running.values()):
+            for queue in queues:
+                try:
+                    queue.get_nowait()
+                except Empty:
+                    pass
+
+
 class VectorstoreIndexCreator(BaseModel):
-    """Logic for creating indexes."""
+    """Logic for creating indexes.
+
+    Chunks are embedded and inserted `batch_size` at a time as they are split, so only one batch is held in
+    memory besides what the vector store itself keeps.
+
+    With `n_workers` > 1, loading and splitting run in a process pool: loaders (or documents) are sent in
+    work units of `worker_chunksize`, and workers stream their chunks back in batches of `batch_size`
+    through bounded queues while the calling process embeds and inserts, so memory does not grow with the
+    size of a unit. Chunks arrive in the same order as without workers. At most two units per worker are in
+    flight, each buffering a few batches ahead.
+    Loaders and the text splitter must be picklable, which rules out splitters built with
+    :meth:`TextSplitter.from_tiktoken_encoder`.
+    """
 
     vectorstore_cls: Type[VectorStore] = Chroma
     embedding: Embeddings = Field(default_factory=OpenAIEmbeddings)
     text_splitter: TextSplitter = Field(default_factory=_get_default_text_splitter)
     vectorstore_kwargs: dict = Field(default_factory=dict)
+    batch_size: int = 256
+    n_workers: int = 1
+    worker_chunksize: int = 1
 
     class Config:
         """Configuration for this pydantic object."""
@@ -27,15 +131,36 @@ class VectorstoreIndexCreator(BaseModel):
 
     def from_loaders(self, loaders: List[BaseLoader]) -> VectorStore:
         """Create a vectorstore index from loaders."""
-        docs = []
-        for loader in loaders:
-            docs.extend(loader.load())
-        return self.from_documents(docs)
+        if self.n_workers > 1:
+            return self._from_pool(_load_and_split, loaders)
+        chunks = chain.from_iterable(loader.lazy_load_and_split(self.text_splitter) for loader in loaders)
+        return self.from_chunks(chunks)
 
     def from_documents(self, documents: List[Document]) -> VectorStore:
         """Create a vectorstore index from documents."""
-        sub_docs = self.text_splitter.split_documents(documents)
-        vectorstore = self.vectorstore_cls.from_documents(
-            sub_docs, self.embedding, **self.vectorstore_kwargs
-        )
-        return vectorstore
\ No newline at end of file
+        if self.n_workers > 1:
+            return self._from_pool(_split_documents, documents)
+        return self.from_chunks(self.text_splitter.lazy_split_documents(documents))
+
+    def _from_pool(self, fn: Callable, items: Iterable) -> VectorStore:
+        context = multiprocessing.get_context()
+        queues = [context.Queue(maxsize=_PREFETCH_BATCHES) for _ in range(2 * self.n_workers)]
+        with ProcessPoolExecutor(max_workers=self.n_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(queues,)) as pool:
+            units = _batched(items, self.worker_chunksize)
+            chunks = _streamed(pool, queues, fn, units, self.text_splitter, self.batch_size)
+            return self.from_chunks(Document(page_content=text, metadata=metadata) for text, metadata in chunks)
+
+    def from_chunks(self, chunks: Iterable[Union[Document, Chunk]]) -> VectorStore:
+        """Create a vectorstore index from already split documents or compact chunks, inserting them in
+        batches. Compact chunks are materialized one batch at a time."""
+        vectorstore = None
+        for batch in _batched(chunks, self.batch_size):
+            batch = [chunk.to_document() if isinstance(chunk, Chunk) else chunk for chunk in batch]
+            if vectorstore is None:
+                vectorstore = self.vectorstore_cls.from_documents(batch, self.embedding, **self.vectorstore_kwargs)
+            else:
+                vectorstore.add_documents(batch)
+        if vectorstore is None:
+            vectorstore = self.vectorstore_cls.from_documents([], self.embedding, **self.vectorstore_kwargs)
+        return vectorstore
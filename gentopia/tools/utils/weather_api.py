@@ -0,0 +1,114 @@
+"""Client for the weatherapi.com API used by the weather tools.
+
+Requests share one pooled HTTP session and responses are cached for a few minutes by normalized location
+(case and spacing do not matter) and forecast window, so sessions asking about the same city share one API
+call and one unit of quota; concurrent identical lookups are coalesced into one request. Several locations
+are looked up in parallel with :func:`lookup_many`. The API address is a parameter, so the tools can be
+pointed at a local stub server for offline runs.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from gentopia.tools.utils.cache import MemoryCache, ToolCache
+from gentopia.utils.execution import current_context
+from gentopia.utils.single_flight import make_key
+
+DEFAULT_BASE_URL = "http://api.weatherapi.com/v1"
+
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_maxsize=16))
+
+_cache = ToolCache(MemoryCache(maxsize=1024))
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gentopia-weather")
+
+
+class WeatherAPIError(Exception):
+    """Raised when the API answers with an error; `response` holds what it returned."""
+
+    def __init__(self, message: str, response: Any):
+        super().__init__(message)
+        self.response = response
+
+
+def normalize_location(location: str) -> str:
+    return " ".join(location.split()).casefold()
+
+
+def current(location: str, api_key: Optional[str], base_url: str = DEFAULT_BASE_URL,
+            timeout: Optional[float] = 30.0, ttl: Optional[float] = 300.0) -> Dict[str, Any]:
+    """Current weather at `location`, as returned by the ``current.json`` endpoint.
+
+    :param location: City name, postcode, coordinates or any other query the API accepts.
+    :type location: str
+    :param api_key: API key.
+    :type api_key: Optional[str]
+    :param base_url: Address of the API, defaults to weatherapi.com.
+    :type base_url: str
+    :param timeout: Connect and read timeout in seconds, shortened to the enclosing deadline, defaults to 30.
+    :type timeout: Optional[float]
+    :param ttl: Seconds the response is reused for the same location, defaults to 300.
+    :type ttl: Optional[float]
+    :raises WeatherAPIError: If the API reports an error, e.g. an unknown location.
+    :raises requests.RequestException: If the request fails.
+    :return: The decoded response.
+    :rtype: Dict[str, Any]
+    """
+    return _get("current.json", {"q": normalize_location(location)}, api_key, base_url, timeout, ttl)
+
+
+def forecast(location: str, days: int, api_key: Optional[str], base_url: str = DEFAULT_BASE_URL,
+             timeout: Optional[float] = 30.0, ttl: Optional[float] = 1800.0) -> Dict[str, Any]:
+    """Forecast for the next `days` days at `location`, as returned by the ``forecast.json`` endpoint. See
+    :func:`current` for the other parameters; responses are reused for 30 minutes by default."""
+    return _get("forecast.json", {"q": normalize_location(location), "days": int(days)}, api_key, base_url,
+                timeout, ttl)
+
+
+def lookup_many(lookup: Callable[[str], Any], locations: Sequence[str]) -> List[Any]:
+    """Call `lookup` for each location in parallel, in the caller's execution context, and once per
+    location up to case and spacing.
+
+    :return: The result of each location, in order, or the exception its lookup raised.
+    :rtype: List[Any]
+    """
+    distinct: Dict[str, str] = {}
+    for location in locations:
+        distinct.setdefault(normalize_location(location), location)
+    futures = {key: _executor.submit(contextvars.copy_context().run, lookup, location)
+               for key, location in distinct.items()}
+    results = []
+    for location in locations:
+        future = futures[normalize_location(location)]
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _get(endpoint: str, params: Dict[str, Any], api_key: Optional[str], base_url: str, timeout: Optional[float],
+         ttl: Optional[float]) -> Dict[str, Any]:
+    ctx = current_context()
+    if ctx is not None:
+        timeout = ctx.clamp(timeout)
+    url = f"{base_url.rstrip('/')}/{endpoint}"
+
+    def fetch():
+        response = _session.get(url, params={"key": api_key, **params}, timeout=timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        # error responses are raised rather than returned, so they are not cached
+        if not isinstance(data, dict) or "error" in data:
+            raise WeatherAPIError(str(data.get("error", data) if isinstance(data, dict) else data), data)
+        return data
+
+    return _cache.get_or_compute(make_key(url, api_key, params), ttl, fetch)
@@ -0,0 +1,186 @@
+"""Streaming, size-bounded fetching of web pages as plain text.
+
+:func:`fetch_text` reads a response in chunks and feeds them to an incremental HTML tokenizer that drops
+``<script>`` and ``<style>`` content and stops as soon as enough text has been extracted, so the cost of a
+call follows the size of the result rather than the size of the page. The body is never read past
+`max_bytes`. Responses that are neither HTML nor plain text are rejected from their headers, before any
+of the body is downloaded. Pages are revalidated with ``If-None-Match``/``If-Modified-Since`` when an
+earlier response carried an ETag or Last-Modified header.
+"""
+import codecs
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+import requests
+
+from gentopia.utils.execution import current_context
+
+_session = requests.Session()
+_session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) " \
+                                 "Chrome/120.0 Safari/537.36"
+
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+class UnsupportedContentType(ValueError):
+    """Raised when a response is not HTML or plain text."""
+
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML-to-text converter. Text outside ``<script>`` and ``<style>`` is split into lines,
+    stripped, and blank lines dropped; :attr:`full` becomes True once `max_chars` characters are collected.
+
+    :param max_chars: Number of characters after which extraction stops.
+    :type max_chars: int
+    """
+    SKIPPED_TAGS = ("script", "style")
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.lines: List[str] = []
+        self.size = 0
+        self._pending = ""
+        self._skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth or self.full:
+            return
+        lines = (self._pending + data).splitlines(keepends=True)
+        # the last line may continue in the next text node
+        self._pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            self._add_line(line)
+
+    def _add_line(self, line: str):
+        line = line.strip()
+        if line:
+            self.size += len(line) + (1 if self.lines else 0)
+            self.lines.append(line)
+
+    def text(self) -> str:
+        """The text extracted so far, lines joined by spaces."""
+        if self._pending:
+            self._add_line(self._pending)
+            self._pending = ""
+        return " ".join(self.lines)
+
+
+class ConditionalCache:
+    """LRU store of validators (ETag, Last-Modified) and extracted text per URL for conditional GETs.
+
+    :param maxsize: Maximum number of URLs remembered, defaults to 256.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, int], Tuple[Optional[str], Optional[str], str]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, int]) -> Optional[Tuple[Optional[str], Optional[str], str]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: Tuple[str, int], etag: Optional[str], last_modified: Optional[str], text: str):
+        with self._lock:
+            self._data[key] = (etag, last_modified, text)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_conditional_cache = ConditionalCache()
+
+
+def fetch_text(url: str, max_chars: int = 4096, max_bytes: int = 2 << 20, timeout: Optional[float] = 30.0,
+               conditional: bool = True, session: Optional[requests.Session] = None) -> str:
+    """Fetch `url` and return at most `max_chars` characters of its text.
+
+    :param url: Page to fetch.
+    :type url: str
+    :param max_chars: Characters of text to extract, defaults to 4096.
+    :type max_chars: int
+    :param max_bytes: Maximum number of body bytes read, defaults to 2 MB.
+    :type max_bytes: int
+    :param timeout: Connect and read timeout in seconds, shortened to the enclosing deadline, defaults to 30.
+    :type timeout: Optional[float]
+    :param conditional: Whether to revalidate earlier responses with conditional GETs, defaults to True.
+    :type conditional: bool
+    :param session: Session to use, defaults to a shared one.
+    :type session: Optional[requests.Session]
+    :raises UnsupportedContentType: If the response is not HTML or plain text.
+    :raises requests.RequestException: If the request fails.
+    :return: The extracted text, lines joined by spaces.
+    :rtype: str
+    """
+    ctx = current_context()
+    if ctx is not None:
+        timeout = ctx.clamp(timeout)
+    key = (url, max_chars)
+    cached = _conditional_cache.get(key) if conditional else None
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    with (session or _session).get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and cached is not None:
+            return cached[2]
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "text/html").split(";")[0].strip().lower()
+        if content_type not in _TEXT_TYPES:
+            raise UnsupportedContentType(f"unsupported content type {content_type}")
+        text = _read_text(response, content_type, max_chars, max_bytes)
+        if conditional and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            _conditional_cache.set(key, response.headers.get("ETag"), response.headers.get("Last-Modified"), text)
+    return text
+
+
+def _charset(response: requests.Response) -> str:
+    """Charset declared in the Content-Type header, else UTF-8 (rather than the ISO-8859-1 default of HTTP/1.1
+    that requests applies to text types, which most pages without a declared charset are not)."""
+    for param in response.headers.get("Content-Type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            try:
+                return codecs.lookup(value.strip().strip('"')).name
+            except LookupError:
+                break
+    return "utf-8"
+
+
+def _read_text(response: requests.Response, content_type: str, max_chars: int, max_bytes: int) -> str:
+    decoder = codecs.getincrementaldecoder(_charset(response))(errors="replace")
+    extractor = TextExtractor(max_chars)
+    feed = extractor.handle_data if content_type == "text/plain" else extractor.feed
+    read = 0
+    for chunk in response.iter_content(chunk_size=16384):
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        feed(decoder.decode(chunk))
+        if extractor.full or read >= max_bytes:
+            break
+    else:
+        feed(decoder.decode(b"", final=True))
+    extractor.close()
+    return extractor.text()[:max_chars]
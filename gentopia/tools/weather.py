@@ -1,14 +1,34 @@
-import requests
-import json
 import os
-from typing import AnyStr, Any
+from typing import AnyStr, Any, Dict
 from gentopia.tools.basetool import *
+from gentopia.tools.utils import weather_api
+from gentopia.tools.utils.weather_api import WeatherAPIError
 
 
 class Weather(BaseTool):
     api_key: str = os.getenv("WEATHER_API_KEY")
-    URL_CURRENT_WEATHER = "http://api.weatherapi.com/v1/current.json"
-    URL_FORECAST_WEATHER = "http://api.weatherapi.com/v1/forecast.json"
+    base_url: str = os.getenv("WEATHER_API_URL", weather_api.DEFAULT_BASE_URL)
+    """Address of the API; point it at a local stub server to run offline."""
+    request_timeout: float = 30.0
+    # responses are cached by weather_api, which skips API errors; a tool-level cache would also keep the
+    # error reports of failed lookups
+    cacheable = False
+
+    def _run_many(self, location: AnyStr, lookup, report) -> AnyStr:
+        """Run `lookup` for each of the ';'-separated locations in parallel and join the reports."""
+        locations = [loc.strip() for loc in location.split(";") if loc.strip()]
+        if len(locations) == 1:
+            return self._report(locations[0], lookup, report)
+        results = weather_api.lookup_many(lambda loc: self._report(loc, lookup, report), locations)
+        return "\n".join(result if isinstance(result, str) else f"Error occured: {result}" for result in results)
+
+    @staticmethod
+    def _report(location: str, lookup, report) -> AnyStr:
+        try:
+            data = lookup(location)
+        except WeatherAPIError as e:
+            return f"Error occured: {e}\n The response fetched: {str(e.response)}"
+        return report(location, data)
 
 
 class GetTodayWeatherArgs(BaseModel):
@@ -21,17 +41,16 @@ class GetTodayWeather(Weather):
     name = "get_today_weather"
     description = (
         "A tool to look up the current weather information for a given location."
-        "Input should be a location."
+        "Input should be a location. Several locations can be separated by ';'."
     )
     args_schema: Optional[Type[BaseModel]] = GetTodayWeatherArgs
 
     def _run(self, location: AnyStr) -> AnyStr:
-        param = {
-            "key": self.api_key,
-            "q": location
-        }
-        res_completion = requests.get(self.URL_CURRENT_WEATHER, params=param)
-        data = json.loads(res_completion.text.strip())
+        return self._run_many(location, lambda loc: weather_api.current(
+            loc, self.api_key, self.base_url, self.request_timeout), self._format)
+
+    @staticmethod
+    def _format(location: str, data: Dict[str, Any]) -> AnyStr:
         try:
             output = {}
             output["overall"]= f"{data['current']['condition']['text']},\n"
@@ -68,18 +87,19 @@ class GetFutureWeather(Weather):
 
     name = "get_future_weather"
     description = (
-        "A tool to look up the overall weather information in the upcoming days for a given location"
+        "A tool to look up the overall weather information in the upcoming days for a given location. "
+        "Several locations can be separated by ';'."
     )
     args_schema: Optional[Type[BaseModel]] = GetFutureWeatherArgs
 
     def _run(self, location: AnyStr, days: int) -> AnyStr:
-        param = {
-            "key": self.api_key,
-            "q": location,
-            "days": int(days),
-        }
-        res_completion = requests.get(self.URL_FORECAST_WEATHER, params=param)
-        res_completion = json.loads(res_completion.text.strip())
+        return self._run_many(location, lambda loc: weather_api.forecast(
+            loc, days, self.api_key, self.base_url, self.request_timeout),
+            lambda loc, data: self._format(loc, int(days), data))
+
+    @staticmethod
+    def _format(location: str, days: int, res_completion: Dict[str, Any]) -> AnyStr:
+        param = {"q": location, "days": days}
         MAX_DAYS = 3
         try:
             res_completion = res_completion["forecast"]["forecastday"][int(days)-1 if int(days) < MAX_DAYS else MAX_DAYS-1]
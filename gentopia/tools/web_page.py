@@ -1,7 +1,6 @@
 from typing import AnyStr
-import requests
-from bs4 import BeautifulSoup
 from gentopia.tools.basetool import *
+from gentopia.tools.utils.web_fetch import UnsupportedContentType, fetch_text
 
 
 class WebPageArgs(BaseModel):
@@ -9,26 +8,34 @@ class WebPageArgs(BaseModel):
 
 
 class WebPage(BaseTool):
-    """Tool that adds the capability to query the Google search API."""
+    """Tool that retrieves the text of a web page.
+
+    The page is streamed and extracted incrementally: reading stops once `max_chars` characters of text have
+    been collected or `max_bytes` bytes downloaded, so large pages cost no more than small ones.
+    """
 
     name = "web_page"
     description = "A tool to retrieve web pages through url. Useful when you have a url and need to find detailed information inside."
 
     args_schema: Optional[Type[BaseModel]] = WebPageArgs
+    cacheable = True
+    cache_ttl = 600.0
+    request_timeout: float = 30.0
+    max_chars: int = 4096
+    max_bytes: int = 2 << 20
+    conditional_get: bool = True
 
     def _run(self, url: AnyStr) -> str:
         try:
-            response = requests.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            for script in soup(["script", "style"]):
-                script.extract()
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            text = ' '.join(line for line in lines if line)[:4096] + '...'
-            return text
+            return fetch_text(url, self.max_chars, self.max_bytes, self.request_timeout, self.conditional_get) + '...'
+        except UnsupportedContentType as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error: {e}\n Probably it is an invalid URL."
 
+    def _should_cache(self, observation: Any) -> bool:
+        return not observation.startswith("Error: ")
+
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
 
@@ -1,6 +1,41 @@
-from typing import AnyStr
+from typing import AnyStr, Optional, Union
+
+import requests
+
 from gentopia.tools.utils.docstore import DocstoreExplorer, Docstore, Document
 from gentopia.tools.basetool import *
+from gentopia.utils.execution import current_context
+
+_session = requests.Session()
+
+# Spelling suggestions followed before giving up on a search.
+MAX_SUGGESTIONS = 2
+
+
+def _fetch(search: str, api_url: str, user_agent: str, timeout: Optional[float] = 30.0,
+           suggestions: int = MAX_SUGGESTIONS) -> Union[str, Document]:
+    """Resolve `search` to its best matching page and fetch the page's text, URL and similar titles with a
+    single API request, following up to `suggestions` spelling suggestions."""
+    ctx = current_context()
+    response = _session.get(api_url, params={
+        "format": "json", "action": "query",
+        "generator": "search", "gsrsearch": search, "gsrlimit": 1,
+        "list": "search", "srsearch": search, "srlimit": 10, "srinfo": "suggestion", "srprop": "",
+        "prop": "extracts|info|pageprops", "explaintext": "", "inprop": "url", "ppprop": "disambiguation",
+        "redirects": "",
+    }, headers={"User-Agent": user_agent}, timeout=timeout if ctx is None else ctx.clamp(timeout))
+    response.raise_for_status()
+    query = response.json().get("query", {})
+    pages = list(query.get("pages", {}).values())
+    suggestion = query.get("searchinfo", {}).get("suggestion")
+    if not pages and suggestion and suggestion != search and suggestions > 0:
+        result = _fetch(suggestion, api_url, user_agent, timeout, suggestions - 1)
+        if isinstance(result, Document):
+            return result
+    if pages and "disambiguation" not in pages[0].get("pageprops", {}):
+        return Document(page_content=pages[0].get("extract", ""), metadata={"page": pages[0]["fullurl"]})
+    similar = [result["title"] for result in query.get("search", [])]
+    return f"Could not find [{search}]. Similar: {similar}"
 
 
 class Wiki(Docstore):
@@ -20,21 +55,13 @@ class Wiki(Docstore):
         """Try to search for wiki page.
 
         If page exists, return the page summary, and a PageWithLookups object.
-        If page does not exist, return similar entries.
+        If page does not exist or is a disambiguation page, return similar entries.
+        Pages are resolved, fetched and listed with one API request, in the language set with
+        ``wikipedia.set_lang``; the Wikipedia tool caches results for its `cache_ttl`.
         """
-        import wikipedia
+        import wikipedia.wikipedia
 
-        try:
-            page_content = wikipedia.page(search).content
-            url = wikipedia.page(search).url
-            result: Union[str, Document] = Document(
-                page_content=page_content, metadata={"page": url}
-            )
-        except wikipedia.PageError:
-            result = f"Could not find [{search}]. Similar: {wikipedia.search(search)}"
-        except wikipedia.DisambiguationError:
-            result = f"Could not find [{search}]. Similar: {wikipedia.search(search)}"
-        return result
+        return _fetch(search, wikipedia.wikipedia.API_URL, wikipedia.wikipedia.USER_AGENT)
 
 
 class WikipediaArgs(BaseModel):
@@ -49,6 +76,8 @@ class Wikipedia(BaseTool):
                   "get holistic knowledge about people, places, companies, historical events, " \
                   "or other subjects."
     args_schema: Optional[Type[BaseModel]] = WikipediaArgs
+    cacheable = True
+    cache_ttl = 600.0
     doc_store: Any = None
 
     def _run(self, query: AnyStr) -> AnyStr:
@@ -58,6 +87,9 @@ class Wikipedia(BaseTool):
         evidence = tool.search(query)
         return evidence
 
+    def _should_cache(self, observation: Any) -> bool:
+        return not str(observation).startswith("Could not find")
+
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         raise NotImplementedError
 
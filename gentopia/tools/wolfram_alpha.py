@@ -33,6 +33,8 @@ class WolframAlpha(BaseTool):
     name = "wolfram_alpha"
     description = "A WolframAlpha search engine. Useful when you need to search for scientific knowledge or solve a Mathematical and Algebraic equation."
     args_schema: Optional[Type[BaseModel]] = WolframAlphaArgs
+    cacheable = True
+    cache_ttl = 3600.0
 
     def _run(self, query: AnyStr) -> AnyStr:
         tool = CustomWolframAlphaAPITool()
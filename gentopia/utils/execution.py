@@ -0,0 +1,266 @@
+"""Deadlines, cost budgets and cooperative cancellation for agent and tool execution.
+
+An :class:`ExecutionContext` carries a wall-clock deadline, an optional cost budget and a cancellation flag.
+Contexts nest: :func:`execution_context` opens a child of the current context whose deadline is the
+earlier of its own and its parent's, whose cost is charged to every ancestor, and which is cancelled when
+its parent is. The current context is held in a :mod:`contextvars` variable, so it follows calls into
+nested agent-plugins and, through :func:`gentopia.utils.tracing.wrap_context`, into worker threads.
+
+Tools run through :func:`run_with_timeout`, which returns control to the caller as soon as the deadline
+passes, the budget runs out or the context is cancelled. Python threads cannot be killed, so a hung tool
+keeps its own (daemon) thread, but no longer blocks the agent; long-running tools should poll
+:attr:`ExecutionContext.cancelled` or sleep with :meth:`ExecutionContext.wait` to stop early.
+
+Example:
+    .. code-block:: python
+
+        from gentopia.utils.execution import execution_context
+
+        with execution_context(timeout=60, budget=0.05):   # per-request deadline and dollar budget
+            output = agent.run("Summarize today's news")
+"""
+import contextvars
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+_current: contextvars.ContextVar = contextvars.ContextVar("gentopia_execution_context", default=None)
+
+
+class ExecutionInterrupted(Exception):
+    """Raised when work is stopped before completion."""
+
+
+class DeadlineExceeded(ExecutionInterrupted, TimeoutError):
+    """Raised when the deadline of the current execution context has passed."""
+
+
+class BudgetExceeded(ExecutionInterrupted):
+    """Raised when the cost budget of the current execution context is spent."""
+
+
+class ExecutionContext:
+    """Deadline, cost budget and cancellation state of one unit of work.
+
+    :param timeout: Seconds from now until the deadline, defaults to None (the parent's deadline, if any).
+    :type timeout: Optional[float]
+    :param budget: Maximum total cost in dollars charged to this context, defaults to None (unlimited).
+    :type budget: Optional[float]
+    :param parent: Enclosing context, defaults to None.
+    :type parent: Optional[ExecutionContext]
+    """
+
+    def __init__(self, timeout: Optional[float] = None, budget: Optional[float] = None,
+                 parent: Optional["ExecutionContext"] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if parent is not None and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        self.deadline = deadline
+        self.budget = budget
+        self.spent = 0.0
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._interruption: Optional[ExecutionInterrupted] = None
+        self._children: "weakref.WeakSet[ExecutionContext]" = weakref.WeakSet()
+        self._waiters = set()
+        if parent is not None:
+            parent._adopt(self)
+
+    @property
+    def bounded(self) -> bool:
+        """Whether this context or an ancestor has a deadline or budget."""
+        ctx = self
+        while ctx is not None:
+            if ctx.deadline is not None or ctx.budget is not None:
+                return True
+            ctx = ctx.parent
+        return False
+
+    @property
+    def interruption(self) -> Optional[ExecutionInterrupted]:
+        """Why work in this context should stop, or None if it may go on."""
+        if self._interruption is not None:
+            return self._interruption
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return DeadlineExceeded("deadline exceeded")
+        return None
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether work in this context should stop: cancelled, past the deadline or over budget."""
+        return self.interruption is not None
+
+    def check(self):
+        """Raise the reason to stop, if any.
+
+        :raises ExecutionInterrupted: If the context is cancelled, past its deadline or over budget.
+        """
+        interruption = self.interruption
+        if interruption is not None:
+            raise type(interruption)(*interruption.args)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, or None without deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def clamp(self, timeout: Optional[float]) -> Optional[float]:
+        """Return `timeout` shortened to the time remaining, e.g. for the timeout of a network request. The
+        result is never zero, which libraries such as requests reject.
+
+        :raises ExecutionInterrupted: If the context is cancelled, past its deadline or over budget.
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline exceeded")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def charge(self, cost: float):
+        """Add `cost` to this context and its ancestors, cancelling each one whose budget is exceeded."""
+        ctx = self
+        while ctx is not None:
+            with ctx._lock:
+                ctx.spent += cost
+                exhausted = ctx.budget is not None and ctx.spent > ctx.budget
+            if exhausted:
+                ctx.cancel(BudgetExceeded(f"cost budget of ${ctx.budget:.4f} exceeded"))
+            ctx = ctx.parent
+
+    def cancel(self, reason: Optional[ExecutionInterrupted] = None):
+        """Ask all work in this context and its descendants to stop."""
+        with self._lock:
+            if self._interruption is not None:
+                return
+            self._interruption = reason or ExecutionInterrupted("cancelled")
+            children, waiters = list(self._children), list(self._waiters)
+        for event in waiters:
+            event.set()
+        for child in children:
+            child.cancel(self._interruption)
+
+    def wait(self, seconds: float, until: Optional[threading.Event] = None) -> bool:
+        """Sleep up to `seconds`, waking early if the context is cancelled, its deadline passes or `until`
+        is set.
+
+        :param seconds: Longest time to sleep.
+        :type seconds: float
+        :param until: Event ending the wait, e.g. set by a completion callback, defaults to None. It is also set
+            when the context is cancelled.
+        :type until: Optional[threading.Event]
+        :return: True if work should stop.
+        :rtype: bool
+        """
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        event = threading.Event() if until is None else until
+        self._add_waiter(event)
+        try:
+            if not self.cancelled:
+                event.wait(seconds)
+        finally:
+            self._remove_waiter(event)
+        return self.cancelled
+
+    def _adopt(self, child: "ExecutionContext"):
+        with self._lock:
+            self._children.add(child)
+            interruption = self._interruption
+        if interruption is not None:
+            child.cancel(interruption)
+
+    def _add_waiter(self, event: threading.Event):
+        # waiters are registered along the whole chain so that cancelling any ancestor wakes them
+        ctx = self
+        while ctx is not None:
+            with ctx._lock:
+                ctx._waiters.add(event)
+                if ctx._interruption is not None:
+                    event.set()
+            ctx = ctx.parent
+
+    def _remove_waiter(self, event: threading.Event):
+        ctx = self
+        while ctx is not None:
+            with ctx._lock:
+                ctx._waiters.discard(event)
+            ctx = ctx.parent
+
+
+def current_context() -> Optional[ExecutionContext]:
+    """Return the innermost active execution context, or None outside of any."""
+    return _current.get()
+
+
+@contextmanager
+def execution_context(timeout: Optional[float] = None, budget: Optional[float] = None):
+    """Run the enclosed block in a child of the current execution context.
+
+    :param timeout: Seconds until the block's deadline, defaults to None (inherit the parent's).
+    :type timeout: Optional[float]
+    :param budget: Cost budget of the block in dollars, defaults to None (only the parent's applies).
+    :type budget: Optional[float]
+    """
+    ctx = ExecutionContext(timeout, budget, parent=_current.get())
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def charge(cost: float):
+    """Charge `cost` to the current execution context, if any."""
+    ctx = _current.get()
+    if ctx is not None and cost:
+        ctx.charge(cost)
+
+
+def run_with_timeout(fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+    """Call `fn` in a child execution context, giving up when it times out, its deadline passes, the budget
+    is spent or it is cancelled. When no limit applies, `fn` is called directly.
+
+    :param fn: The work to run.
+    :type fn: Callable[[], Any]
+    :param timeout: Seconds allowed for `fn`, defaults to None (only the enclosing deadline applies).
+    :type timeout: Optional[float]
+    :raises ExecutionInterrupted: If `fn` did not finish in time or within budget. The context of `fn` is
+        cancelled so it can stop cooperatively.
+    :return: The result of `fn`.
+    """
+    with execution_context(timeout) as ctx:
+        ctx.check()
+        if not ctx.bounded:
+            return fn()
+        outcome = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = fn()
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        ctx._add_waiter(done)
+        try:
+            runner = contextvars.copy_context()
+            threading.Thread(target=runner.run, args=(target,), daemon=True,
+                             name=f"gentopia-{getattr(fn, '__name__', 'call')}").start()
+            done.wait(ctx.remaining())
+        finally:
+            ctx._remove_waiter(done)
+        if "error" in outcome:
+            raise outcome["error"]
+        if "result" in outcome:
+            return outcome["result"]
+        interruption = ctx.interruption or DeadlineExceeded("deadline exceeded")
+        ctx.cancel(interruption)
+        raise type(interruption)(*interruption.args)
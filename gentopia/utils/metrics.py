@@ -0,0 +1,204 @@
+"""Counters and latency histograms for agents, LLM backends and tools, rendered in Prometheus text format.
+
+Metrics are recorded at the same call sites as tracing (see :func:`gentopia.utils.tracing.traced`) once
+:func:`enable_metrics` has been called. :class:`gentopia.manager.llm_client.local_llm_client.LocalLLMClient`
+enables them and serves :meth:`MetricsRegistry.render` on ``GET /metrics``.
+"""
+import bisect
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+THROUGHPUT_BUCKETS = (1.0, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0, 640.0)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing counter, one series per label set."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, one series per label set."""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label set -> (bucket counts, sum, count)
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._values.get(_labels(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of named metrics.
+
+    :param enabled: Whether instrumented call sites record into this registry, defaults to False.
+    :type enabled: bool
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Get or create the counter ``name``."""
+        return self._get_or_create(name, lambda: Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create the histogram ``name``."""
+        return self._get_or_create(name, lambda: Histogram(name, documentation, buckets))
+
+    def _get_or_create(self, name, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, factory())
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def observe_call(self, component: str, name: str, duration: float, result=None, error: bool = False):
+        """Record one instrumented call.
+
+        Every component gets ``gentopia_<component>_requests_total``, ``_errors_total`` and
+        ``_latency_seconds`` labelled by ``name``. Completions (anything with ``state``, ``prompt_token``
+        and ``completion_token``) additionally record token counters, tokens per second and cost per
+        model; agent outputs record cost and token usage.
+
+        :param component: Component category, e.g. "llm", "tool", "agent".
+        :type component: str
+        :param name: Model, tool or agent name used as label value.
+        :type name: str
+        :param duration: Wall-clock duration in seconds.
+        :type duration: float
+        :param result: The call's return value, if any.
+        :param error: Whether the call raised.
+        :type error: bool
+        """
+        prefix = f"gentopia_{component}"
+        label = "model" if component == "llm" else component
+        labels = {label: name}
+        self.counter(f"{prefix}_requests_total", f"Number of {component} calls.").inc(**labels)
+        if error or getattr(result, "state", None) == "error":
+            self.counter(f"{prefix}_errors_total", f"Number of failed {component} calls.").inc(**labels)
+        self.histogram(f"{prefix}_latency_seconds", f"Latency of {component} calls in seconds.").observe(duration, **labels)
+        if hasattr(result, "prompt_token") and hasattr(result, "completion_token"):
+            from gentopia.utils.cost_helpers import calculate_cost
+            tokens = self.counter(f"{prefix}_tokens_total", f"Tokens consumed by {component} calls.")
+            tokens.inc(result.prompt_token, kind="prompt", **labels)
+            tokens.inc(result.completion_token, kind="completion", **labels)
+            if duration > 0 and result.completion_token:
+                self.histogram(f"{prefix}_completion_tokens_per_second",
+                               f"Completion tokens per second of {component} calls.",
+                               THROUGHPUT_BUCKETS).observe(result.completion_token / duration, **labels)
+            self.counter(f"{prefix}_cost_dollars_total", f"Cost of {component} calls in dollars.").inc(
+                calculate_cost(name, result.prompt_token, result.completion_token), **labels)
+        elif hasattr(result, "token_usage") and hasattr(result, "cost"):
+            self.counter(f"{prefix}_tokens_total", f"Tokens consumed by {component} calls.").inc(
+                result.token_usage, **labels)
+            self.counter(f"{prefix}_cost_dollars_total", f"Cost of {component} calls in dollars.").inc(
+                result.cost, **labels)
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+def enable_metrics() -> MetricsRegistry:
+    """Start recording metrics at instrumented call sites.
+
+    :return: The process-wide metrics registry.
+    :rtype: MetricsRegistry
+    """
+    _registry.enabled = True
+    return _registry
+
+
+def disable_metrics():
+    """Stop recording metrics. Values recorded so far are kept."""
+    _registry.enabled = False
@@ -0,0 +1,280 @@
+"""Request coalescing ("single-flight") for identical concurrent calls.
+
+While a call for some key is in flight, further calls with the same key wait for it and share its result
+instead of starting their own. Nothing is remembered once the call completes, so this is not a cache:
+it only removes duplicate work from bursts of identical requests, e.g. many sessions asking the same
+question at once or ReWOO workers running the same tool call.
+
+Example:
+    .. code-block:: python
+
+        from gentopia.utils.single_flight import SingleFlight, make_key
+
+        flight = SingleFlight()
+        key = make_key("search", query)
+        result = flight.do(key, lambda: search(query))           # one call, shared by concurrent callers
+        for token in flight.stream(key, lambda: generate(query)):  # one stream, replayed to every subscriber
+            print(token)
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gentopia.utils.execution import current_context, DeadlineExceeded, ExecutionInterrupted
+
+
+def make_key(*parts: Any) -> str:
+    """Stable digest of `parts`, which should be JSON-serializable; other objects are keyed by their repr."""
+    payload = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Broadcast:
+    """Fans one iterator out to any number of subscribers. Every subscriber sees every item from the start,
+    in order. Whichever subscriber first needs an item that has not been produced yet pulls it from the
+    source, so the stream keeps going if other subscribers stop early."""
+
+    def __init__(self, fn: Callable[[], Iterable], on_done: Callable[[], None]):
+        self._fn = fn
+        self._source: Optional[Iterator] = None
+        self._on_done = on_done
+        self._cond = threading.Condition()
+        self._items: List[Any] = []
+        self._error: Optional[BaseException] = None
+        self._done = False
+        self._pulling = False
+        self._subscribers = 0
+
+    def subscribe(self) -> Iterator:
+        with self._cond:
+            self._subscribers += 1
+        started = [False]
+        iterator = self._iterate(started)
+        # an iterator dropped before its first next never runs its finally block
+        weakref.finalize(iterator, self._drop_unstarted, started)
+        return iterator
+
+    def _drop_unstarted(self, started: List[bool]):
+        if not started[0]:
+            self._leave()
+
+    def _leave(self):
+        with self._cond:
+            self._subscribers -= 1
+            abandoned = self._subscribers == 0 and not self._done
+        if abandoned:
+            self._finish(None, close=True)
+
+    def _iterate(self, started: List[bool]) -> Iterator:
+        started[0] = True
+        i = 0
+        try:
+            while True:
+                with self._cond:
+                    while i >= len(self._items) and not self._done and self._pulling:
+                        self._cond.wait()
+                    if i < len(self._items):
+                        item = self._items[i]
+                    elif self._done:
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    else:
+                        self._pulling = True
+                if i < len(self._items):
+                    i += 1
+                    yield item
+                    continue
+                self._pull()
+        finally:
+            self._leave()
+
+    def _pull(self):
+        item, done, error = None, False, None
+        try:
+            if self._source is None:
+                self._source = iter(self._fn())
+            item = next(self._source)
+        except StopIteration:
+            done = True
+        except BaseException as e:
+            done, error = True, e
+        with self._cond:
+            self._pulling = False
+            if not done:
+                self._items.append(item)
+            self._cond.notify_all()
+        if done:
+            self._finish(error)
+
+    def _finish(self, error: Optional[BaseException], close: bool = False):
+        with self._cond:
+            if self._done:
+                return
+            self._done = True
+            self._error = error
+            self._cond.notify_all()
+        self._on_done()
+        if close and self._source is not None and hasattr(self._source, "close"):
+            self._source.close()
+
+
+def _inherited(future: Future) -> bool:
+    """Whether the shared call stopped because the caller that made it ran out of time or budget or was
+    cancelled, while the current caller may go on."""
+    if not future.done() or future.cancelled():
+        return False
+    ctx = current_context()
+    return (isinstance(future.exception(), (ExecutionInterrupted, asyncio.CancelledError))
+            and (ctx is None or not ctx.cancelled))
+
+
+def _wait(future: Future) -> Any:
+    """Wait for `future` until it is done or the current execution context runs out."""
+    ctx = current_context()
+    if ctx is None:
+        return future.result()
+    done = threading.Event()
+    future.add_done_callback(lambda _: done.set())
+    # cancelling the context also sets `done` and ends the wait
+    while not future.done():
+        if ctx.wait(60.0, until=done) and not future.done():
+            ctx.check()
+    return future.result()
+
+
+def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return `fn()`, or the result of the call already in flight for `key`.
+
+        A caller joining a call in flight waits no longer than its own execution context allows (see
+        :mod:`gentopia.utils.execution`), and if the shared call was interrupted by the deadline or budget of
+        the caller that made it, a caller that may go on makes the call itself.
+
+        :param key: Identity of the call, e.g. from :func:`make_key`.
+        :type key: str
+        :param fn: Computes the result. Its exception, if any, is raised to every waiting caller.
+        :type fn: Callable[[], Any]
+        :raises ExecutionInterrupted: If the caller's own context runs out while waiting.
+        :return: The shared result.
+        :rtype: Any
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return _wait(future)
+            except (ExecutionInterrupted, asyncio.CancelledError):
+                if _inherited(future):
+                    continue
+                raise
+        try:
+            result = fn()
+        except BaseException as e:
+            _settle(future, error=e)
+            raise
+        else:
+            _settle(future, result)
+            return result
+        finally:
+            self._leave(key)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of :meth:`do`: await `fn()`, or the call already in flight for `key`, whether that
+        call was made with :meth:`do` from a thread or with :meth:`ado` from any event loop. Cancelling a
+        waiting caller, e.g. with :func:`asyncio.wait_for`, does not affect the call or the other callers.
+
+        :param key: Identity of the call, e.g. from :func:`make_key`.
+        :type key: str
+        :param fn: Returns an awaitable computing the result.
+        :type fn: Callable[[], Awaitable[Any]]
+        :raises ExecutionInterrupted: If the caller's own context runs out while waiting.
+        :return: The shared result.
+        :rtype: Any
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            ctx = current_context()
+            timeout = None if ctx is None else ctx.clamp(None)
+            try:
+                # each caller waits on its own wrapper, so cancelling it leaves the shared future alone
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("deadline exceeded")
+            except (ExecutionInterrupted, asyncio.CancelledError):
+                if _inherited(future) and not asyncio.current_task().cancelling():
+                    continue
+                raise
+        try:
+            result = await fn()
+        except BaseException as e:
+            _settle(future, error=e)
+            raise
+        else:
+            _settle(future, result)
+            return result
+        finally:
+            self._leave(key)
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the future of the call in flight for `key` and whether the caller has to make the call."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        return future, leader
+
+    def _leave(self, key: str):
+        with self._lock:
+            del self._calls[key]
+
+    def stream(self, key: str, fn: Callable[[], Iterable]) -> Iterator:
+        """Iterate over `fn()`, or join the stream already in flight for `key` and receive all of its items
+        from the first one. The source is closed once every subscriber has stopped iterating.
+
+        :param key: Identity of the call, e.g. from :func:`make_key`.
+        :type key: str
+        :param fn: Returns the source iterable; only called by the first subscriber of a stream.
+        :type fn: Callable[[], Iterable]
+        :return: An iterator over the shared stream.
+        :rtype: Iterator
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = self._streams[key] = _Broadcast(fn, lambda: self._forget(key, broadcast))
+            return broadcast.subscribe()
+
+    def _forget(self, key: str, broadcast: _Broadcast):
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed or streamed."""
+        with self._lock:
+            return len(self._calls) + len(self._streams)
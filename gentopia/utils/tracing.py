@@ -0,0 +1,447 @@
+"""Lightweight hierarchical tracing for agents, LLMs, tools and memory.
+
+Tracing is disabled by default. When disabled, :func:`trace_span` returns a shared no-op span and
+:func:`traced` calls the wrapped function directly, so instrumented code only pays a flag check.
+
+Example:
+    .. code-block:: python
+
+        from gentopia.utils.tracing import enable_tracing
+
+        tracer = enable_tracing(path="./trace.json")
+        agent.run("What is the population of Paris?")
+        tracer.flush()                       # open trace.json in chrome://tracing or Perfetto
+        print(tracer.aggregator.format_summary())
+"""
+import atexit
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from gentopia.utils.metrics import get_registry
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("gentopia_current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """A timed unit of work. Spans started while another span is active become its children.
+
+    :param name: Human readable name, e.g. "ReactAgent.run" or "calculator".
+    :type name: str
+    :param component: Component category used for aggregation, e.g. "agent", "llm", "tool".
+    :type component: str
+    :param parent: Parent span, defaults to None for a root span.
+    :type parent: Optional[Span]
+    """
+    __slots__ = ("name", "component", "span_id", "parent_id", "trace_id", "start", "end", "thread_id",
+                 "attributes", "_tracer", "_token")
+
+    def __init__(self, name: str, component: str, parent: Optional["Span"] = None, tracer=None, **attributes):
+        self.name = name
+        self.component = component
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.thread_id = threading.get_native_id()
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, or the elapsed time so far if the span is still open."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        """Attach attributes (token counts, cost, status, ...) to the span."""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        """Close the span and hand it to the tracer's exporters. Finishing twice is a no-op."""
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if self._tracer is not None:
+            self._tracer._export(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc_val)
+        _current_span.reset(self._token)
+        self.finish()
+        return False
+
+
+class _NoopSpan:
+    """Shared span returned when tracing is disabled."""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class LatencyAggregator:
+    """In-memory exporter collecting span durations per component and per span name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+
+    def export(self, span: Span):
+        with self._lock:
+            self._durations[span.component].append(span.duration)
+            self._durations[f"{span.component}:{span.name}"].append(span.duration)
+
+    def percentile(self, key: str, q: float) -> float:
+        """Nearest-rank percentile of the durations recorded under ``key``.
+
+        :param key: Component ("tool") or component and span name ("tool:calculator").
+        :type key: str
+        :param q: Percentile in [0, 100].
+        :type q: float
+        :return: Latency in seconds, 0.0 if nothing has been recorded.
+        :rtype: float
+        """
+        with self._lock:
+            values = sorted(self._durations.get(key, []))
+        return _nearest_rank(values, q)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total, p50, p95 and p99 latency (seconds) for every recorded key."""
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._durations.items()}
+        return {
+            key: dict(count=len(values),
+                      total=sum(values),
+                      p50=_nearest_rank(values, 50),
+                      p95=_nearest_rank(values, 95),
+                      p99=_nearest_rank(values, 99))
+            for key, values in snapshot.items()
+        }
+
+    def format_summary(self) -> str:
+        """Render :meth:`summary` as a fixed-width table in milliseconds."""
+        lines = [f"{'component':<48}{'count':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}"]
+        for key, stats in sorted(self.summary().items()):
+            lines.append(f"{key:<48}{stats['count']:>8}{stats['p50'] * 1e3:>12.2f}"
+                         f"{stats['p95'] * 1e3:>12.2f}{stats['p99'] * 1e3:>12.2f}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+
+
+class ChromeTraceExporter:
+    """Exporter writing spans as Chrome trace-event "complete" events (viewable in chrome://tracing or Perfetto).
+
+    :param path: Output file path, defaults to "./trace.json".
+    :type path: str
+    """
+
+    def __init__(self, path: str = "./trace.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+
+    def export(self, span: Span):
+        args = {k: v if isinstance(v, (int, float, str, bool)) or v is None else str(v)
+                for k, v in span.attributes.items()}
+        args.update(span_id=span.span_id, parent_id=span.parent_id, trace_id=span.trace_id)
+        event = {
+            "name": span.name,
+            "cat": span.component,
+            "ph": "X",
+            "ts": (span.start - self._origin) * 1e6,
+            "dur": (span.end - span.start) * 1e6,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def flush(self):
+        """Write all collected events to :attr:`path`."""
+        with self._lock:
+            events = list(self._events)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class Tracer:
+    """Holds the enabled flag and the exporters that finished spans are sent to."""
+
+    def __init__(self):
+        self.enabled = False
+        self.exporters: List[Any] = []
+        self.aggregator: Optional[LatencyAggregator] = None
+
+    def start_span(self, name: str, component: str, **attributes):
+        """Start a span as a child of the current span.
+
+        Use it as a context manager so nested work becomes its children. Spans kept open across
+        generator yields should not be entered; call :meth:`Span.finish` instead.
+
+        :return: A new span, or :data:`NOOP_SPAN` if tracing is disabled.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(name, component, parent=_current_span.get(), tracer=self, **attributes)
+
+    def _export(self, span: Span):
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def flush(self):
+        """Flush exporters that buffer output (e.g. :class:`ChromeTraceExporter`)."""
+        for exporter in self.exporters:
+            if hasattr(exporter, "flush"):
+                exporter.flush()
+
+
+_tracer = Tracer()
+_metrics = get_registry()
+
+# registered once and flushing whichever exporters are current at exit
+atexit.register(_tracer.flush)
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def enable_tracing(path: Optional[str] = "./trace.json", aggregate: bool = True, exporters: Optional[list] = None) -> Tracer:
+    """
+    Enable tracing for agents, LLM calls, tools and memory operations.
+
+    :param path: Chrome trace-event output file, flushed at exit or when tracing is enabled again. None
+        disables file export.
+    :type path: Optional[str]
+    :param aggregate: Whether to keep an in-memory :class:`LatencyAggregator`, defaults to True.
+    :type aggregate: bool
+    :param exporters: Additional exporters, objects with an ``export(span)`` method.
+    :type exporters: Optional[list]
+    :return: The process-wide tracer.
+    :rtype: Tracer
+    """
+    # the exporters of a previous call are replaced and no longer flushed at exit, so flush them now
+    _tracer.flush()
+    _tracer.exporters = list(exporters or [])
+    _tracer.aggregator = None
+    if path is not None:
+        _tracer.exporters.append(ChromeTraceExporter(path))
+    if aggregate:
+        _tracer.aggregator = LatencyAggregator()
+        _tracer.exporters.append(_tracer.aggregator)
+    _tracer.enabled = True
+    return _tracer
+
+
+def disable_tracing():
+    """Disable tracing and flush the exporters."""
+    _tracer.enabled = False
+    _tracer.flush()
+
+
+def current_span():
+    """Return the active span, or None."""
+    return _current_span.get()
+
+
+def trace_span(name: str, component: str, **attributes):
+    """Context manager opening a span named ``name`` under ``component``.
+
+    .. code-block:: python
+
+        with trace_span("retrieve", "memory") as span:
+            docs = retriever.get_relevant_documents(query)
+            span.set(n_docs=len(docs))
+    """
+    return _tracer.start_span(name, component, **attributes)
+
+
+def wrap_context(fn: Callable) -> Callable:
+    """Bind ``fn`` to a copy of the caller's context so spans started in worker threads keep their parent.
+
+    Use it when submitting work to a thread pool: ``pool.submit(wrap_context(fn), *args)``.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def _annotate(span, instance, result):
+    """Record token usage and cost from completions and agent outputs."""
+    if hasattr(result, "prompt_token") and hasattr(result, "completion_token"):
+        from gentopia.utils.cost_helpers import calculate_cost
+        model_name = getattr(instance, "model_name", "")
+        span.set(model=model_name,
+                 state=getattr(result, "state", None),
+                 prompt_token=result.prompt_token,
+                 completion_token=result.completion_token,
+                 cost=calculate_cost(model_name, result.prompt_token, result.completion_token))
+    elif hasattr(result, "token_usage") and hasattr(result, "cost"):
+        span.set(token_usage=result.token_usage, cost=result.cost)
+
+
+def _span_name(fn: Callable, args) -> str:
+    instance = args[0] if args else None
+    owner = getattr(instance, "name", None)
+    if isinstance(owner, str) and owner:
+        return f"{owner}.{fn.__name__}"
+    return fn.__qualname__
+
+
+def _metric_label(fn: Callable, args) -> str:
+    instance = args[0] if args else None
+    for attr in ("model_name", "name"):
+        value = getattr(instance, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return fn.__qualname__
+
+
+def traced(component: str, name: Optional[str] = None):
+    """Decorator tracing each call of a function or method under ``component``.
+
+    Generator functions are traced from the first ``next`` until exhaustion, coroutine functions until
+    the awaited call returns and async generator functions until the last chunk. Results carrying
+    ``prompt_token``/``completion_token`` (completions) or ``cost``/``token_usage`` (agent outputs)
+    are recorded as span attributes. The call is also recorded in the metrics registry
+    (:mod:`gentopia.utils.metrics`) when metrics are enabled.
+
+    :param component: Component category, e.g. "llm", "tool", "agent", "memory".
+    :type component: str
+    :param name: Span name, defaults to ``<instance name>.<function name>``.
+    :type name: Optional[str]
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                if not _tracer.enabled and not _metrics.enabled:
+                    yield from fn(*args, **kwargs)
+                    return
+                span = _tracer.start_span(name or _span_name(fn, args), component)
+                start = time.perf_counter()
+                n_chunks = 0
+                failed = False
+                try:
+                    for item in fn(*args, **kwargs):
+                        n_chunks += 1
+                        yield item
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    span.set(chunks=n_chunks)
+                    span.finish()
+                    if _metrics.enabled:
+                        _metrics.observe_call(component, _metric_label(fn, args), time.perf_counter() - start,
+                                              error=failed)
+
+            return gen_wrapper
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def agen_wrapper(*args, **kwargs):
+                if not _tracer.enabled and not _metrics.enabled:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                    return
+                span = _tracer.start_span(name or _span_name(fn, args), component)
+                start = time.perf_counter()
+                n_chunks = 0
+                failed = False
+                try:
+                    async for item in fn(*args, **kwargs):
+                        n_chunks += 1
+                        yield item
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    span.set(chunks=n_chunks)
+                    span.finish()
+                    if _metrics.enabled:
+                        _metrics.observe_call(component, _metric_label(fn, args), time.perf_counter() - start,
+                                              error=failed)
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _tracer.enabled and not _metrics.enabled:
+                    return await fn(*args, **kwargs)
+                start = time.perf_counter()
+                result, failed = None, True
+                try:
+                    with _tracer.start_span(name or _span_name(fn, args), component) as span:
+                        result = await fn(*args, **kwargs)
+                        failed = False
+                        _annotate(span, args[0] if args else None, result)
+                        return result
+                finally:
+                    if _metrics.enabled:
+                        _metrics.observe_call(component, _metric_label(fn, args), time.perf_counter() - start,
+                                              result=result, error=failed)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled and not _metrics.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result, failed = None, True
+            try:
+                with _tracer.start_span(name or _span_name(fn, args), component) as span:
+                    result = fn(*args, **kwargs)
+                    failed = False
+                    _annotate(span, args[0] if args else None, result)
+                    return result
+            finally:
+                if _metrics.enabled:
+                    _metrics.observe_call(component, _metric_label(fn, args), time.perf_counter() - start,
+                                          result=result, error=failed)
+
+        return wrapper
+
+    return decorator
+
+
+def _nearest_rank(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
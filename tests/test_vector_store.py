@@ -0,0 +1,63 @@
+from typing import List
+
+import pytest
+
+from gentopia.memory.embeddings import Embeddings
+from gentopia.memory.vectorstores.vectorstore import VectorStore
+from gentopia.tools.utils import Document
+from gentopia.tools.utils.document_loaders.text_splitter import CharacterTextSplitter
+from gentopia.tools.utils.vector_store import VectorstoreIndexCreator
+
+
+class ZeroEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[0.0] for _ in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0]
+
+
+class RecordingStore(VectorStore):
+    """Keeps the inserted documents in order."""
+
+    def __init__(self):
+        self.documents = []
+
+    def add_documents(self, documents, **kwargs):
+        self.documents.extend(documents)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+    def similarity_search(self, query, k=4, **kwargs):
+        raise NotImplementedError
+
+    @classmethod
+    def from_documents(cls, documents, embedding, **kwargs):
+        store = cls()
+        store.add_documents(documents)
+        return store
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+
+def _index(documents: List[Document], **kwargs) -> List[tuple]:
+    creator = VectorstoreIndexCreator(vectorstore_cls=RecordingStore, embedding=ZeroEmbeddings(),
+                                      text_splitter=CharacterTextSplitter(chunk_size=100, chunk_overlap=0),
+                                      batch_size=7, **kwargs)
+    store = creator.from_documents(documents)
+    return [(document.metadata["source"], document.page_content) for document in store.documents]
+
+
+@pytest.mark.parametrize("n_workers,worker_chunksize", [(3, 1), (2, 3)])
+def test_pool_keeps_serial_chunk_order(n_workers, worker_chunksize):
+    # documents of very different sizes, so that workers finish out of order
+    documents = [Document(page_content="\n\n".join(f"{i} paragraph {j} " * 5 for j in range((i * 37) % 90 + 1)),
+                          metadata={"source": i})
+                 for i in range(12)]
+    serial = _index(documents)
+    pooled = _index(documents, n_workers=n_workers, worker_chunksize=worker_chunksize)
+    assert pooled == serial
+    assert len({source for source, _ in serial}) == len(documents)
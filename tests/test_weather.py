@@ -0,0 +1,104 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from gentopia.tools.weather import GetFutureWeather, GetTodayWeather
+
+_CONDITION = {"text": "Sunny"}
+
+
+def _location(query: str) -> dict:
+    return {"name": query.title(), "region": "Region", "country": "Country", "localtime": "2024-01-01 12:00"}
+
+
+def _current(query: str) -> dict:
+    return {"location": _location(query),
+            "current": {"condition": _CONDITION, "temp_c": 20.0, "temp_f": 68.0, "precip_mm": 0.0, "precip_in": 0.0,
+                        "pressure_mb": 1012.0, "humidity": 40, "cloud": 0, "feelslike_c": 20.0,
+                        "feelslike_f": 68.0, "gust_kph": 10.0, "gust_mph": 6.2, "vis_km": 10.0, "vis_miles": 6.0,
+                        "uv": 5.0}}
+
+
+def _forecast(query: str, days: int) -> dict:
+    day = {"condition": _CONDITION, "maxtemp_c": 25.0, "maxtemp_f": 77.0, "mintemp_c": 15.0, "mintemp_f": 59.0,
+           "avgtemp_c": 20.0, "avgtemp_f": 68.0, "maxwind_kph": 20.0, "maxwind_mph": 12.4, "totalprecip_mm": 0.0,
+           "totalprecip_in": 0.0, "daily_will_it_rain": 0, "daily_chance_of_rain": 0, "totalsnow_cm": 0.0,
+           "daily_will_it_snow": 0, "daily_chance_of_snow": 0, "avgvis_km": 10.0, "avgvis_miles": 6.0,
+           "avghumidity": 40.0, "uv": 5.0}
+    astro = {"sunrise": "07:00 AM", "sunset": "07:00 PM", "moonrise": "08:00 PM", "moonset": "06:00 AM"}
+    return {"location": _location(query),
+            "forecast": {"forecastday": [{"date": f"2024-01-0{i + 1}", "day": day, "astro": astro}
+                                         for i in range(days)]}}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers current.json and forecast.json like weatherapi.com; the location "nowhere" is unknown."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests[url.path.rsplit("/", 1)[-1], params["q"]] += 1
+        if params["q"] == "nowhere":
+            status, body = 400, {"error": {"code": 1006, "message": "No matching location found."}}
+        elif url.path.endswith("/current.json"):
+            status, body = 200, _current(params["q"])
+        elif url.path.endswith("/forecast.json"):
+            status, body = 200, _forecast(params["q"], int(params["days"]))
+        else:
+            status, body = 404, {"error": {"code": 404, "message": "Not found."}}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def weather_server():
+    """Local weatherapi.com stub; yields its base URL and the count of requests per endpoint and location."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", server.requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_today_weather(weather_server):
+    base_url, requests = weather_server
+    tool = GetTodayWeather(api_key="test", base_url=base_url)
+    report = tool.run("Paris")
+    assert report.startswith("Today's weather report for Paris is:")
+    assert "temperature: 20.0(C), 68.0(F)" in report
+    # served from the cache, also when spelled differently
+    assert tool.run("  PARIS ") == report
+    assert requests == Counter({("current.json", "paris"): 1})
+
+
+def test_future_weather(weather_server):
+    base_url, requests = weather_server
+    report = GetFutureWeather(api_key="test", base_url=base_url).run({"location": "Rome", "days": 2})
+    assert report.startswith("The weather forecast for Rome at 2 days later is:")
+    assert "sunrise time: 07:00 AM" in report
+    assert requests == Counter({("forecast.json", "rome"): 1})
+
+
+def test_batch_and_errors(weather_server):
+    base_url, requests = weather_server
+    tool = GetTodayWeather(api_key="test", base_url=base_url)
+    report = tool.run("Oslo; nowhere; oslo")
+    assert report.count("Today's weather report for Oslo is:") == 2
+    assert "Error occured: {'code': 1006, 'message': 'No matching location found.'}" in report
+    assert requests == Counter({("current.json", "oslo"): 1, ("current.json", "nowhere"): 1})
+    # errors are not cached, neither by the API client nor by the tool
+    assert "Error occured" in tool.run("nowhere")
+    assert requests[("current.json", "nowhere")] == 2